@@ -5,19 +5,14 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 from flask import Flask, jsonify, request, make_response
 import logging
 from datetime import datetime, timedelta
-from db.database import init_db, sqlite3, save_ticker_data, get_transactions, save_transactions, delete_portfolio, delete_transaction, get_all_portfolio_names, save_portfolio_status, get_portfolio_status_saved
+from db.database import init_db, sqlite3, save_ticker_data, get_transactions, save_transactions, delete_portfolio, delete_transaction, get_all_portfolio_names, save_portfolio_status, get_portfolio_status_saved, get_ticker_info_many, get_ticker_info, get_ticker_history, get_connection
 from db.database import DATABASE_NAME
 from core.portfolio import (
-    # compute_multi_ticker_performance,
+    compute_multi_ticker_performance,
     compute_portfolio_performance,
     get_portfolio_status,
     get_asset_allocation_by_quote_type,
     get_overall_asset_allocation,
-    get_last_day_possible_returns,
-    get_weekly_returns,
-    get_monthly_returns,
-    get_three_month_returns,
-    get_ytd_returns,
     compute_ticker_performance,
     compute_benchmark_performance,
     get_ticker_last_day_possible_returns,
@@ -27,15 +22,15 @@ from core.portfolio import (
     get_ticker_ytd_returns,
     get_cached_portfolio_performance,
     get_cached_ticker_performance,
-    # get_cached_multi_ticker_performance,
-    get_one_year_return,
-    get_last_three_days_returns,
+    get_cached_multi_ticker_performance,
+    get_period_returns_bundle,
     compute_portfolio_volatility_1d,
     compute_portfolio_volatility,
     compute_ticker_volatility,
     compute_ticker_volatility_1d,
+    performance_to_columns,
 )
-from core.report_generator import generate_portfolio_report_with_gemini, generate_multi_ticker_report_with_gemini, generate_ticker_report_with_gemini
+from core.report_generator import generate_portfolio_report_with_gemini, generate_multi_ticker_report_with_gemini, generate_ticker_report_with_gemini, generate_ticker_reports_batch
 from services.data_fetcher import fetch_with_cache
 import os
 from flask_cors import CORS
@@ -45,7 +40,11 @@ from google.oauth2 import id_token
 from google.auth.transport import requests
 import requests as ext_requests  # To avoid conflict with Flask's request
 from functools import wraps
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import defaultdict
+import time
+import yfinance as yf
+from yfinance import Search
+import orjson
 
 
 # --- Robust JSON parsing helper ---
@@ -150,14 +149,23 @@ def require_google_token(f):
     return decorated_function
 
 
+def performance_response(perf):
+    """
+    Return a performance series as JSON: a list of records by default,
+    or a column-oriented payload ({date: [...], value: [...], ...}) when called with ?format=columns.
+    """
+    if request.args.get('format') == 'columns':
+        payload = orjson.dumps(performance_to_columns(perf), option=orjson.OPT_SERIALIZE_NUMPY)
+        return app.response_class(payload, mimetype='application/json')
+    return jsonify(perf)
+
+
 # Define how old the data can be before we refresh it from the API
 CACHE_DURATION = timedelta(hours=24)
 
 
 # --- Yahoo Finance Ticker Lookup Helper ---
 def lookup_ticker(query):
-    import time
-    from yfinance import Search
     max_retries = 3
     for attempt in range(max_retries):
         try:
@@ -177,7 +185,7 @@ def lookup_ticker(query):
 def get_ticker(ticker_symbol):
     ticker_symbol = ticker_symbol.upper()
     update = request.args.get('update', 'true').lower() == 'true'
-    conn = sqlite3.connect(DATABASE_NAME, timeout=15)
+    conn = get_connection(timeout=15)
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     # Check if info exists and is recent
@@ -223,22 +231,7 @@ def get_ticker(ticker_symbol):
         return jsonify({'error': f'No info found for ticker {ticker_symbol}'}), 404
     info = dict(info_row)
     # Fetch history
-    cursor.execute('SELECT date, open, close, high, low, volume FROM ticker_history WHERE ticker = ? ORDER BY date ASC', (ticker_symbol,))
-    history = [
-        {
-            'date': row['date'],
-            'open': row['open'],
-            'close': row['close'],
-            'high': row['high'],
-            'low': row['low'],
-            'volume': row['volume']
-        }
-        for row in cursor.fetchall()
-    ]
-    # Fetch ticker_info row (all columns)
-    cursor.execute('SELECT * FROM ticker_info WHERE ticker = ?', (ticker_symbol,))
-    ticker_info_row = cursor.fetchone()
-    ticker_info = dict(ticker_info_row) if ticker_info_row else None
+    history = get_ticker_history(ticker_symbol)
     conn.close()
     response = {
         'source': 'db',
@@ -292,7 +285,7 @@ def standardize_and_save():
 @app.route('/api/portfolio/<string:portfolio_name>/performance', methods=['GET'])
 def portfolio_performance(portfolio_name):
     perf = get_cached_portfolio_performance(portfolio_name)
-    return jsonify(perf)
+    return performance_response(perf)
 
 
 @app.route('/api/portfolio/<string:portfolio_name>/transactions', methods=['GET'])
@@ -381,8 +374,6 @@ def delete_transaction_api(portfolio_name, transaction_id):
 @app.route('/api/portfolios', methods=['GET'])
 def get_all_portfolios():
     """API endpoint to get all portfolio names, with debug logging for DB path and results."""
-    import os
-    from db.database import DATABASE_NAME
     try:
         names = get_all_portfolio_names()
         app.logger.info(f"[DEBUG] /api/portfolios using DB: {os.path.abspath(DATABASE_NAME)}")
@@ -406,7 +397,6 @@ def get_portfolio_status_live_api(portfolio_name):
             app.logger.warning(f"[LIVE STATUS] No transactions found for portfolio: {portfolio_name}")
             return jsonify({'error': 'No transactions found for this portfolio.'}), 404
         # Aggregate quantities by ticker
-        from collections import defaultdict
         asset_quantities = defaultdict(float)
         for t in transactions:
             ticker = t.get('ticker')
@@ -420,7 +410,6 @@ def get_portfolio_status_live_api(portfolio_name):
             # else: ignore other types for now
         app.logger.info(f"[LIVE STATUS] Aggregated asset quantities: {dict(asset_quantities)}")
         # Fetch current prices from yfinance
-        import yfinance as yf
         holdings = []
         total_value = 0.0
         for ticker, quantity in asset_quantities.items():
@@ -496,7 +485,7 @@ def handle_404(e):
 def ticker_performance_api(portfolio_name, ticker):
     start_date = request.args.get('start_date')
     perf = get_cached_ticker_performance(portfolio_name, ticker, start_date=start_date)
-    return jsonify(perf)
+    return performance_response(perf)
 
 
 @app.route('/api/benchmark/<ticker>/performance', methods=['GET'])
@@ -504,9 +493,10 @@ def api_benchmark_performance(ticker):
     """
     API endpoint to get the historical performance of a benchmark ticker (not tied to a portfolio).
     Returns a list of dicts: [{date: ..., value: ..., abs_value: ..., pct: ...}, ...]
+    (or a column-oriented payload with ?format=columns).
     """
     result = compute_benchmark_performance(ticker)
-    return jsonify(result)
+    return performance_response(result)
 
 
 @app.route('/api/portfolio/<string:portfolio_name>/kpis', methods=['GET'])
@@ -521,10 +511,6 @@ def get_portfolio_kpis_api(portfolio_name):
       - worst_ticker: {symbol, pct}
     """
     perf = get_cached_portfolio_performance(portfolio_name)
-    tickers = set()
-    for t in get_transactions(portfolio_name):
-        if t.get('ticker'):
-            tickers.add(t['ticker'])
     # Portfolio value and net value
     last = perf[-1] if perf else None
     abs_value = last['abs_value'] if last and 'abs_value' in last else 0.0
@@ -540,25 +526,12 @@ def get_portfolio_kpis_api(portfolio_name):
     highest_value_ticker = None
     highest_value_ticker_name = None
     highest_value = float('-inf')
-    ticker_perf_results = {}
-    # Parallelize get_cached_ticker_performance calls
-    with ThreadPoolExecutor(max_workers=8) as executor:
-        future_to_ticker = {executor.submit(get_cached_ticker_performance, portfolio_name, ticker): ticker for ticker in tickers}
-        for future in as_completed(future_to_ticker):
-            ticker = future_to_ticker[future]
-            try:
-                ticker_perf = future.result()
-                ticker_perf_results[ticker] = ticker_perf
-            except Exception as exc:
-                app.logger.error(f"Error computing performance for ticker {ticker}: {exc}")
-                ticker_perf_results[ticker] = []
-    import sqlite3
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
+    # Transactions are loaded once and per-ticker performance is computed in parallel
+    ticker_perf_results = get_cached_multi_ticker_performance(portfolio_name)
+    infos = get_ticker_info_many(ticker_perf_results.keys(), ['shortName'])
     def get_ticker_name(symbol):
-        cursor.execute('SELECT shortName FROM ticker_info WHERE ticker = ?', (symbol,))
-        row = cursor.fetchone()
-        return row[0] if row and row[0] else symbol
+        row = infos.get(symbol)
+        return row['shortName'] if row and row['shortName'] else symbol
     for ticker, ticker_perf in ticker_perf_results.items():
         if ticker_perf:
             last_t = ticker_perf[-1]
@@ -577,7 +550,6 @@ def get_portfolio_kpis_api(portfolio_name):
                 highest_value = abs_val
                 highest_value_ticker = ticker
                 highest_value_ticker_name = ticker_name
-    conn.close()
     return jsonify({
         'portfolio_value': {'abs_value': abs_value, 'net_value': net_value},
         'net_performance': net_performance,
@@ -619,22 +591,8 @@ def get_portfolio_returns_api(portfolio_name):
         'one_year': { ... }
     }
     """
-    y = get_last_day_possible_returns(portfolio_name)
-    three_days = get_last_three_days_returns(portfolio_name)
-    w = get_weekly_returns(portfolio_name)
-    m = get_monthly_returns(portfolio_name)
-    three_month = get_three_month_returns(portfolio_name)
-    ytd = get_ytd_returns(portfolio_name)
-    one_year = get_one_year_return(portfolio_name)
-    return jsonify({
-        'yesterday': y,
-        'three_days': three_days,
-        'weekly': w,
-        'monthly': m,
-        'three_month': three_month,
-        'ytd': ytd,
-        'one_year': one_year
-    })
+    # All periods share one load of the transactions and price histories
+    return jsonify(get_period_returns_bundle(portfolio_name))
 
 
 @app.route('/api/portfolio/<string:portfolio_name>/kpis/returns', methods=['GET'])
@@ -651,13 +609,14 @@ def get_portfolio_return_kpis_api(portfolio_name):
       - ytd_return: {portfolio, tickers}
       - one_year_return: {portfolio, tickers}
     """
-    y = get_last_day_possible_returns(portfolio_name)
-    three_days = get_last_three_days_returns(portfolio_name)
-    w = get_weekly_returns(portfolio_name)
-    m = get_monthly_returns(portfolio_name)
-    three_month = get_three_month_returns(portfolio_name)
-    ytd = get_ytd_returns(portfolio_name)
-    one_year = get_one_year_return(portfolio_name)
+    bundle = get_period_returns_bundle(portfolio_name)
+    y = bundle['yesterday']
+    three_days = bundle['three_days']
+    w = bundle['weekly']
+    m = bundle['monthly']
+    three_month = bundle['three_month']
+    ytd = bundle['ytd']
+    one_year = bundle['one_year']
     # For KPI cards, just return the portfolio return_pct for each period
     return jsonify({
         'yesterday_return': y['portfolio']['return_pct'] if y['portfolio'] else None,
@@ -697,13 +656,8 @@ def generate_portfolio_report_api(portfolio_name):
         status = get_portfolio_status(portfolio_name)
     returns = data.get('returns') if isinstance(data, dict) else None
     if not returns:
-        returns = {
-            'yesterday': get_last_day_possible_returns(portfolio_name),
-            'weekly': get_weekly_returns(portfolio_name),
-            'monthly': get_monthly_returns(portfolio_name),
-            'three_month': get_three_month_returns(portfolio_name),
-            'ytd': get_ytd_returns(portfolio_name)
-        }
+        bundle = get_period_returns_bundle(portfolio_name)
+        returns = {period: bundle[period] for period in ['yesterday', 'weekly', 'monthly', 'three_month', 'ytd']}
     # Parse 'force' from query string or JSON body
     force = False
     if 'force' in request.args:
@@ -820,13 +774,7 @@ def generate_ticker_report_api(portfolio_name, ticker):
     elif isinstance(data, dict) and 'force' in data:
         force = bool(data.get('force'))
     # Fetch ticker_info from DB
-    conn = sqlite3.connect(DATABASE_NAME, timeout=15)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM ticker_info WHERE ticker = ?', (ticker.upper(),))
-    ticker_info_row = cursor.fetchone()
-    ticker_info = dict(ticker_info_row) if ticker_info_row else None
-    conn.close()
+    ticker_info = get_ticker_info(ticker.upper())
     # app.logger.info(f"[LLM INPUT] Ticker report for {ticker} in {portfolio_name}:\nHoldings: {holdings}\nWeight: {weight}\nStatus: {status}\nReturns: {returns}\nTicker Info: {ticker_info}\nForce: {force}\n")
     report, cost = generate_ticker_report_with_gemini(
         ticker,
@@ -840,6 +788,54 @@ def generate_ticker_report_api(portfolio_name, ticker):
     return jsonify({'ticker': ticker, 'report': report, 'cost': cost})
 
 
+@app.route('/api/portfolio/<string:portfolio_name>/tickers/reports', methods=['POST'])
+@require_google_token
+def generate_ticker_reports_api(portfolio_name):
+    """
+    API endpoint to generate the Gemini-based reports of several tickers in a portfolio in one pass.
+    Tickers are marshaled into a few batched Gemini calls and today's reports already in the DB are reused.
+    Expects JSON body with:
+      - tickers: list of ticker symbols (optional, defaults to all the portfolio holdings)
+      - force: regenerate reports even if today's report exists (optional)
+    """
+    try:
+        data = safe_get_json()
+        if isinstance(data, tuple):  # error response from safe_get_json
+            return data
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Request body must be a JSON object.'}), 400
+        tickers = data.get('tickers')
+        if tickers is not None and not (isinstance(tickers, list) and all(isinstance(t, str) and t for t in tickers)):
+            return jsonify({'error': 'tickers must be a list of ticker symbols.'}), 400
+        status = get_portfolio_status(portfolio_name)
+        all_holdings = status.get('holdings', [])
+        tickers = tickers or [h['ticker'] for h in all_holdings]
+        holdings_list = [next((h for h in all_holdings if h['ticker'].upper() == t.upper()), {}) for t in tickers]
+        total_value = status.get('total_value', 0.0) or 1.0
+        weights = [(h.get('value', 0.0) / total_value) if total_value else 0.0 for h in holdings_list]
+        # One bundle computes every period for all the tickers, instead of five lookups per ticker
+        bundle = get_period_returns_bundle(portfolio_name)
+        periods = ['yesterday', 'weekly', 'monthly', 'three_month', 'ytd']
+        period_tickers = {period: {k.upper(): v for k, v in bundle[period]['tickers'].items()} for period in periods}
+        returns_dict = {t: {period: period_tickers[period].get(t.upper()) for period in periods} for t in tickers}
+        infos = get_ticker_info_many([t.upper() for t in tickers])
+        ticker_infos = {t: dict(infos[t.upper()]) if t.upper() in infos else None for t in tickers}
+        reports, cost = generate_ticker_reports_batch(
+            tickers,
+            holdings_list,
+            weights,
+            status,
+            returns_dict,
+            ticker_infos,
+            force=bool(data.get('force'))
+        )
+        # Tickers whose generation failed (logged by the report generator) get no report
+        missing = [t for t in tickers if t not in reports]
+        return jsonify({'portfolio': portfolio_name, 'reports': reports, 'cost': cost, 'missing': missing})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/api/portfolio/<string:portfolio_name>/volatility', methods=['GET'])
 def get_portfolio_volatility_api(portfolio_name):
     """
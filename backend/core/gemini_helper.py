@@ -1,10 +1,18 @@
 import os
+import json
+import logging
+import re
+import orjson
+import hashlib
+from functools import lru_cache
+from threading import Lock
+from cachetools import TTLCache
 import google.generativeai as genai
+from google import genai as google_genai
+from google.genai import types as genai_types
 
 from core.gemini_cost import GEMINI_2_5_FLASH_LITE_PREVIEW_06_17
 from core.gemini_cost import calculate_gemini_cost
-from db.database import *
-from services.data_fetcher import *
 
 API_KEY = os.getenv("GEMINI_API_KEY")
 if not API_KEY:
@@ -12,6 +20,84 @@ if not API_KEY:
 
 genai.configure(api_key=API_KEY)
 
+logger = logging.getLogger(__name__)
+
+# Markdown code fence (```json ... ```) Gemini wraps around JSON answers in free-text mode
+_CODE_FENCE_RE = re.compile(r'\A\s*```(?:json)?\s*|\s*```\s*\Z')
+# Outermost JSON list of a free-text answer (greedy: first '[' to last ']')
+_JSON_LIST_RE = re.compile(r'\[.*\]', re.S)
+
+
+# Short-lived cache of grounded responses keyed by a hash of the call, so that identical
+# prompts (retries, re-renders of the same report) within a few minutes skip the Gemini call:
+# key -> response dict (a private copy: callers get their own)
+_RESPONSE_CACHE_MAXSIZE = 256
+_RESPONSE_CACHE_TTL = 300  # seconds
+_RESPONSE_CACHE = TTLCache(maxsize=_RESPONSE_CACHE_MAXSIZE, ttl=_RESPONSE_CACHE_TTL)
+_RESPONSE_CACHE_LOCK = Lock()
+
+
+def _response_cache_key(prompt, model_name, response_mime_type, response_schema):
+    call = f"{model_name}\0{response_mime_type}\0{response_schema!r}\0{prompt}"
+    return hashlib.blake2b(call.encode(), digest_size=16).digest()
+
+
+def _response_cache_get(key):
+    with _RESPONSE_CACHE_LOCK:
+        return _RESPONSE_CACHE.get(key)
+
+
+def _response_cache_put(key, response):
+    with _RESPONSE_CACHE_LOCK:
+        _RESPONSE_CACHE[key] = dict(response)
+
+
+def strip_code_fences(text):
+    """Remove the markdown code fence around a Gemini answer in a single regex pass."""
+    return _CODE_FENCE_RE.sub('', text)
+
+
+@lru_cache(maxsize=4)
+def _get_model(model_name):
+    """genai.GenerativeModel of a model name, built once and reused by every call."""
+    return genai.GenerativeModel(model_name)
+
+
+# google.genai client of the grounded calls, created on first use and shared so its HTTP connections are reused
+_GROUNDED_CLIENT = None
+_GROUNDED_CLIENT_LOCK = Lock()
+
+
+def _grounded_client():
+    global _GROUNDED_CLIENT
+    with _GROUNDED_CLIENT_LOCK:
+        if _GROUNDED_CLIENT is None:
+            _GROUNDED_CLIENT = google_genai.Client()
+        return _GROUNDED_CLIENT
+
+
+# Transaction fields set to None when Gemini leaves them out
+_OPTIONAL_TRANSACTION_FIELDS = ('quantity', 'price', 'date', 'label')
+
+
+def _response_text(response):
+    """
+    Text of a generate_content response: the parts of its first candidate joined (long answers come in chunks),
+    else its own parts, else response.text. Returns '' when none of them holds any text.
+    """
+    for get_parts in (lambda: response.candidates[0].content.parts, lambda: response.parts):
+        try:
+            text = "".join(part.text for part in get_parts())
+        except Exception:
+            continue
+        if text:
+            return text
+    try:
+        return response.text or ''
+    except Exception:
+        return ''
+
+
 def parse_transactions(raw_text, portfolio_name=None):
     prompt = (
         "Extract all transactions from the text below. "
@@ -27,107 +113,78 @@ def parse_transactions(raw_text, portfolio_name=None):
         "]"
     )
     model_name = os.getenv("GEMINI_MODEL", f"models/{GEMINI_2_5_FLASH_LITE_PREVIEW_06_17}")
-    model = genai.GenerativeModel(model_name)
+    model = _get_model(model_name)
     config = genai.GenerationConfig(temperature=0.0)
-    print("Prompt sent to Gemini:", prompt)
+    logger.debug("Prompt sent to Gemini: %s", prompt)
     response = model.generate_content([prompt, raw_text], generation_config=config)
-    try:
-        from pprint import pprint
-        pprint(response.__dict__)
-        print("response._result:", getattr(response, '_result', None))
-        print("response._chunks:", getattr(response, '_chunks', None))
-        if hasattr(response, '_result') and hasattr(response._result, 'candidates'):
-            print("response._result.candidates:", response._result.candidates)
-            if response._result.candidates and hasattr(response._result.candidates[0], 'content'):
-                print("response._result.candidates[0].content:", response._result.candidates[0].content)
-                if hasattr(response._result.candidates[0].content, 'parts'):
-                    print("response._result.candidates[0].content.parts:", response._result.candidates[0].content.parts)
-    except Exception as e:
-        print("[Gemini API debug] Could not print response dict:", e)
-    print("[Gemini API raw response]", response)
+    if logger.isEnabledFor(logging.DEBUG):
+        # A cheap summary: dumping the whole response object reflects over every protobuf field
+        candidates = getattr(response, 'candidates', None) or []
+        usage = getattr(response, 'usage_metadata', None)
+        logger.debug(
+            "[Gemini API] %d candidate(s), finish reason %s, tokens in/out %s/%s",
+            len(candidates),
+            getattr(candidates[0], 'finish_reason', None) if candidates else None,
+            getattr(usage, 'prompt_token_count', None),
+            getattr(usage, 'candidates_token_count', None),
+        )
     # Extraction logic (if any output is present)
-    import json
-    cleaned = None
-    # Try to extract all text parts and join them (in case of chunked output)
-    text_parts = []
-    if hasattr(response, 'candidates') and response.candidates:
-        try:
-            for part in response.candidates[0].content.parts:
-                text_parts.append(part.text)
-        except Exception:
-            pass
-    if not text_parts and hasattr(response, 'parts') and response.parts:
-        try:
-            for part in response.parts:
-                text_parts.append(part.text)
-        except Exception:
-            pass
-    if not text_parts and hasattr(response, 'text'):
-        try:
-            text_parts.append(response.text)
-        except Exception:
-            pass
-    if text_parts:
-        cleaned = "".join(text_parts).strip("`\n ").replace('json', '')
-        # Try to find the first and last square brackets to extract a valid JSON list
-        start = cleaned.find('[')
-        end = cleaned.rfind(']')
-        if start != -1 and end != -1:
-            cleaned = cleaned[start:end+1]
+    text = _response_text(response)
+    # The JSON list runs from the first '[' to the last ']', whatever fences or prose surround it
+    match = _JSON_LIST_RE.search(text)
+    cleaned = match.group(0) if match else strip_code_fences(text)
     if not cleaned:
         raise RuntimeError("Could not extract text from Gemini response. Candidates, parts, and text fields were all empty or missing.")
     try:
-        transactions = json.loads(cleaned)
-        # Ensure every transaction has a non-empty 'portfolio' field
+        try:
+            transactions = orjson.loads(cleaned)
+        except orjson.JSONDecodeError:
+            transactions = json.loads(cleaned)
+        # Fill in missing fields in one pass: a non-empty portfolio, a string name, None for the other fields.
+        # Transactions without a ticker cannot be saved to DB and are dropped
+        default_portfolio = portfolio_name or 'Imported'
+        valid = []
         for tx in transactions:
-            if 'portfolio' not in tx or not tx['portfolio']:
-                tx['portfolio'] = portfolio_name or "Imported"
-            if 'name' not in tx:
+            if not tx.get('portfolio'):
+                tx['portfolio'] = default_portfolio
+            if not isinstance(tx.get('name'), str):
                 tx['name'] = ''
+            for key in _OPTIONAL_TRANSACTION_FIELDS:
+                tx.setdefault(key, None)
+            ticker = tx.get('ticker')
+            if isinstance(ticker, str) and ticker.strip():
+                valid.append(tx)
     except Exception as e:
         raise RuntimeError(f"Could not decode JSON from Gemini response: {e}\nExtracted text: {cleaned}")
-    # Validate schema after parsing
-    expected_keys = {'ticker', 'quantity', 'price', 'date', 'label', 'portfolio', 'name'}
-    for idx, tx in enumerate(transactions):
-        missing = expected_keys - set(tx.keys())
-        for key in missing:
-            # Set missing fields to None, except 'portfolio' which must be a non-empty string, and 'ticker' which must be a non-empty string, and 'name' which must be a string
-            if key == 'portfolio':
-                tx['portfolio'] = portfolio_name or 'Imported'
-            elif key == 'ticker':
-                tx['ticker'] = ''
-            elif key == 'name':
-                tx['name'] = ''
-            else:
-                tx[key] = None
-        # Enforce types and non-empty portfolio/ticker/name
-        if not tx['portfolio']:
-            tx['portfolio'] = portfolio_name or 'Imported'
-        if not tx['ticker'] or not isinstance(tx['ticker'], str):
-            tx['ticker'] = ''
-        if 'name' not in tx or not isinstance(tx['name'], str):
-            tx['name'] = ''
-    # Remove transactions with empty or null ticker (cannot be saved to DB)
-    transactions = [tx for tx in transactions if tx['ticker'] and isinstance(tx['ticker'], str) and tx['ticker'].strip()]
-    return transactions
-
-def generate_grounded_report_response(prompt: str, model_name: str = "gemini-2.5-flash"):
+    return valid
+
+def generate_grounded_report_response(prompt: str, model_name: str = "gemini-2.5-flash", response_mime_type: str = None, response_schema=None,
+                                      force: bool = False):
     """
     Generate a Gemini report using grounding (Google Search) for more accurate, up-to-date information.
     Returns the model's answer and grounding metadata (search queries, citations), and logs the Gemini API cost.
+    response_mime_type/response_schema request a structured (e.g. 'application/json') answer instead. Gemini does not
+    support search grounding together with a JSON response type, so such calls are made without the Google Search tool.
+    Identical calls made within a few minutes reuse the previous answer (at no cost), unless force is True.
     """
-    from google import genai
-    from google.genai import types
-    client = genai.Client()
+    cache_key = _response_cache_key(prompt, model_name, response_mime_type, response_schema)
+    if not force:
+        cached = _response_cache_get(cache_key)
+        if cached is not None:
+            print(f"\033[92m[Gemini Cost] {model_name} grounded call served from cache: $0.0000\033[0m")
+            return dict(cached, cost=0.0)
+    client = _grounded_client()
     # 1) Define the grounding tool
-    grounding_tool = types.Tool(
-        google_search=types.GoogleSearch()
+    grounding_tool = genai_types.Tool(
+        google_search=genai_types.GoogleSearch()
     )
     # 2) Include it in your config
-    config = types.GenerateContentConfig(
+    config = genai_types.GenerateContentConfig(
         temperature=0.0,
-        tools=[grounding_tool],
-        # thinking_config=types.ThinkingConfig(
+        tools=None if response_mime_type else [grounding_tool],
+        response_mime_type=response_mime_type,
+        response_schema=response_schema,
+        # thinking_config=genai_types.ThinkingConfig(
         #     thinking_budget=2048,
         # ),
     )
@@ -150,8 +207,11 @@ def generate_grounded_report_response(prompt: str, model_name: str = "gemini-2.5
             grounding_metadata = getattr(response.candidates[0], 'grounding_metadata', None)
     except Exception:
         pass
-    return {
+    result = {
         'text': answer,
         'cost': cost,
         # 'grounding_metadata': grounding_metadata
     }
+    if answer is not None:
+        _response_cache_put(cache_key, result)
+    return result
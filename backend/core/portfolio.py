@@ -1,16 +1,24 @@
 from collections import defaultdict
 from datetime import datetime
+from functools import lru_cache, reduce
+import numpy as np
 import pandas as pd
-import sqlite3
 from db.database import (
     aggregate_positions,
     get_ticker_history,
+    get_ticker_info_many,
+    get_transactions,
     save_ticker_data,
-    DATABASE_NAME
+    save_ticker_data_many
 )
 from services import data_fetcher
+import gc
+import logging
 import time
 from threading import Lock
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+logger = logging.getLogger(__name__)
 
 # --- In-memory cache for performance endpoints ---
 _PERFORMANCE_CACHE = {}
@@ -18,38 +26,320 @@ _TICKER_PERFORMANCE_CACHE = {}
 _MULTI_TICKER_PERFORMANCE_CACHE = {}
 _CACHE_TTL = 60  # seconds
 _CACHE_LOCK = Lock()
+# Raw inputs shared by the helpers above, so the period helpers of one request hit SQLite once
+_TRANSACTIONS_CACHE = {}
+_HISTORY_CACHE = {}
+
+# --- Periodic garbage collection of intermediate DataFrames ---
+_GC_EVERY = 50  # heavy computations between two gc.collect() calls
+_GC_COUNTER = 0
+_GC_LOCK = Lock()
+
+
+def _maybe_collect():
+    """Run gc.collect() once every _GC_EVERY heavy computations to free DataFrames kept alive by reference cycles."""
+    global _GC_COUNTER
+    with _GC_LOCK:
+        _GC_COUNTER += 1
+        if _GC_COUNTER < _GC_EVERY:
+            return
+        _GC_COUNTER = 0
+    gc.collect()
+
+
+# --- Vectorized helpers for the performance series ---
+def _safe_pct(numerator, denominator):
+    """Element-wise numerator / denominator * 100, with 0.0 wherever the denominator is 0."""
+    numerator = np.asarray(numerator, dtype=float)
+    denominator = np.broadcast_to(np.asarray(denominator, dtype=float), numerator.shape)
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator != 0) * 100
+
+
+def _pct_from_first_nonzero(abs_values):
+    """% change of each value from the first nonzero value of the series (0.0 until that value is reached)."""
+    abs_values = np.asarray(abs_values, dtype=float)
+    pct = np.zeros_like(abs_values)
+    nonzero = np.flatnonzero(abs_values != 0)
+    if nonzero.size:
+        first_idx = nonzero[0]
+        first = abs_values[first_idx]
+        pct[first_idx:] = (abs_values[first_idx:] - first) / first * 100
+    return pct
+
+
+def _format_dates(dates):
+    """Format a DatetimeIndex (or array of datetime64) as a list of 'YYYY-MM-DD' strings in one pass."""
+    return np.asarray(dates, dtype='datetime64[ns]').astype('datetime64[D]').astype(str).tolist()
+
+
+# Start dates come from a handful of period helpers, so the same strings are parsed over and over
+_parse_date = lru_cache(maxsize=1024)(pd.to_datetime)
+
+
+def _parse_history_dates(dates):
+    """
+    Parse stored history dates to datetime64[ns]. They are written as 'YYYY-MM-DD' by the data fetcher,
+    which NumPy parses directly; anything else falls back to pd.to_datetime.
+    """
+    try:
+        return np.asarray(dates, dtype='datetime64[ns]')
+    except (ValueError, TypeError):
+        return pd.to_datetime(dates)
+
+
+def _cumulative_at(event_dates, amounts, dates):
+    """
+    Running total of `amounts` as of each of `dates`, counting events dated on or before it.
+    NaN amounts count as 0 and NaT events are never counted, like a masked pandas .sum().
+    """
+    event_dates = np.asarray(event_dates, dtype='datetime64[ns]')
+    order = np.argsort(event_dates, kind='stable')
+    totals = np.concatenate(([0.0], np.cumsum(np.nan_to_num(np.asarray(amounts, dtype=float)[order]))))
+    return totals[np.searchsorted(event_dates[order], np.asarray(dates, dtype='datetime64[ns]'), side='right')]
+
+
+def _cumulative_matrix(event_dates, columns, amounts, dates, n_columns):
+    """
+    Dates x columns running totals: cell (i, j) sums the `amounts` of column-j events dated on or
+    before dates[i] (sorted). Same semantics as _cumulative_at, for every column in one pass.
+    """
+    rows = np.searchsorted(np.asarray(dates, dtype='datetime64[ns]'),
+                           np.asarray(event_dates, dtype='datetime64[ns]'), side='left')
+    keep = rows < len(dates)
+    events = np.zeros((len(dates), n_columns))
+    np.add.at(events, (rows[keep], np.asarray(columns)[keep]),
+              np.nan_to_num(np.asarray(amounts, dtype=float)[keep]))
+    return np.cumsum(events, axis=0)
+
+
+def _parse_transaction_dates(dates):
+    """
+    Parse transaction dates to datetime64[ns]. They are normally ISO strings, parsed with the
+    fast ISO8601 path and a cache for repeated values; other formats fall back to format inference.
+    """
+    try:
+        return pd.to_datetime(dates, format='ISO8601', cache=True)
+    except (ValueError, TypeError):
+        return pd.to_datetime(dates, cache=True)
+
+
+# --- Ticker history loading ---
+def _aligned_prices(close, dates):
+    """
+    Align a close-price series on `dates`: exact matches keep their price, gaps take the last
+    known non-null price and dates before the first price are 0.0. Returns a NumPy array.
+    """
+    close = close.sort_index()
+    close = close[~close.index.duplicated(keep='last')]
+    dates = np.asarray(dates, dtype='datetime64[ns]')
+    if close.empty:
+        return np.zeros(len(dates))
+    close_dates = close.index.values.astype('datetime64[ns]')
+    prices = close.to_numpy(dtype=float)
+    # Position of the last close on or before each date, and of the last non-null close up to there
+    pos = np.searchsorted(close_dates, dates, side='right') - 1
+    valid_pos = np.maximum.accumulate(np.where(np.isnan(prices), -1, np.arange(len(prices))))
+    carried_pos = np.where(pos >= 0, valid_pos[np.maximum(pos, 0)], -1)
+    carried = np.where(carried_pos >= 0, prices[np.maximum(carried_pos, 0)], 0.0)
+    exact = (pos >= 0) & (close_dates[np.maximum(pos, 0)] == dates)
+    return np.where(exact, prices[np.maximum(pos, 0)], carried)
+
+
+_NEGATIVE_HIST_CACHE = {}  # ticker -> time of the last fetch that returned no history
+_NEGATIVE_HIST_TTL = 300  # seconds
+_FETCH_LOCKS = defaultdict(Lock)
+_FETCH_LOCKS_LOCK = Lock()
+_SAVE_LOCK = Lock()
+
+
+def _get_or_fetch_ticker_history(ticker):
+    """
+    Return the stored history of a ticker, fetching and saving it first if it is missing.
+    Tickers whose fetch returned no history are not fetched again for _NEGATIVE_HIST_TTL seconds,
+    and concurrent requests for the same missing ticker share a single upstream fetch.
+    """
+    hist = _cached_ticker_history(ticker)
+    if hist:
+        return hist
+    with _FETCH_LOCKS_LOCK:
+        fetch_lock = _FETCH_LOCKS[ticker]
+    with fetch_lock:
+        failed_at = _NEGATIVE_HIST_CACHE.get(ticker)
+        if failed_at is not None and time.time() - failed_at < _NEGATIVE_HIST_TTL:
+            return []
+        # Another request may have fetched it while we were waiting for the lock
+        hist = get_ticker_history(ticker)
+        if hist:
+            return hist
+        data, _ = data_fetcher.fetch_with_cache(ticker, save=False)
+        history = (data or {}).get('history', [])
+        if history:
+            # Concurrent loaders fetch different tickers; serialize their SQLite writes
+            with _SAVE_LOCK:
+                save_ticker_data(ticker, data)
+            hist = get_ticker_history(ticker)
+        if hist:
+            _NEGATIVE_HIST_CACHE.pop(ticker, None)
+        else:
+            _NEGATIVE_HIST_CACHE[ticker] = time.time()
+    return hist
+
+
+def _load_ticker_series(ticker):
+    """Return (ticker, close-price Series indexed by date), with None instead of the Series if it has no usable history."""
+    hist = _get_or_fetch_ticker_history(ticker)
+    if not hist:
+        return ticker, None
+    df_hist = pd.DataFrame(hist)
+    if df_hist.empty or 'date' not in df_hist.columns or 'close' not in df_hist.columns:
+        return ticker, None
+    df_hist['date'] = _parse_history_dates(df_hist['date'])
+    df_hist.set_index('date', inplace=True)
+    return ticker, df_hist['close']
+
+
+def _union_dates(ticker_histories):
+    """Sorted union, without duplicates, of the date indexes of several close-price Series."""
+    return reduce(lambda a, b: a.union(b), (s.index for s in ticker_histories.values()), pd.DatetimeIndex([])).unique()
+
+
+def _prefetch_ticker_histories(tickers):
+    """
+    Fetch the tickers that have no stored history in one batch (see data_fetcher.fetch_many_with_cache) and save
+    them all in a single transaction, so a cold start with many tickers commits once instead of once per ticker.
+    """
+    now = time.time()
+    missing = [ticker for ticker in tickers
+               if not _cached_ticker_history(ticker)
+               and now - _NEGATIVE_HIST_CACHE.get(ticker, 0) >= _NEGATIVE_HIST_TTL]
+    if len(missing) < 2:
+        return
+    fetched = data_fetcher.fetch_many_with_cache(missing, save=False).items()
+    items = [(ticker, data) for ticker, data in fetched if (data or {}).get('history')]
+    for ticker, data in fetched:
+        if not (data or {}).get('history'):
+            _NEGATIVE_HIST_CACHE[ticker] = time.time()
+    if items:
+        with _SAVE_LOCK:
+            save_ticker_data_many(items)
+
+
+def _load_ticker_histories(tickers):
+    """
+    Load the close-price Series of several tickers concurrently (SQLite reads and missing-history fetches are I/O bound).
+    Returns {ticker: Series} in the order of `tickers`, leaving out tickers without history.
+    """
+    _prefetch_ticker_histories(tickers)
+    if len(tickers) > 1:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(_load_ticker_series, tickers))
+    else:
+        results = [_load_ticker_series(ticker) for ticker in tickers]
+    return {ticker: close for ticker, close in results if close is not None}
 
 
-# Helper to clear caches (call after transaction changes)
+# Cache generations: transaction writes bump a counter instead of scanning the
+# caches, and entries computed under an older generation are simply ignored.
+# Keys are portfolio_name (portfolio-level entries), (portfolio_name, None) for
+# "every ticker" and (portfolio_name, ticker) for a single ticker.
+_CACHE_VERSIONS = defaultdict(int)
+
+
+def _portfolio_version(portfolio_name):
+    return _CACHE_VERSIONS[portfolio_name]
+
+
+def _ticker_version(portfolio_name, ticker):
+    return (_CACHE_VERSIONS[(portfolio_name, None)], _CACHE_VERSIONS[(portfolio_name, ticker)])
+
+
+# Helper to clear caches (call after transaction changes). Pass the tickers whose
+# transactions changed to keep the cached series of the other tickers.
 def clear_performance_caches(portfolio_name=None, tickers=None):
     with _CACHE_LOCK:
         if portfolio_name:
-            _PERFORMANCE_CACHE.pop(portfolio_name, None)
-            _MULTI_TICKER_PERFORMANCE_CACHE.pop(portfolio_name, None)
+            _CACHE_VERSIONS[portfolio_name] += 1
             if tickers:
-                for t in tickers:
-                    _TICKER_PERFORMANCE_CACHE.pop((portfolio_name, t), None)
+                for ticker in tickers:
+                    _CACHE_VERSIONS[(portfolio_name, ticker)] += 1
             else:
-                # Remove all tickers for this portfolio
-                keys_to_remove = [k for k in _TICKER_PERFORMANCE_CACHE if k[0] == portfolio_name]
-                for k in keys_to_remove:
-                    _TICKER_PERFORMANCE_CACHE.pop(k, None)
+                _CACHE_VERSIONS[(portfolio_name, None)] += 1
         else:
             _PERFORMANCE_CACHE.clear()
             _TICKER_PERFORMANCE_CACHE.clear()
             _MULTI_TICKER_PERFORMANCE_CACHE.clear()
+            _TRANSACTIONS_CACHE.clear()
+
+
+def clear_ticker_history_cache(tickers=None):
+    """Drop cached price histories (call after ticker data is saved)."""
+    with _CACHE_LOCK:
+        if tickers is None:
+            _HISTORY_CACHE.clear()
+        else:
+            for ticker in tickers:
+                _HISTORY_CACHE.pop(ticker, None)
+
+
+def _cached_transactions(portfolio_name):
+    """get_transactions(portfolio_name), reused until the portfolio is written to or _CACHE_TTL expires."""
+    now = time.time()
+    with _CACHE_LOCK:
+        version = _portfolio_version(portfolio_name)
+        entry = _TRANSACTIONS_CACHE.get(portfolio_name)
+        if entry and entry['version'] == version and now - entry['ts'] < _CACHE_TTL:
+            return entry['data']
+    data = get_transactions(portfolio_name)
+    with _CACHE_LOCK:
+        _TRANSACTIONS_CACHE[portfolio_name] = {'data': data, 'ts': now, 'version': version}
+    return data
+
+
+def _cached_positions(portfolio_name):
+    """
+    (transactions, aggregate_positions(transactions)) of a portfolio. The positions are computed once per cached
+    transactions snapshot and shared by the status/allocation views; treat the dict as read-only.
+    """
+    txs = _cached_transactions(portfolio_name)
+    with _CACHE_LOCK:
+        entry = _TRANSACTIONS_CACHE.get(portfolio_name)
+        if entry is not None and entry['data'] is txs and 'positions' in entry:
+            return txs, entry['positions']
+    positions = aggregate_positions(txs)
+    with _CACHE_LOCK:
+        entry = _TRANSACTIONS_CACHE.get(portfolio_name)
+        if entry is not None and entry['data'] is txs:
+            entry['positions'] = positions
+    return txs, positions
+
+
+def _cached_ticker_history(ticker):
+    """get_ticker_history(ticker), reused until the ticker is saved again or _CACHE_TTL expires."""
+    now = time.time()
+    with _CACHE_LOCK:
+        entry = _HISTORY_CACHE.get(ticker)
+        if entry and now - entry['ts'] < _CACHE_TTL:
+            return entry['data']
+    data = get_ticker_history(ticker)
+    if data:
+        with _CACHE_LOCK:
+            _HISTORY_CACHE[ticker] = {'data': data, 'ts': now}
+    return data
 
 
 # --- Caching wrappers ---
+# The generation is read before computing so that a write landing mid-computation
+# leaves the stored entry already stale.
 def get_cached_portfolio_performance(portfolio_name):
     now = time.time()
     with _CACHE_LOCK:
+        version = _portfolio_version(portfolio_name)
         entry = _PERFORMANCE_CACHE.get(portfolio_name)
-        if entry and now - entry['ts'] < _CACHE_TTL:
+        if entry and entry['version'] == version and now - entry['ts'] < _CACHE_TTL:
             return entry['data']
     data = compute_portfolio_performance(portfolio_name, _skip_cache=True)
     with _CACHE_LOCK:
-        _PERFORMANCE_CACHE[portfolio_name] = {'data': data, 'ts': now}
+        _PERFORMANCE_CACHE[portfolio_name] = {'data': data, 'ts': now, 'version': version}
     return data
 
 
@@ -57,44 +347,45 @@ def get_cached_ticker_performance(portfolio_name, ticker, start_date=None):
     now = time.time()
     key = (portfolio_name, ticker, str(start_date) if start_date else '')
     with _CACHE_LOCK:
+        version = _ticker_version(portfolio_name, ticker)
         entry = _TICKER_PERFORMANCE_CACHE.get(key)
-        if entry and now - entry['ts'] < _CACHE_TTL:
+        if entry and entry['version'] == version and now - entry['ts'] < _CACHE_TTL:
             return entry['data']
     data = compute_ticker_performance(portfolio_name, ticker, start_date, _skip_cache=True)
     with _CACHE_LOCK:
-        _TICKER_PERFORMANCE_CACHE[key] = {'data': data, 'ts': now}
+        _TICKER_PERFORMANCE_CACHE[key] = {'data': data, 'ts': now, 'version': version}
     return data
 
 
-# def get_cached_multi_ticker_performance(portfolio_name, tickers, start_date=None):
-#     now = time.time()
-#     key = (portfolio_name, tuple(sorted(tickers)), str(start_date) if start_date else '')
-#     with _CACHE_LOCK:
-#         entry = _MULTI_TICKER_PERFORMANCE_CACHE.get(key)
-#         if entry and now - entry['ts'] < _CACHE_TTL:
-#             return entry['data']
-#     data = compute_multi_ticker_performance(portfolio_name, tickers, start_date, _skip_cache=True)
-#     with _CACHE_LOCK:
-#         _MULTI_TICKER_PERFORMANCE_CACHE[key] = {'data': data, 'ts': now}
-#     return data
+def get_cached_multi_ticker_performance(portfolio_name, tickers=None, start_date=None):
+    now = time.time()
+    key = (portfolio_name, tuple(sorted(tickers)) if tickers else (), str(start_date) if start_date else '')
+    with _CACHE_LOCK:
+        # An explicit ticker list only depends on those tickers' transactions
+        if tickers:
+            version = tuple(_ticker_version(portfolio_name, t) for t in key[1])
+        else:
+            version = _portfolio_version(portfolio_name)
+        entry = _MULTI_TICKER_PERFORMANCE_CACHE.get(key)
+        if entry and entry['version'] == version and now - entry['ts'] < _CACHE_TTL:
+            return entry['data']
+    data = compute_multi_ticker_performance(portfolio_name, tickers, start_date, _skip_cache=True)
+    with _CACHE_LOCK:
+        _MULTI_TICKER_PERFORMANCE_CACHE[key] = {'data': data, 'ts': now, 'version': version}
+    return data
 
 
 def get_portfolio_status(portfolio_name):
     """Return current holdings with latest prices using the new normalized ticker tables."""
-    from db.database import get_transactions  # Local import to avoid circular import
-    txs = get_transactions(portfolio_name)
-    positions = aggregate_positions(txs)
+    txs, positions = _cached_positions(portfolio_name)
     holdings = []
     total_value = 0.0
-    conn = sqlite3.connect(DATABASE_NAME)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+    # Latest prices from ticker_info, for all held tickers at once
+    infos = get_ticker_info_many([t for t, qty in positions.items() if qty != 0], ['regularMarketPrice', 'shortName'])
     for ticker, qty in positions.items():
         if qty == 0:
             continue
-        # Get latest price from ticker_info
-        cursor.execute('SELECT regularMarketPrice, shortName FROM ticker_info WHERE ticker = ?', (ticker,))
-        row = cursor.fetchone()
+        row = infos.get(ticker)
         price = row['regularMarketPrice'] if row and row['regularMarketPrice'] is not None else 0
         name = row['shortName'] if row and row['shortName'] else ticker
         value = price * qty
@@ -106,18 +397,15 @@ def get_portfolio_status(portfolio_name):
             "price": price,
             "value": value,
         })
-    conn.close()
     return {"holdings": holdings, "total_value": total_value}
 
 
 def get_performance(portfolio_name):
     """Compute simple performance trend using daily closes."""
-    from db.database import get_transactions  # Local import to avoid circular import
-    txs = get_transactions(portfolio_name)
+    txs, positions = _cached_positions(portfolio_name)
     if not txs:
         return []
     first_date = min(t["date"] for t in txs)
-    positions = aggregate_positions(txs)
     history_dict = {}
     for ticker, qty in positions.items():
         if qty == 0:
@@ -129,7 +417,7 @@ def get_performance(portfolio_name):
         df = pd.DataFrame(hist)
         if df.empty or "Date" not in df.columns or "Close" not in df.columns:
             continue
-        df["Date"] = pd.to_datetime(df["Date"])
+        df["Date"] = _parse_history_dates(df["Date"])
         df.set_index("Date", inplace=True)
         df = df[df.index >= first_date]
         history_dict[ticker] = df["Close"]
@@ -138,94 +426,77 @@ def get_performance(portfolio_name):
     df = pd.DataFrame(history_dict)
     df.sort_index(inplace=True)
     df.ffill(inplace=True)
-    values = []
-    for date, row in df.iterrows():
-        total = 0.0
-        for ticker, qty in positions.items():
-            price = row.get(ticker, 0)
-            total += price * qty
-        values.append({"date": date.strftime("%Y-%m-%d"), "value": total})
-    return values
+    # Daily value = prices (dates x tickers) @ held quantities; tickers without history contribute 0
+    qty_vec = np.fromiter((positions[ticker] for ticker in df.columns), dtype=float, count=len(df.columns))
+    totals = df.to_numpy(dtype=float) @ qty_vec
+    return [{"date": d, "value": v} for d, v in zip(_format_dates(df.index), totals.tolist())]
+
+
+def performance_to_columns(values):
+    """
+    Convert a performance series (list of dicts as returned by the compute_*_performance functions)
+    to a column-oriented dict: {date: [...], value: [...], abs_value: [...], ...}.
+    """
+    if not values:
+        return {}
+    return {key: [v[key] for v in values] for key in values[0]}
 
 
 def compute_portfolio_performance(portfolio_name, _skip_cache=False):
     if not _skip_cache:
         return get_cached_portfolio_performance(portfolio_name)
-    from db.database import get_transactions  # Local import to avoid circular import
     """
     Compute the historical portfolio value over time, using each ticker's historical price and the portfolio's transaction history.
     Returns a list of dicts: [{date: ..., value: ..., abs_value: ..., pct: ..., pct_from_first: ...}, ...]
     'value' is the absolute value, 'pct' is the performance % relative to the cost basis (total invested up to that date).
     'pct_from_first' is the % change from the first abs_value (start of series).
     """
-    txs = get_transactions(portfolio_name)
+    txs = _cached_transactions(portfolio_name)
     if not txs:
         return []
     df_txs = pd.DataFrame(txs)
     if df_txs.empty or 'date' not in df_txs.columns or 'ticker' not in df_txs.columns or 'quantity' not in df_txs.columns or 'price' not in df_txs.columns:
         return []
-    df_txs['date'] = pd.to_datetime(df_txs['date'])
+    df_txs['date'] = _parse_transaction_dates(df_txs['date'])
     tickers = df_txs['ticker'].unique()
-    all_dates = set()
-    ticker_histories = {}
-    for ticker in tickers:
-        hist = get_ticker_history(ticker)
-        if not hist:
-            data, _ = data_fetcher.fetch_with_cache(ticker)
-            history = (data or {}).get('history', [])
-            if history:
-                save_ticker_data(ticker, data)
-                hist = get_ticker_history(ticker)
-        if not hist:
-            continue
-        df_hist = pd.DataFrame(hist)
-        if df_hist.empty or 'date' not in df_hist.columns or 'close' not in df_hist.columns:
-            continue
-        df_hist['date'] = pd.to_datetime(df_hist['date'])
-        df_hist.set_index('date', inplace=True)
-        ticker_histories[ticker] = df_hist['close']
-        all_dates.update(df_hist.index)
+    ticker_histories = _load_ticker_histories(tickers)
     if not ticker_histories:
         return []
     # --- Fill date gaps: create a complete date range from min to max date ---
-    if all_dates:
-        min_date = min(all_dates)
-        max_date = max(all_dates)
-        all_dates = pd.date_range(start=min_date, end=max_date, freq='D')
-    else:
-        all_dates = []
-    values = []
-    first_abs_value = None
-    for date in all_dates:
-        total_value = 0.0
-        total_cost = 0.0
-        total_abs_value = 0.0
-        for ticker in tickers:
-            txs_ticker = df_txs[(df_txs['ticker'] == ticker) & (df_txs['date'] <= date)]
-            qty = txs_ticker['quantity'].sum() if not txs_ticker.empty else 0.0
-            # Cost basis: sum of all buy transactions up to this date
-            cost = txs_ticker[txs_ticker['quantity'] > 0]
-            cost_sum = (cost['quantity'] * cost['price']).sum() if not cost.empty else 0.0
-            total_cost += cost_sum
-            price = ticker_histories.get(ticker, pd.Series()).get(date, None)
-            if price is None:
-                price = ticker_histories.get(ticker, pd.Series()).loc[:date].ffill().iloc[-1] if not ticker_histories.get(ticker, pd.Series()).loc[:date].empty else 0.0
-            abs_value = qty * (price if price is not None else 0.0)
-            net_value = abs_value - cost_sum
-            total_value += net_value
-            total_abs_value += abs_value
-        pct = ((total_value) / total_cost * 100) if total_cost else 0.0
-        if first_abs_value is None and total_abs_value != 0.0:
-            first_abs_value = total_abs_value
-        pct_from_first = ((total_abs_value - first_abs_value) / first_abs_value * 100) if first_abs_value else 0.0
-        values.append({'date': date.strftime('%Y-%m-%d'), 'value': total_value, 'abs_value': total_abs_value, 'pct': pct, 'pct_from_first': pct_from_first})
+    min_date = min(close.index.min() for close in ticker_histories.values())
+    max_date = max(close.index.max() for close in ticker_histories.values())
+    all_dates = pd.date_range(start=min_date, end=max_date, freq='D')
+    # Dates x tickers matrices of held quantity, cost basis (buys only) and price
+    txs = df_txs[df_txs['ticker'].notna()]
+    columns = pd.Index(tickers).get_indexer(txs['ticker'])
+    quantity = txs['quantity'].to_numpy(dtype=float)
+    buys = quantity > 0
+    qty = _cumulative_matrix(txs['date'], columns, quantity, all_dates, len(tickers))
+    cost_sums = _cumulative_matrix(txs['date'][buys], columns[buys],
+                                   quantity[buys] * txs['price'].to_numpy(dtype=float)[buys],
+                                   all_dates, len(tickers))
+    prices = np.zeros((len(all_dates), len(tickers)))
+    for j, ticker in enumerate(tickers):
+        if ticker in ticker_histories:
+            prices[:, j] = _aligned_prices(ticker_histories[ticker], all_dates)
+    abs_values = qty * prices
+    total_abs_values = abs_values.sum(axis=1)
+    total_costs = cost_sums.sum(axis=1)
+    total_values = (abs_values - cost_sums).sum(axis=1)
+    pct = _safe_pct(total_values, total_costs)
+    pct_from_first = _pct_from_first_nonzero(total_abs_values)
+    values = [
+        {'date': d, 'value': v, 'abs_value': a, 'pct': p, 'pct_from_first': pf}
+        for d, v, a, p, pf in zip(_format_dates(all_dates), total_values.tolist(), total_abs_values.tolist(), pct.tolist(), pct_from_first.tolist())
+    ]
+    del df_txs, ticker_histories, qty, cost_sums, prices, abs_values
+    _maybe_collect()
     return values
 
 
 def compute_ticker_performance(portfolio_name, ticker, start_date=None, _skip_cache=False):
     if not _skip_cache:
         return get_cached_ticker_performance(portfolio_name, ticker, start_date)
-    from db.database import get_transactions  # Local import to avoid circular import
     """
     Compute the historical value of a single ticker in a portfolio over time, using its transaction history and price history.
     Returns a list of dicts: [{date: ..., value: ..., abs_value: ..., pct: ..., pct_from_start: ...}, ...]
@@ -233,67 +504,88 @@ def compute_ticker_performance(portfolio_name, ticker, start_date=None, _skip_ca
     'pct_from_start' is the % change from the abs_value at the start_date (or first date if not provided).
     The first entry in the returned list will always have pct_from_start = 0.
     """
-    txs = [t for t in get_transactions(portfolio_name) if t.get('ticker') == ticker]
+    txs = [t for t in _cached_transactions(portfolio_name) if t.get('ticker') == ticker]
     if not txs:
         return []
-    import pandas as pd
+    return compute_ticker_performance_from_df(ticker, pd.DataFrame(txs), start_date)
+
+
+def compute_multi_ticker_performance(portfolio_name, tickers=None, start_date=None, _skip_cache=False):
+    """
+    Compute compute_ticker_performance for several tickers of a portfolio, loading the transactions only once.
+    If tickers is None, all tickers with transactions in the portfolio are computed.
+    Returns a dict: {ticker: [{date: ..., value: ..., abs_value: ..., pct: ..., pct_from_start: ...}, ...], ...}
+    """
+    if not _skip_cache:
+        return get_cached_multi_ticker_performance(portfolio_name, tickers, start_date)
+    txs = _cached_transactions(portfolio_name)
+    if not txs:
+        return {t: [] for t in tickers or []}
     df_txs = pd.DataFrame(txs)
-    if df_txs.empty or 'date' not in df_txs.columns or 'quantity' not in df_txs.columns or 'price' not in df_txs.columns:
+    if df_txs.empty or 'ticker' not in df_txs.columns or 'date' not in df_txs.columns:
+        return {t: [] for t in tickers or []}
+    df_txs['date'] = _parse_transaction_dates(df_txs['date'])
+    txs_by_ticker = {t: g for t, g in df_txs.groupby('ticker', sort=False) if t}
+    if tickers is None:
+        tickers = list(txs_by_ticker)
+    result = {}
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        future_to_ticker = {
+            executor.submit(compute_ticker_performance_from_df, t, txs_by_ticker[t], start_date): t
+            for t in tickers if t in txs_by_ticker
+        }
+        for future in as_completed(future_to_ticker):
+            ticker = future_to_ticker[future]
+            try:
+                result[ticker] = future.result()
+            except Exception:
+                logger.exception("[compute_multi_ticker_performance] Error computing performance for ticker %s", ticker)
+                result[ticker] = []
+    return {t: result.get(t, []) for t in tickers}
+
+
+def compute_ticker_performance_from_df(ticker, df_txs, start_date=None):
+    """
+    Same as compute_ticker_performance, but works on a DataFrame already holding the transactions of this ticker only.
+    """
+    if df_txs is None or df_txs.empty or 'date' not in df_txs.columns or 'quantity' not in df_txs.columns or 'price' not in df_txs.columns:
         return []
-    df_txs['date'] = pd.to_datetime(df_txs['date'])
-    hist = get_ticker_history(ticker)
-    if not hist:
-        data, _ = data_fetcher.fetch_with_cache(ticker)
-        history = (data or {}).get('history', [])
-        if history:
-            save_ticker_data(ticker, data)
-            hist = get_ticker_history(ticker)
+    if not pd.api.types.is_datetime64_any_dtype(df_txs['date']):
+        df_txs['date'] = _parse_transaction_dates(df_txs['date'])
+    hist = _get_or_fetch_ticker_history(ticker)
     if not hist:
         return []
     df_hist = pd.DataFrame(hist)
     if df_hist.empty or 'date' not in df_hist.columns or 'close' not in df_hist.columns:
         return []
-    df_hist['date'] = pd.to_datetime(df_hist['date'])
+    df_hist['date'] = _parse_history_dates(df_hist['date'])
     df_hist.set_index('date', inplace=True)
-    all_dates = sorted(df_hist.index)
+    history_dates = df_hist.index
     # Filter dates if start_date is provided
     if start_date is not None:
-        start_dt = pd.to_datetime(start_date)
-        all_dates = [d for d in all_dates if d >= start_dt]
-        if not all_dates:
+        history_dates = history_dates[history_dates >= _parse_date(start_date)]
+        if history_dates.empty:
             return []  # No data on or after start_date
     # --- Fill date gaps: create a complete date range from min to max date ---
-    if all_dates:
-        min_date = min(all_dates)
-        max_date = max(all_dates)
-        all_dates = pd.date_range(start=min_date, end=max_date, freq='D')
-    else:
-        all_dates = []
-    values = []
-    abs_value_at_start = None
-    for idx, date in enumerate(all_dates):
-        qty = df_txs[df_txs['date'] <= date]['quantity'].sum() if not df_txs.empty else 0.0
-        # Cost basis: sum of all buy transactions up to this date
-        cost = df_txs[(df_txs['date'] <= date) & (df_txs['quantity'] > 0)]
-        cost_sum = (cost['quantity'] * cost['price']).sum() if not cost.empty else 0.0
-        price = df_hist['close'].get(date, None)
-        if price is None:
-            price = df_hist['close'].loc[:date].ffill().iloc[-1] if not df_hist['close'].loc[:date].empty else 0.0
-        abs_value = qty * (price if price is not None else 0.0)
-        net_value = abs_value - cost_sum
-        pct = (net_value / cost_sum * 100) if cost_sum else 0.0
-        # Set abs_value_at_start to the first nonzero abs_value in the filtered range
-        if idx == 0:
-            abs_value_at_start = abs_value
-        # pct_from_start: always 0 for the first entry, else normal calculation (guard for zero)
-        if idx == 0:
-            pct_from_start = 0.0
-        else:
-            if abs_value_at_start:
-                pct_from_start = ((abs_value - abs_value_at_start) / abs_value_at_start * 100)
-            else:
-                pct_from_start = 0.0
-        values.append({'date': date.strftime('%Y-%m-%d'), 'value': net_value, 'abs_value': abs_value, 'pct': pct, 'pct_from_start': pct_from_start})
+    all_dates = pd.date_range(start=history_dates.min(), end=history_dates.max(), freq='D')
+    prices = _aligned_prices(df_hist['close'], all_dates)
+    # Held quantity and cost basis (buys only) as of each date, from cumulative sums over the transactions
+    qty = _cumulative_at(df_txs['date'], df_txs['quantity'], all_dates)
+    buys = df_txs[df_txs['quantity'] > 0]
+    cost_sums = _cumulative_at(buys['date'], buys['quantity'] * buys['price'], all_dates)
+    abs_values = qty * prices
+    net_values = abs_values - cost_sums
+    pct = _safe_pct(net_values, cost_sums)
+    # pct_from_start: % change from the abs_value of the first entry, always 0 for the first entry (guard for zero)
+    pct_from_start = np.zeros_like(abs_values)
+    if len(abs_values) > 1:
+        pct_from_start[1:] = _safe_pct(abs_values[1:] - abs_values[0], abs_values[0])
+    values = [
+        {'date': d, 'value': v, 'abs_value': a, 'pct': p, 'pct_from_start': ps}
+        for d, v, a, p, ps in zip(_format_dates(all_dates), net_values.tolist(), abs_values.tolist(), pct.tolist(), pct_from_start.tolist())
+    ]
+    del df_txs, df_hist, prices
+    _maybe_collect()
     return values
 
 
@@ -303,61 +595,34 @@ def compute_benchmark_performance(ticker):
     Returns a list of dicts: [{date: ..., value: ..., abs_value: ..., pct: ..., pct_from_first: ...}, ...]
     'value' and 'abs_value' are the same (no cost basis), 'pct' is percent change from the first value, 'pct_from_first' is also percent change from the first value (for frontend consistency).
     """
-    hist = get_ticker_history(ticker)
-    if not hist:
-        data, _ = data_fetcher.fetch_with_cache(ticker)
-        history = (data or {}).get('history', [])
-        if history:
-            save_ticker_data(ticker, data)
-            hist = get_ticker_history(ticker)
-    if not hist:
-        return []
-    df_hist = pd.DataFrame(hist)
-    if df_hist.empty or 'date' not in df_hist.columns or 'close' not in df_hist.columns:
+    _, close = _load_ticker_series(ticker)
+    if close is None:
         return []
-    df_hist['date'] = pd.to_datetime(df_hist['date'])
-    df_hist.set_index('date', inplace=True)
-    all_dates = sorted(df_hist.index)
     # --- Fill date gaps: create a complete date range from min to max date ---
-    if all_dates:
-        min_date = min(all_dates)
-        max_date = max(all_dates)
-        all_dates = pd.date_range(start=min_date, end=max_date, freq='D')
-    else:
-        all_dates = []
-    values = []
-    first_value = None
-    for date in all_dates:
-        price = df_hist['close'].get(date, None)
-        if price is None:
-            price = df_hist['close'].loc[:date].ffill().iloc[-1] if not df_hist['close'].loc[:date].empty else 0.0
-        abs_value = price if price is not None else 0.0
-        if first_value is None and abs_value != 0.0:
-            first_value = abs_value
-        pct = ((abs_value - first_value) / first_value * 100) if first_value else 0.0
-        pct_from_first = pct  # For consistency with portfolio performance
-        values.append({'date': date.strftime('%Y-%m-%d'), 'value': abs_value, 'abs_value': abs_value, 'pct': pct, 'pct_from_first': pct_from_first})
-    return values
+    all_dates = pd.date_range(start=close.index.min(), end=close.index.max(), freq='D')
+    abs_values = _aligned_prices(close, all_dates)
+    pct = _pct_from_first_nonzero(abs_values).tolist()
+    abs_values = abs_values.tolist()
+    # pct_from_first equals pct, for consistency with portfolio performance
+    return [
+        {'date': d, 'value': a, 'abs_value': a, 'pct': p, 'pct_from_first': p}
+        for d, a, p in zip(_format_dates(all_dates), abs_values, pct)
+    ]
 
 
 def get_overall_asset_allocation(portfolio_name):
     """
     Returns a list of dicts: [{ticker, value, quantity, name, allocation_pct} ...] for all tickers in the portfolio, with their current value, quantity, and allocation as a percentage of total portfolio value.
     """
-    from db.database import get_transactions  # Local import to avoid circular import
-    txs = get_transactions(portfolio_name)
-    positions = aggregate_positions(txs)
+    txs, positions = _cached_positions(portfolio_name)
     allocation = []
-    conn = sqlite3.connect(DATABASE_NAME)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+    infos = get_ticker_info_many([t for t, qty in positions.items() if qty != 0], ['regularMarketPrice', 'shortName'])
     total_value = 0.0
     temp_alloc = []
     for ticker, qty in positions.items():
         if qty == 0:
             continue
-        cursor.execute('SELECT regularMarketPrice, shortName FROM ticker_info WHERE ticker = ?', (ticker,))
-        row = cursor.fetchone()
+        row = infos.get(ticker)
         price = row['regularMarketPrice'] if row and row['regularMarketPrice'] is not None else 0
         name = row['shortName'] if row and row['shortName'] else ticker
         value = price * qty
@@ -373,7 +638,6 @@ def get_overall_asset_allocation(portfolio_name):
         allocation_pct = (item['value'] / total_value * 100) if total_value else 0.0
         item['allocation_pct'] = allocation_pct
         allocation.append(item)
-    conn.close()
     return allocation
 
 
@@ -382,32 +646,24 @@ def get_asset_allocation_by_quote_type(portfolio_name):
     Returns a dict: {quoteType: allocation_percentage, ...} for all tickers in the portfolio, using quoteType from ticker_info.
     The allocation is the percentage of each quoteType's value over the total portfolio value.
     """
-    from db.database import get_transactions  # Local import to avoid circular import
-    txs = get_transactions(portfolio_name)
-    positions = aggregate_positions(txs)
-    allocation = {}
-    conn = sqlite3.connect(DATABASE_NAME)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    total_value = 0.0
-    temp = {}
+    txs, positions = _cached_positions(portfolio_name)
+    infos = get_ticker_info_many([t for t, qty in positions.items() if qty != 0], ['regularMarketPrice', 'quoteType'])
+    rows = []
     for ticker, qty in positions.items():
         if qty == 0:
             continue
-        cursor.execute('SELECT regularMarketPrice, quoteType FROM ticker_info WHERE ticker = ?', (ticker,))
-        row = cursor.fetchone()
+        row = infos.get(ticker)
         price = row['regularMarketPrice'] if row and row['regularMarketPrice'] is not None else 0
         quote_type = row['quoteType'] if row and row['quoteType'] else 'Unknown'
-        value = price * qty
-        total_value += value
-        if quote_type not in temp:
-            temp[quote_type] = 0.0
-        temp[quote_type] += value
-    # Now calculate allocation percentage for each quoteType
-    for quote_type, value in temp.items():
-        allocation[quote_type] = (value / total_value * 100) if total_value else 0.0
-    conn.close()
-    return allocation
+        rows.append({'quoteType': quote_type, 'value': price * qty})
+    if not rows:
+        return {}
+    # Sum values per quoteType (in order of first appearance), then take each share of the total
+    values = pd.DataFrame(rows).groupby('quoteType', sort=False)['value'].sum()
+    total_value = values.sum()
+    if not total_value:
+        return dict.fromkeys(values.index, 0.0)
+    return (values / total_value * 100).to_dict()
 
 
 def compute_returns_since(portfolio_name, start_date):
@@ -419,89 +675,77 @@ def compute_returns_since(portfolio_name, start_date):
         'tickers': { ticker: { 'start_value': ..., 'end_value': ..., 'return_pct': ... }, ... }
     }
     """
-    from db.database import get_transactions  # Local import to avoid circular import
-    import pandas as pd
-    txs = get_transactions(portfolio_name)
-    if not txs:
+    loaded = _load_returns_inputs(portfolio_name)
+    if loaded is None:
         return {'portfolio': None, 'tickers': {}}
+    df_txs, tickers, ticker_histories = loaded
+    result = _compute_returns_from_loaded(df_txs, tickers, ticker_histories, start_date)
+    del df_txs, ticker_histories, loaded
+    _maybe_collect()
+    return result
+
+
+def _load_returns_inputs(portfolio_name):
+    """
+    Load the inputs of compute_returns_since: (df_txs, tickers, ticker_histories),
+    or None if the portfolio has no usable transactions or price histories.
+    """
+    txs = _cached_transactions(portfolio_name)
+    if not txs:
+        return None
     df_txs = pd.DataFrame(txs)
     if df_txs.empty or 'date' not in df_txs.columns or 'ticker' not in df_txs.columns or 'quantity' not in df_txs.columns or 'price' not in df_txs.columns:
-        return {'portfolio': None, 'tickers': {}}
-    df_txs['date'] = pd.to_datetime(df_txs['date'])
+        return None
+    df_txs['date'] = _parse_transaction_dates(df_txs['date'])
     tickers = df_txs['ticker'].unique()
-    ticker_histories = {}
-    for ticker in tickers:
-        hist = get_ticker_history(ticker)
-        if not hist:
-            data, _ = data_fetcher.fetch_with_cache(ticker)
-            history = (data or {}).get('history', [])
-            if history:
-                save_ticker_data(ticker, data)
-                hist = get_ticker_history(ticker)
-        if not hist:
-            continue
-        df_hist = pd.DataFrame(hist)
-        if df_hist.empty or 'date' not in df_hist.columns or 'close' not in df_hist.columns:
-            continue
-        df_hist['date'] = pd.to_datetime(df_hist['date'])
-        df_hist.set_index('date', inplace=True)
-        ticker_histories[ticker] = df_hist['close']
+    ticker_histories = _load_ticker_histories(tickers)
     if not ticker_histories:
+        return None
+    return df_txs, tickers, ticker_histories
+
+
+def _compute_returns_from_loaded(df_txs, tickers, ticker_histories, start_date):
+    """Same as compute_returns_since, on inputs already loaded by _load_returns_inputs."""
+    # Snap start/end on the sorted union of all history dates
+    master = _union_dates(ticker_histories)
+    start_pos = master.searchsorted(_parse_date(start_date))
+    if start_pos >= len(master):
         return {'portfolio': None, 'tickers': {}}
-    # Find all dates in the range
-    all_dates = set()
-    for s in ticker_histories.values():
-        all_dates.update(s.index)
-    all_dates = sorted([d for d in all_dates if d >= pd.to_datetime(start_date)])
-    if not all_dates:
-        return {'portfolio': None, 'tickers': {}}
-    start_dt = all_dates[0]
-    end_dt = all_dates[-1]
+    start_dt = master[start_pos]
+    end_dt = master[-1]
+    snapshots = pd.DatetimeIndex([start_dt, end_dt])
+    # Snapshots x tickers matrices of held quantity and price
+    qty = np.zeros((2, len(tickers)))
+    prices = np.zeros((2, len(tickers)))
+    has_txs = np.zeros(len(tickers), dtype=bool)
+    txs_by_ticker = dict(tuple(df_txs.groupby('ticker', sort=False)))
+    for j, ticker in enumerate(tickers):
+        txs_ticker = txs_by_ticker.get(ticker)
+        if txs_ticker is not None:
+            qty[:, j] = _cumulative_at(txs_ticker['date'], txs_ticker['quantity'], snapshots)
+            has_txs[j] = (txs_ticker['date'] <= end_dt).any()
+        if ticker in ticker_histories:
+            prices[:, j] = _aligned_prices(ticker_histories[ticker], snapshots)
+    values = qty * prices
     # Portfolio values
-    def get_portfolio_value(dt):
-        total = 0.0
-        for ticker in tickers:
-            txs_ticker = df_txs[(df_txs['ticker'] == ticker) & (df_txs['date'] <= dt)]
-            qty = txs_ticker['quantity'].sum() if not txs_ticker.empty else 0.0
-            price = ticker_histories.get(ticker, pd.Series()).get(dt, None)
-            if price is None:
-                price = ticker_histories.get(ticker, pd.Series()).loc[:dt].ffill().iloc[-1] if not ticker_histories.get(ticker, pd.Series()).loc[:dt].empty else 0.0
-            total += qty * (price if price is not None else 0.0)
-        return total
-    start_value = get_portfolio_value(start_dt)
-    end_value = get_portfolio_value(end_dt)
-    portfolio_return = ((end_value - start_value) / start_value * 100) if start_value else 0.0
+    start_value, end_value = values.sum(axis=1)
+    portfolio_return = _safe_pct(end_value - start_value, start_value)[()]
+    return_pcts = _safe_pct(values[1] - values[0], values[0])
     # Per-ticker values
     ticker_returns = {}
-    for ticker in tickers:
-        txs_ticker = df_txs[(df_txs['ticker'] == ticker) & (df_txs['date'] <= end_dt)]
-        if txs_ticker.empty:
+    infos = get_ticker_info_many(tickers, ['shortName'])
+    for j, ticker in enumerate(tickers):
+        if not has_txs[j]:
             continue
-        qty_start = df_txs[(df_txs['ticker'] == ticker) & (df_txs['date'] <= start_dt)]['quantity'].sum() if not df_txs.empty else 0.0
-        qty_end = txs_ticker['quantity'].sum() if not txs_ticker.empty else 0.0
-        price_start = ticker_histories.get(ticker, pd.Series()).get(start_dt, None)
-        if price_start is None:
-            price_start = ticker_histories.get(ticker, pd.Series()).loc[:start_dt].ffill().iloc[-1] if not ticker_histories.get(ticker, pd.Series()).loc[:start_dt].empty else 0.0
-        price_end = ticker_histories.get(ticker, pd.Series()).get(end_dt, None)
-        if price_end is None:
-            price_end = ticker_histories.get(ticker, pd.Series()).loc[:end_dt].ffill().iloc[-1] if not ticker_histories.get(ticker, pd.Series()).loc[:end_dt].empty else 0.0
-        start_val = qty_start * (price_start if price_start is not None else 0.0)
-        end_val = qty_end * (price_end if price_end is not None else 0.0)
-        ticker_return = ((end_val - start_val) / start_val * 100) if start_val else 0.0
+        start_val, end_val = values[:, j]
         # Get ticker name from ticker_info
-        import sqlite3
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        cursor.execute('SELECT shortName, ticker FROM ticker_info WHERE ticker = ?', (ticker,))
-        row = cursor.fetchone()
-        ticker_name = row[0] if row and row[0] else ticker
-        ticker = row[1] if row and row[1] else ticker
-        conn.close()
+        row = infos.get(ticker)
+        ticker_name = row['shortName'] if row and row['shortName'] else ticker
         ticker_returns[ticker] = {
             'ticker_name': ticker_name,
             'start_value': start_val,
             'end_value': end_val,
-            'return_pct': ticker_return
+            'return_pct': return_pcts[j]
         }
     return {
         'portfolio': {
@@ -513,64 +757,70 @@ def compute_returns_since(portfolio_name, start_date):
     }
 
 # Helper functions for common periods
+_PERIOD_DAYS = {'three_days': 3, 'weekly': 7, 'monthly': 30, 'three_month': 90, 'one_year': 365}
+
+
+def _period_start_date(period):
+    """Start date (YYYY-MM-DD) of a period ending today: one of _PERIOD_DAYS or 'ytd'."""
+    today = pd.Timestamp.today().normalize()
+    if period == 'ytd':
+        start = pd.Timestamp(year=today.year, month=1, day=1)
+    else:
+        start = today - pd.Timedelta(days=_PERIOD_DAYS[period])
+    return start.strftime('%Y-%m-%d')
+
+
+def get_period_returns_bundle(portfolio_name):
+    """
+    Compute the portfolio and per-ticker returns of every dashboard period, loading transactions and histories once.
+    Returns a dict: {'yesterday': ..., 'three_days': ..., 'weekly': ..., 'monthly': ..., 'three_month': ..., 'ytd': ..., 'one_year': ...}
+    where each value is what the matching get_*_returns helper returns.
+    """
+    periods = ['three_days', 'weekly', 'monthly', 'three_month', 'ytd', 'one_year']
+    loaded = _load_returns_inputs(portfolio_name)
+    if loaded is None:
+        return {period: {'portfolio': None, 'tickers': {}} for period in ['yesterday'] + periods}
+    df_txs, tickers, ticker_histories = loaded
+    all_dates = _union_dates(ticker_histories)
+    bundle = {}
+    # 'yesterday' starts at the second-to-last date with a price, like get_last_day_possible_returns
+    if len(all_dates) < 2:
+        bundle['yesterday'] = {'portfolio': None, 'tickers': {}}
+    else:
+        bundle['yesterday'] = _compute_returns_from_loaded(df_txs, tickers, ticker_histories, all_dates[-2].strftime('%Y-%m-%d'))
+    for period in periods:
+        bundle[period] = _compute_returns_from_loaded(df_txs, tickers, ticker_histories, _period_start_date(period))
+    del df_txs, ticker_histories, loaded
+    _maybe_collect()
+    return bundle
+
+
 def get_last_day_possible_returns(portfolio_name):
-    from db.database import get_transactions  # Local import to avoid circular import
-    import pandas as pd
-    txs = get_transactions(portfolio_name)
+    txs = _cached_transactions(portfolio_name)
     if not txs:
         return {'portfolio': None, 'tickers': {}}
     df_txs = pd.DataFrame(txs)
     if df_txs.empty or 'ticker' not in df_txs.columns:
         return {'portfolio': None, 'tickers': {}}
     tickers = df_txs['ticker'].unique()
-    all_dates = set()
-    for ticker in tickers:
-        hist = get_ticker_history(ticker)
-        if not hist:
-            data, _ = data_fetcher.fetch_with_cache(ticker)
-            history = (data or {}).get('history', [])
-            if history:
-                save_ticker_data(ticker, data)
-                hist = get_ticker_history(ticker)
-        if not hist:
-            continue
-        df_hist = pd.DataFrame(hist)
-        if df_hist.empty or 'date' not in df_hist.columns:
-            continue
-        df_hist['date'] = pd.to_datetime(df_hist['date'])
-        all_dates.update(df_hist['date'].tolist())
-    if not all_dates:
-        return {'portfolio': None, 'tickers': {}}
-    all_dates_sorted = sorted(all_dates)
-    if len(all_dates_sorted) < 2:
+    all_dates = _union_dates(_load_ticker_histories(tickers))
+    if len(all_dates) < 2:
         return {'portfolio': None, 'tickers': {}}
     # Use the second-to-last date as the start date
-    start_day = all_dates_sorted[-2]
+    start_day = all_dates[-2]
     return compute_returns_since(portfolio_name, start_day.strftime('%Y-%m-%d'))
 
 def get_weekly_returns(portfolio_name):
-    import pandas as pd
-    today = pd.Timestamp.today().normalize()
-    week_ago = today - pd.Timedelta(days=7)
-    return compute_returns_since(portfolio_name, week_ago.strftime('%Y-%m-%d'))
+    return compute_returns_since(portfolio_name, _period_start_date('weekly'))
 
 def get_monthly_returns(portfolio_name):
-    import pandas as pd
-    today = pd.Timestamp.today().normalize()
-    month_ago = today - pd.Timedelta(days=30)
-    return compute_returns_since(portfolio_name, month_ago.strftime('%Y-%m-%d'))
+    return compute_returns_since(portfolio_name, _period_start_date('monthly'))
 
 def get_three_month_returns(portfolio_name):
-    import pandas as pd
-    today = pd.Timestamp.today().normalize()
-    three_months_ago = today - pd.Timedelta(days=90)
-    return compute_returns_since(portfolio_name, three_months_ago.strftime('%Y-%m-%d'))
+    return compute_returns_since(portfolio_name, _period_start_date('three_month'))
 
 def get_ytd_returns(portfolio_name):
-    import pandas as pd
-    today = pd.Timestamp.today().normalize()
-    ytd = pd.Timestamp(year=today.year, month=1, day=1)
-    return compute_returns_since(portfolio_name, ytd.strftime('%Y-%m-%d'))
+    return compute_returns_since(portfolio_name, _period_start_date('ytd'))
 
 def get_one_year_return(portfolio_name):
     """
@@ -581,94 +831,66 @@ def get_one_year_return(portfolio_name):
         'tickers': { ticker: { 'start_value': ..., 'end_value': ..., 'return_pct': ... }, ... }
     }
     """
-    today = pd.Timestamp.today().normalize()
-    one_year_ago = today - pd.Timedelta(days=365)
-    return compute_returns_since(portfolio_name, one_year_ago.strftime('%Y-%m-%d'))
+    return compute_returns_since(portfolio_name, _period_start_date('one_year'))
 
 def get_ticker_returns_since(portfolio_name, ticker, start_date):
-    from db.database import get_transactions  # Local import to avoid circular import
-    import pandas as pd
-    txs = [t for t in get_transactions(portfolio_name) if t.get('ticker') == ticker]
+    txs = [t for t in _cached_transactions(portfolio_name) if t.get('ticker') == ticker]
     if not txs:
         return None
     df_txs = pd.DataFrame(txs)
     if df_txs.empty or 'date' not in df_txs.columns or 'quantity' not in df_txs.columns or 'price' not in df_txs.columns:
         return None
-    df_txs['date'] = pd.to_datetime(df_txs['date'])
-    hist = get_ticker_history(ticker)
-    if not hist:
-        data, _ = data_fetcher.fetch_with_cache(ticker)
-        history = (data or {}).get('history', [])
-        if history:
-            save_ticker_data(ticker, data)
-            hist = get_ticker_history(ticker)
+    df_txs['date'] = _parse_transaction_dates(df_txs['date'])
+    hist = _get_or_fetch_ticker_history(ticker)
     if not hist:
         return None
     df_hist = pd.DataFrame(hist)
     if df_hist.empty or 'date' not in df_hist.columns or 'close' not in df_hist.columns:
         return None
-    df_hist['date'] = pd.to_datetime(df_hist['date'])
+    df_hist['date'] = _parse_history_dates(df_hist['date'])
     df_hist.set_index('date', inplace=True)
-    all_dates = sorted([d for d in df_hist.index if d >= pd.to_datetime(start_date)])
-    if not all_dates:
+    close = df_hist['close'].sort_index()
+    start_pos = close.index.searchsorted(_parse_date(start_date))
+    if start_pos >= len(close.index):
         return None
-    start_dt = all_dates[0]
-    end_dt = all_dates[-1]
-    qty_start = df_txs[df_txs['date'] <= start_dt]['quantity'].sum() if not df_txs.empty else 0.0
-    qty_end = df_txs[df_txs['date'] <= end_dt]['quantity'].sum() if not df_txs.empty else 0.0
-    price_start = df_hist['close'].get(start_dt, None)
-    if price_start is None:
-        price_start = df_hist['close'].loc[:start_dt].ffill().iloc[-1] if not df_hist['close'].loc[:start_dt].empty else 0.0
-    price_end = df_hist['close'].get(end_dt, None)
-    if price_end is None:
-        price_end = df_hist['close'].loc[:end_dt].ffill().iloc[-1] if not df_hist['close'].loc[:end_dt].empty else 0.0
-    start_val = qty_start * (price_start if price_start is not None else 0.0)
-    end_val = qty_end * (price_end if price_end is not None else 0.0)
-    ticker_return = ((end_val - start_val) / start_val * 100) if start_val else 0.0
+    snapshots = pd.DatetimeIndex([close.index[start_pos], close.index[-1]])
+    qty_start, qty_end = _cumulative_at(df_txs['date'], df_txs['quantity'], snapshots)
+    price_start, price_end = _aligned_prices(close, snapshots)
+    start_val = qty_start * price_start
+    end_val = qty_end * price_end
     return {
         'start_value': start_val,
         'end_value': end_val,
-        'return_pct': ticker_return
+        'return_pct': _safe_pct(end_val - start_val, start_val)[()]
     }
 
 def get_ticker_last_day_possible_returns(portfolio_name, ticker):
-    import pandas as pd
-    hist = get_ticker_history(ticker)
-    if not hist:
-        data, _ = data_fetcher.fetch_with_cache(ticker)
-        history = (data or {}).get('history', [])
-        if history:
-            save_ticker_data(ticker, data)
-            hist = get_ticker_history(ticker)
+    hist = _get_or_fetch_ticker_history(ticker)
     if not hist:
         return None
     df_hist = pd.DataFrame(hist)
     if df_hist.empty or 'date' not in df_hist.columns:
         return None
-    df_hist['date'] = pd.to_datetime(df_hist['date'])
+    df_hist['date'] = _parse_history_dates(df_hist['date'])
     last_day = df_hist['date'].max()
     return get_ticker_returns_since(portfolio_name, ticker, last_day.strftime('%Y-%m-%d'))
 
 def get_ticker_weekly_returns(portfolio_name, ticker):
-    import pandas as pd
     today = pd.Timestamp.today().normalize()
     week_ago = today - pd.Timedelta(days=7)
     return get_ticker_returns_since(portfolio_name, ticker, week_ago.strftime('%Y-%m-%d'))
 
 def get_ticker_monthly_returns(portfolio_name, ticker):
-    import pandas as pd
     today = pd.Timestamp.today().normalize()
     month_ago = today - pd.Timedelta(days=30)
     return get_ticker_returns_since(portfolio_name, ticker, month_ago.strftime('%Y-%m-%d'))
 
 def get_ticker_three_month_returns(portfolio_name, ticker):
-    import pandas as pd
     today = pd.Timestamp.today().normalize()
     three_months_ago = today - pd.Timedelta(days=90)
     return get_ticker_returns_since(portfolio_name, ticker, three_months_ago.strftime('%Y-%m-%d'))
 
 def get_ticker_ytd_returns(portfolio_name, ticker):
-    import pandas as pd
     today = pd.Timestamp.today().normalize()
     ytd = pd.Timestamp(year=today.year, month=1, day=1)
     return get_ticker_returns_since(portfolio_name, ticker, ytd.strftime('%Y-%m-%d'))
@@ -682,10 +904,7 @@ def get_last_three_days_returns(portfolio_name):
         'tickers': { ticker: { 'ticker_name': ..., 'start_value': ..., 'end_value': ..., 'return_pct': ... }, ... }
     }
     """
-    import pandas as pd
-    today = pd.Timestamp.today().normalize()
-    three_days_ago = today - pd.Timedelta(days=3)
-    return compute_returns_since(portfolio_name, three_days_ago.strftime('%Y-%m-%d'))
+    return compute_returns_since(portfolio_name, _period_start_date('three_days'))
 
 def get_ticker_three_days_returns(portfolio_name, ticker):
     """
@@ -693,7 +912,6 @@ def get_ticker_three_days_returns(portfolio_name, ticker):
     Returns a dict:
         { 'start_value': ..., 'end_value': ..., 'return_pct': ... }
     """
-    import pandas as pd
     today = pd.Timestamp.today().normalize()
     three_days_ago = today - pd.Timedelta(days=3)
     return get_ticker_returns_since(portfolio_name, ticker, three_days_ago.strftime('%Y-%m-%d'))
@@ -708,8 +926,6 @@ def compute_volatility(returns, window=None):
         If period is None: float (annualized volatility for the whole period)
         If period is int: pandas Series of rolling annualized volatility
     """
-    import numpy as np
-    import pandas as pd
     if not isinstance(returns, pd.Series):
         returns = pd.Series(returns)
     # Drop NaN values
@@ -729,7 +945,6 @@ def compute_portfolio_volatility_1d(portfolio_name):
     Returns a pandas Series of daily annualized volatility values.
     """
     perf = compute_portfolio_performance(portfolio_name)
-    import pandas as pd
     if not perf or len(perf) < 2:
         return pd.Series(dtype=float)
     df = pd.DataFrame(perf)
@@ -745,7 +960,6 @@ def compute_portfolio_volatility(portfolio_name):
     Returns a float value (annualized volatility).
     """
     perf = compute_portfolio_performance(portfolio_name)
-    import pandas as pd
     if not perf or len(perf) < 2:
         return float('nan')
     df = pd.DataFrame(perf)
@@ -760,18 +974,17 @@ def compute_ticker_volatility(portfolio_name):
     Compute the annualized volatility (no rolling window) for each ticker in the portfolio.
     Returns a dict: {ticker: volatility (float), ...}
     """
-    from db.database import get_transactions
-    import pandas as pd
-    txs = get_transactions(portfolio_name)
+    txs = _cached_transactions(portfolio_name)
     if not txs:
         return {}
     df_txs = pd.DataFrame(txs)
     if df_txs.empty or 'ticker' not in df_txs.columns:
         return {}
     tickers = df_txs['ticker'].unique()
+    perfs = compute_multi_ticker_performance(portfolio_name, list(tickers))
     result = {}
     for ticker in tickers:
-        perf = compute_ticker_performance(portfolio_name, ticker)
+        perf = perfs.get(ticker)
         if not perf or len(perf) < 2:
             result[ticker] = float('nan')
             continue
@@ -788,18 +1001,17 @@ def compute_ticker_volatility_1d(portfolio_name):
     Compute the annualized volatility for each ticker in the portfolio using a 1-day rolling window.
     Returns a dict: {ticker: pandas Series of daily annualized volatility, ...}
     """
-    from db.database import get_transactions
-    import pandas as pd
-    txs = get_transactions(portfolio_name)
+    txs = _cached_transactions(portfolio_name)
     if not txs:
         return {}
     df_txs = pd.DataFrame(txs)
     if df_txs.empty or 'ticker' not in df_txs.columns:
         return {}
     tickers = df_txs['ticker'].unique()
+    perfs = compute_multi_ticker_performance(portfolio_name, list(tickers))
     result = {}
     for ticker in tickers:
-        perf = compute_ticker_performance(portfolio_name, ticker)
+        perf = perfs.get(ticker)
         if not perf or len(perf) < 2:
             result[ticker] = pd.Series(dtype=float)
             continue
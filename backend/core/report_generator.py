@@ -1,54 +1,31 @@
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-import pandas as pd
+import orjson
 from core.gemini_cost import GEMINI_2_0_FLASH, GEMINI_2_5_FLASH, calculate_gemini_cost
-from core.gemini_helper import generate_grounded_report_response
-from db.database import get_ticker_report, save_ticker_report, get_portfolio_report, save_portfolio_report
-from datetime import datetime
+from core.gemini_helper import generate_grounded_report_response, strip_code_fences
+from db.database import get_ticker_reports_many, save_ticker_reports_many, get_portfolio_report, save_portfolio_report
+from datetime import date, datetime
 
 # This module provides functions to generate a Gemini-based report for a given ticker in a portfolio.
 
-def generate_ticker_report_with_gemini(ticker, holdings, weight, status, returns, ticker_info, force=False):
-    """
-    Generate a structured report for a single ticker using Gemini LLM.
-    If a report for today already exists in the database and force is False, load and return it.
-    Otherwise, generate a new report, save it, and return it.
-    """
-    today = datetime.now().date()
-    # Try to load from DB if not force
-    if not force:
-        existing_report = get_ticker_report(ticker)
-        if existing_report is not None:
-            ref_date = existing_report.get('reference_date')
-            if ref_date:
-                ref_date = datetime.strptime(ref_date, '%Y-%m-%d %H:%M:%S').date()
-                if ref_date == today:
-                    print(f"\033[92m[TickerReport] Loaded report for '{ticker}' from DB (date: {today})\033[0m")
-                    return existing_report, 0
-
-    # Remove sensitive/duplicate analyst fields from ticker_info before prompt
-    analyst_fields = [
-        "averageAnalystRating", "recommendationKey", "numberOfAnalystOpinions",
-        "recommendationMean", "targetMedianPrice", "targetMeanPrice",
-        "targetLowPrice", "targetHighPrice", "currentPrice"
-    ]
-    ticker_info_clean = dict(ticker_info) if ticker_info else {}
-    for field in analyst_fields:
-        ticker_info_clean.pop(field, None)
-
-    prompt = f"""
-You are a financial analyst assistant. Given the following data for the ticker {ticker}:
-
-Holdings: {holdings}
-Weight in portfolio: {weight:.2%}
-Recent {ticker} returns: {returns}
-Portfolio status: {status}
-Ticker info: {ticker_info_clean}
+_ANALYST_FIELDS = frozenset({
+    "averageAnalystRating", "recommendationKey", "numberOfAnalystOpinions",
+    "recommendationMean", "targetMedianPrice", "targetMeanPrice",
+    "targetLowPrice", "targetHighPrice", "currentPrice"
+})
+# Tickers marshaled into a single Gemini call by generate_ticker_reports_batch
+_TICKER_REPORT_CHUNK_SIZE = 8
+# Gemini calls in flight at once, to stay under the per-minute request quota
+_MAX_CONCURRENT_REPORT_CALLS = 8
+# HTTP status codes of Gemini errors worth retrying (rate limit and transient server errors)
+_RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
 
-Generate a detailed report for {ticker} with the following valid JSON format:
-
-    {{
-        "fundamental_analysis": {{
+# JSON layout of a ticker report, shared by the single and the multi-ticker prompts
+_TICKER_REPORT_FORMAT = """\
+    {
+        "fundamental_analysis": {
             "revenue_and_ebitda": string, // key insights on revenue and EBITDA
             "profitability_and_margins": string, // key insights on profitability and margins
             "balance_sheet_strength": string, // key insights on balance sheet strength
@@ -57,7 +34,7 @@ Generate a detailed report for {ticker} with the following valid JSON format:
             "growth_drivers": string, // key insights on growth drivers, market position, etc.
             "capital_allocation": string, // key insights on capital allocation, dividends, buybacks, etc.
             "risk_profile": string, // key insights on profile risks
-            "financial_ratios": {{
+            "financial_ratios": {
                 "current_ratio": float, // current ratio value and analysis
                 "current_ratio_analysis": string, // current ratio analysis
                 "quick_ratio": float, // quick ratio value and analysis
@@ -72,8 +49,8 @@ Generate a detailed report for {ticker} with the following valid JSON format:
                 "return_on_investment_analysis": string, // return on investment analysis
                 "return_on_assets": float, // return on assets value and analysis
                 "return_on_assets_analysis": string // return on assets analysis
-            }},
-            "key_metrics": {{
+            },
+            "key_metrics": {
                 "market_cap": float, // market cap value and analysis
                 "market_cap_analysis": string, // market cap analysis
                 "pe_ratio": float, // P/E ratio value and analysis
@@ -82,105 +59,109 @@ Generate a detailed report for {ticker} with the following valid JSON format:
                 "pb_ratio_analysis": string, // P/B ratio analysis
                 "dividend_yield": float, // dividend yield value and analysis
                 "dividend_yield_analysis": string // dividend yield analysis
-            }},
+            },
             
-        }},
-        "analysts_opinion": {{
+        },
+        "analysts_opinion": {
                 "consensus_rating": string, // consensus rating (buy/hold/sell)
                 "target_price": float, // average target price from analysts
                 "analyst_sentiment": string // overall sentiment from analysts
-            }},
+            },
         "potential_benefits": [
-            {{
+            {
                 "benefit": "Your analysis here", // benefit title
                 "description": "Your analysis here", // description of the benefit
-            }}
+            }
         ],
         "potential_risks": [
-            {{
+            {
                 "risk": "Your analysis here", // risk title
                 "description": "Your analysis here", // description of the risk
                 "attention": "high/medium/low" // level of attention needed
-            }},
+            },
             ...
         ],
-        sentiment_analysis: {{
+        sentiment_analysis: {
             "overall_sentiment": "positive/negative/neutral", // overall sentiment of the ticker
             "recent_news": "Your analysis here", // summary of recent news and its sentiment
-        }},
+        },
         "key_events": [ // key events that can affect the ticker's performance about past, present, and future
-            {{
+            {
                 "event": string, // key event title
                 "description": string, // description of the event
                 "date": string // date of the event
-            }},
+            },
             ...
         ],
-        "valuation_summary": {{
+        "valuation_summary": {
             "score": float, // overall valuation score of the ticker (0-100 scale), based on fundamental analysis, analysts' ratings, valuation metrics, and key metrics
             "trend": "Bullish/Bearish/Neutral", // trend of the valuation score based on the score
             "explanation": string, // explanation of the valuation score and trend
             "top3_pros": [ // up to top 3 pros of the ticker, if are any pros
-                {{
+                {
                     "pro": "Your analysis here", // pro title
                     "description": "Your analysis here" // description of the pro
-                }},
+                },
             ],
             "top3_cons": [ // up to top 3 cons of the ticker, if are any cons
-                {{
+                {
                     "con": "Your analysis here", // con title
                     "description": "Your analysis here" // description of the con
-                }},
+                },
             ]
-        }},
+        },
             "recommendations": [ // recommendation for this asset in my portfolio, based on the holdings, weight, and returns of my portfolio, but also basde on the fundamental analysis, analysts' ratings, valuation metrics, and key metrics
-                {{
+                {
                     "action": "buy/sell/hold", // action to take with the ticker
                     "trading_strategy": "Your analysis here", // trading strategy to apply
                     "trade_quantity": float, // quantity to trade
                     "rationale": "Your reasoning here", // description of the recommendation
                     "timing": string, // timing of the recommendation
                     "priority": string // priority of the recommendation (high/medium/low)
-                }},
+                },
                 ...
             ]
-    }}
+    }
+"""
+
 
+# Prompt of a single-ticker report
+_TICKER_PROMPT_TEMPLATE = """
+You are a financial analyst assistant. Given the following data for the ticker {ticker}:
+
+Holdings: {holdings}
+Weight in portfolio: {weight:.2%}
+Recent {ticker} returns: {returns}
+Portfolio status: {status}
+Ticker info: {ticker_info_clean}
+
+Generate a detailed report for {ticker} with the following valid JSON format:
+
+{report_format}
 IMPORTANT: 
 - Use Markdown bold (**text**) for all key numbers, ticker symbols, and section headers in your text. For example, write **AAPL** or **12.5%** or **Valuation Summary** where appropriate.
 - Generate just the JSON object without any additional text or explanation.
 """
-    response = generate_grounded_report_response(prompt, model_name=GEMINI_2_0_FLASH)
-    answer = response.get('text')
-    cost = response.get('cost', None)
-    if answer is not None:
-        answer = answer.replace('```json', '').replace('```', '').strip()
-        answer = json.loads(answer)
-        # Save the report to the database
-        reference_date = pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
-        save_ticker_report(ticker, answer, reference_date, cost)
-        print(f"\033[91m[TickerReport] Generated new report for '{ticker}' and saved to DB (date: {today})\033[0m")
-    return answer, cost
 
-def generate_portfolio_report_with_gemini(portfolio_name, status, returns, force=False):
-    """
-    Generate a structured report for the entire portfolio using Gemini LLM.
-    If a report for today already exists in the database and force is False, load and return it.
-    Otherwise, generate a new report, save it, and return it.
-    """
-    today = datetime.now().date()
-    
-    if not force:
-        existing_report = get_portfolio_report(portfolio_name)
-        # Only use the report if its reference_date is today
-        if existing_report is not None:
-            ref_date = existing_report.get('reference_date')
-            ref_date = datetime.strptime(ref_date, '%Y-%m-%d %H:%M:%S').date()
-            if ref_date == today:
-                print(f"\033[92m[PortfolioReport] Loaded report for '{portfolio_name}' from DB (date: {today})\033[0m")
-                return existing_report, 0
+# Prompt of a batch of ticker reports, answered as a JSON object keyed by ticker
+_MULTI_TICKER_PROMPT_TEMPLATE = """
+You are a financial analyst assistant. Given the following data for the tickers {tickers}:
+
+Portfolio status: {status}
+Tickers data: {tickers_data}
+
+For each ticker, generate a detailed report with the following valid JSON format:
+
+{report_format}
+Format your response as a single JSON object mapping each ticker symbol to its report, e.g. {{"AAPL": {{...}}, "MSFT": {{...}}}}.
 
-    prompt = f"""
+IMPORTANT: 
+- Use Markdown bold (**text**) for all key numbers, ticker symbols, and section headers in your text. For example, write **AAPL** or **12.5%** or **Valuation Summary** where appropriate.
+- Generate just the JSON object without any additional text or explanation.
+"""
+
+# Prompt of the whole-portfolio report
+_PORTFOLIO_PROMPT_TEMPLATE = """
 You are a financial analyst assistant. Given the following data for the portfolio '{portfolio_name}':
 
 Portfolio status: {status}
@@ -278,42 +259,9 @@ Format your response as a valid JSON object as follows:
 
 IMPORTANT: Use Markdown bold (**text**) and italic(*text*) when necessary to highlight the text and where appropriate.
 """
-    # Call Gemini LLM via gemini_helper (assume gemini_helper.generate_json_response exists)
-    response = generate_grounded_report_response(prompt, model_name=GEMINI_2_5_FLASH)
-    answer = response.get('text')
-    cost = response.get('cost', None)
-    if answer is not None:
-        answer = answer.replace('```json', '').replace('```', '').strip()
-        answer = json.loads(answer)
-        # Save the report to the database
-        reference_date = pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
-        save_portfolio_report(portfolio_name, answer, reference_date, cost)
-        print(f"\033[91m[PortfolioReport] Generated new report for '{portfolio_name}' and saved to DB (date: {today})\033[0m")
-    return answer, cost
 
-def generate_multi_ticker_report_with_gemini(tickers, holdings_list, weights, status, returns_dict, model_name=GEMINI_2_0_FLASH):
-    """
-    Generate a single Gemini LLM report for multiple tickers at once, passing all ticker info in one prompt.
-    Args:
-        tickers (list of str): List of ticker symbols to analyze.
-        holdings_list (list of dict): List of holding info for each ticker.
-        weights (list of float): List of weights for each ticker in the portfolio.
-        status (dict): The portfolio status (can include other tickers, context).
-        returns_dict (dict): Dict mapping ticker symbol to its returns data.
-        model_name (str): Gemini model name for cost calculation.
-    Returns:
-        dict: Mapping ticker symbol to its structured report.
-    """
-    # Build a single prompt for all tickers
-    tickers_info = []
-    for i, ticker in enumerate(tickers):
-        tickers_info.append({
-            'ticker': ticker,
-            'holdings': holdings_list[i] if i < len(holdings_list) else {},
-            'weight': weights[i] if i < len(weights) else 0.0,
-            'returns': returns_dict.get(ticker, {})
-        })
-    prompt = f"""
+# Prompt of generate_multi_ticker_report_with_gemini (free-form sections per ticker)
+_MULTI_TICKER_SUMMARY_PROMPT_TEMPLATE = """
 You are a financial analyst assistant. Given the following data for multiple tickers in a portfolio:
 
 Portfolio status: {status}
@@ -345,14 +293,327 @@ Format your response as a JSON object mapping each ticker symbol to its report,
 
 IMPORTANT: Use Markdown bold (**text**) for all key numbers, ticker symbols, and section headers in your text.
 """
-    response = generate_grounded_report_response(prompt, model_name=model_name)
+
+
+def _clean_ticker_info(ticker_info):
+    """
+    Copy of ticker_info without the sensitive/duplicate analyst fields, before it goes into a prompt.
+    Empty fields are dropped too: a ticker_info row has ~150 columns, many of them NULL, and each costs prompt tokens.
+    """
+    if not ticker_info:
+        return {}
+    # Filter in one pass over the keys, without copying the dict/sqlite3.Row first
+    return {k: ticker_info[k] for k in ticker_info.keys() if k not in _ANALYST_FIELDS and ticker_info[k] is not None}
+
+
+def _parse_ref_date(reference_date):
+    """Date of a stored 'YYYY-MM-DD HH:MM:SS' reference_date, read straight from the fixed-width string."""
+    return date(int(reference_date[0:4]), int(reference_date[5:7]), int(reference_date[8:10]))
+
+
+def _parse_json_answer(answer):
+    """
+    Strip the markdown code fences around a Gemini JSON answer and parse it with orjson.
+    Falls back to the stdlib parser for the few things orjson rejects (e.g. NaN literals).
+    """
+    answer = strip_code_fences(answer)
+    try:
+        return orjson.loads(answer)
+    except orjson.JSONDecodeError:
+        return json.loads(answer)
+
+
+def _ticker_report_prompt(ticker, holdings, weight, status, returns, ticker_info_clean):
+    return _TICKER_PROMPT_TEMPLATE.format(
+        ticker=ticker,
+        holdings=holdings,
+        weight=weight,
+        returns=returns,
+        status=status,
+        ticker_info_clean=ticker_info_clean,
+        report_format=_TICKER_REPORT_FORMAT,
+    )
+
+
+def _multi_ticker_report_prompt(entries, status):
+    tickers_data = [
+        {
+            'ticker': entry['ticker'],
+            'holdings': entry['holdings'],
+            'weight': f"{entry['weight']:.2%}",
+            'returns': entry['returns'],
+            'ticker_info': entry['ticker_info'],
+        }
+        for entry in entries
+    ]
+    return _MULTI_TICKER_PROMPT_TEMPLATE.format(
+        tickers=', '.join(entry['ticker'] for entry in entries),
+        status=status,
+        tickers_data=tickers_data,
+        report_format=_TICKER_REPORT_FORMAT,
+    )
+
+
+def _generate_with_retry(prompt, model_name, max_retries=3, base_delay=1.0, force=False):
+    """
+    Call generate_grounded_report_response, retrying with exponential backoff
+    when Gemini answers with a rate-limit or transient server error.
+    """
+    attempt = 0
+    while True:
+        try:
+            return generate_grounded_report_response(prompt, model_name=model_name, force=force)
+        except Exception as e:
+            if getattr(e, 'code', None) in _RETRYABLE_STATUS_CODES and attempt < max_retries:
+                delay = base_delay * (2 ** attempt)
+                print(f"[TickerReport] Gemini error {e.code}, retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+                continue
+            raise
+
+
+def _reports_by_ticker(answer, chunk):
+    """
+    Match the answer of a multi-ticker call to the tickers of its chunk. The prompt asks for an object keyed by symbol,
+    but Gemini sometimes answers with a list of reports (or a single report) carrying a "ticker" field instead.
+    Returns {ticker: report} for the tickers of the chunk found in the answer.
+    """
+    if isinstance(answer, dict) and isinstance(answer.get('ticker'), str):
+        answer = [answer]
+    if isinstance(answer, list):
+        by_symbol = {str(report['ticker']).upper(): report for report in answer if isinstance(report, dict) and report.get('ticker')}
+    elif isinstance(answer, dict):
+        by_symbol = {str(symbol).upper(): report for symbol, report in answer.items()}
+    else:
+        raise ValueError(f"expected a JSON object or list of reports, got {type(answer).__name__}")
+    return {
+        entry['ticker']: by_symbol[entry['ticker'].upper()]
+        for entry in chunk if isinstance(by_symbol.get(entry['ticker'].upper()), dict)
+    }
+
+
+def _generate_chunk_reports(chunk, status, force=False):
+    """
+    Generate the reports of a chunk of ticker entries with a single Gemini call.
+    Tickers missing from a multi-ticker answer (or all of them, if it cannot be read) are retried one by one with
+    the single-ticker prompt.
+    Returns ({ticker: report}, cost of the calls, {ticker: exception} for the tickers whose generation failed).
+    A single ticker answered with no text gets no report without failing.
+    """
+    if len(chunk) == 1:
+        entry = chunk[0]
+        prompt = _ticker_report_prompt(entry['ticker'], entry['holdings'], entry['weight'], status, entry['returns'], entry['ticker_info'])
+    else:
+        prompt = _multi_ticker_report_prompt(chunk, status)
+    response = _generate_with_retry(prompt, GEMINI_2_0_FLASH, force=force)
+    answer = response.get('text')
+    cost = response.get('cost', None)
+    if answer is None and len(chunk) == 1:
+        # No text to read: no report, but not a failure (generate_ticker_report_with_gemini returns (None, cost))
+        print(f"[TickerReport] Empty answer for {chunk[0]['ticker']}, no report generated")
+        return {}, cost, {}
+    try:
+        if answer is None:
+            raise ValueError("empty answer")
+        answer = _parse_json_answer(answer)
+        if len(chunk) == 1:
+            if not isinstance(answer, dict):
+                raise ValueError(f"expected a JSON object, got {type(answer).__name__}")
+            return {chunk[0]['ticker']: answer}, cost, {}
+        generated = _reports_by_ticker(answer, chunk)
+    except Exception as e:
+        if len(chunk) == 1:
+            print(f"[TickerReport] Could not read the report of {chunk[0]['ticker']}: {e}")
+            return {}, cost, {chunk[0]['ticker']: e}
+        print(f"[TickerReport] Could not read the reports of {', '.join(entry['ticker'] for entry in chunk)}: {e}")
+        generated = {}
+    failed = {}
+    missing = [entry for entry in chunk if entry['ticker'] not in generated]
+    if missing:
+        print(f"[TickerReport] No report for {', '.join(entry['ticker'] for entry in missing)} in the batched answer, retrying them one by one")
+    for entry in missing:
+        try:
+            single, single_cost, single_failed = _generate_chunk_reports([entry], status, force)
+        except Exception as e:
+            print(f"[TickerReport] Report generation failed for {entry['ticker']}: {e}")
+            failed[entry['ticker']] = e
+            continue
+        generated.update(single)
+        failed.update(single_failed)
+        if single_cost is not None:
+            cost = single_cost if cost is None else cost + single_cost
+    return generated, cost, failed
+
+
+def _run_chunks(chunks, status, force):
+    """
+    Generate the reports of every chunk, concurrently when there are several.
+    A chunk whose call fails is logged and does not stop the others.
+    Returns the [(generated, cost)] of the chunks whose call succeeded and {ticker: exception} for the tickers that got
+    no report.
+    """
+    results = []
+    failed = {}
+
+    def collect(chunk, get_result):
+        try:
+            generated, cost, chunk_failed = get_result()
+            results.append((generated, cost))
+            failed.update(chunk_failed)
+        except Exception as e:
+            print(f"[TickerReport] Report generation failed for {', '.join(entry['ticker'] for entry in chunk)}: {e}")
+            failed.update((entry['ticker'], e) for entry in chunk)
+
+    if len(chunks) > 1:
+        with ThreadPoolExecutor(max_workers=_MAX_CONCURRENT_REPORT_CALLS) as executor:
+            futures = [executor.submit(_generate_chunk_reports, chunk, status, force) for chunk in chunks]
+            for chunk, future in zip(chunks, futures):
+                collect(chunk, future.result)
+    else:
+        for chunk in chunks:
+            collect(chunk, lambda: _generate_chunk_reports(chunk, status, force))
+    return results, failed
+
+
+def _generate_ticker_reports(tickers, holdings_list, weights, status, returns_dict, ticker_infos, force,
+                             chunk_size, today, now_str):
+    """generate_ticker_reports_batch, also returning {ticker: exception} for the tickers whose generation failed."""
+    if today is None or now_str is None:
+        now = datetime.now()
+        today = today or now.date()
+        now_str = now_str or now.strftime('%Y-%m-%d %H:%M:%S')
+    reports = {}
+    if not force:
+        reports = get_ticker_reports_many(tickers, today.isoformat())
+        for ticker in reports:
+            print(f"\033[92m[TickerReport] Loaded report for '{ticker}' from DB (date: {today})\033[0m")
+    entries = [
+        {
+            'ticker': ticker,
+            'holdings': holdings_list[i] if i < len(holdings_list) else {},
+            'weight': weights[i] if i < len(weights) else 0.0,
+            'returns': returns_dict.get(ticker, {}),
+            'ticker_info': _clean_ticker_info(ticker_infos.get(ticker)),
+        }
+        for i, ticker in enumerate(tickers) if ticker not in reports
+    ]
+    chunks = [entries[start:start + chunk_size] for start in range(0, len(entries), chunk_size)]
+    # Chunks are independent Gemini calls: run them concurrently, then save all the reports at once
+    results, failed = _run_chunks(chunks, status, force)
+    total_cost = 0
+    items = []
+    for generated, cost in results:
+        if cost is not None:
+            total_cost += cost
+        # Split the call cost among the reports it produced
+        share = cost / len(generated) if cost is not None and generated else cost
+        items.extend((ticker, report, share) for ticker, report in generated.items())
+    if items:
+        save_ticker_reports_many(items, now_str)
+    for ticker, report, _ in items:
+        reports[ticker] = report
+        print(f"\033[91m[TickerReport] Generated new report for '{ticker}' and saved to DB (date: {today})\033[0m")
+    return reports, total_cost, failed
+
+
+def generate_ticker_reports_batch(tickers, holdings_list, weights, status, returns_dict, ticker_infos, force=False,
+                                  chunk_size=_TICKER_REPORT_CHUNK_SIZE, today=None, now_str=None):
+    """
+    Generate structured reports for several tickers using Gemini LLM, marshaling up to chunk_size tickers into each call.
+    Tickers with a report for today in the database are loaded with a single query and skipped, unless force is True.
+    Chunks are sent concurrently and all the generated reports are saved together; a failing chunk is logged and its
+    tickers are left out of the result, without losing the reports of the other chunks.
+    today/now_str (the reference date of the saved reports) are read from the clock once if not given.
+    Returns ({ticker: report}, total cost of the Gemini calls).
+    """
+    reports, total_cost, _ = _generate_ticker_reports(tickers, holdings_list, weights, status, returns_dict, ticker_infos,
+                                                      force, chunk_size, today, now_str)
+    return reports, total_cost
+
+
+def generate_ticker_report_with_gemini(ticker, holdings, weight, status, returns, ticker_info, force=False, today=None, now_str=None):
+    """
+    Generate a structured report for a single ticker using Gemini LLM.
+    If a report for today already exists in the database and force is False, load and return it.
+    Otherwise, generate a new report, save it, and return it.
+    An empty Gemini answer returns (None, cost); errors of the Gemini call and unreadable answers are raised.
+    """
+    reports, cost, failed = _generate_ticker_reports([ticker], [holdings], [weight], status, {ticker: returns}, {ticker: ticker_info},
+                                                     force, _TICKER_REPORT_CHUNK_SIZE, today, now_str)
+    if ticker in failed:
+        raise failed[ticker]
+    return reports.get(ticker), cost
+
+def generate_portfolio_report_with_gemini(portfolio_name, status, returns, force=False, today=None, now_str=None):
+    """
+    Generate a structured report for the entire portfolio using Gemini LLM.
+    If a report for today already exists in the database and force is False, load and return it.
+    Otherwise, generate a new report, save it, and return it.
+    today/now_str (the reference date of the saved report) are read from the clock once if not given.
+    """
+    if today is None or now_str is None:
+        now = datetime.now()
+        today = today or now.date()
+        now_str = now_str or now.strftime('%Y-%m-%d %H:%M:%S')
+
+    if not force:
+        existing_report = get_portfolio_report(portfolio_name)
+        # Only use the report if its reference_date is today
+        if existing_report is not None:
+            ref_date = existing_report.get('reference_date')
+            ref_date = _parse_ref_date(ref_date)
+            if ref_date == today:
+                print(f"\033[92m[PortfolioReport] Loaded report for '{portfolio_name}' from DB (date: {today})\033[0m")
+                return existing_report, 0
+
+    prompt = _PORTFOLIO_PROMPT_TEMPLATE.format(portfolio_name=portfolio_name, status=status, returns=returns)
+    # Call Gemini LLM via gemini_helper (assume gemini_helper.generate_json_response exists)
+    response = generate_grounded_report_response(prompt, model_name=GEMINI_2_5_FLASH, force=force)
+    answer = response.get('text')
+    cost = response.get('cost', None)
+    if answer is not None:
+        answer = _parse_json_answer(answer)
+        # Save the report to the database
+        save_portfolio_report(portfolio_name, answer, now_str, cost)
+        print(f"\033[91m[PortfolioReport] Generated new report for '{portfolio_name}' and saved to DB (date: {today})\033[0m")
+    return answer, cost
+
+def generate_multi_ticker_report_with_gemini(tickers, holdings_list, weights, status, returns_dict, model_name=GEMINI_2_0_FLASH):
+    """
+    Generate a single Gemini LLM report for multiple tickers at once, passing all ticker info in one prompt.
+    Args:
+        tickers (list of str): List of ticker symbols to analyze.
+        holdings_list (list of dict): List of holding info for each ticker.
+        weights (list of float): List of weights for each ticker in the portfolio.
+        status (dict): The portfolio status (can include other tickers, context).
+        returns_dict (dict): Dict mapping ticker symbol to its returns data.
+        model_name (str): Gemini model name for cost calculation.
+    Returns:
+        dict: Mapping ticker symbol to its structured report.
+    """
+    # Build a single prompt for all tickers
+    tickers_info = []
+    for i, ticker in enumerate(tickers):
+        tickers_info.append({
+            'ticker': ticker,
+            'holdings': holdings_list[i] if i < len(holdings_list) else {},
+            'weight': weights[i] if i < len(weights) else 0.0,
+            'returns': returns_dict.get(ticker, {})
+        })
+    # Compact JSON rather than the Python repr: valid for the model to parse and fewer tokens
+    tickers_info = orjson.dumps(tickers_info, default=str, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS).decode()
+    prompt = _MULTI_TICKER_SUMMARY_PROMPT_TEMPLATE.format(status=status, tickers_info=tickers_info)
+    # The summary works from the data in the prompt, so it runs ungrounded in JSON mode: the answer text is plain
+    # JSON, without the code fences free-text answers come wrapped in
+    response = generate_grounded_report_response(prompt, model_name=model_name, response_mime_type='application/json')
     # Attach cost info to the report if available
     token_usage = getattr(response, 'token_usage', None) or getattr(response, 'usage', None) or {}
     in_tokens = token_usage.get('input_tokens', 0)
     out_tokens = token_usage.get('output_tokens', 0)
     cost = calculate_gemini_cost(model_name, in_tokens, out_tokens)
     # Add cost and token usage to the report output
-    report = response if isinstance(response, dict) else {'text': response}
+    report = dict(response) if isinstance(response, dict) else {'text': response}
     report['gemini_cost'] = cost
     report['input_tokens'] = in_tokens
     report['output_tokens'] = out_tokens
@@ -1,16 +1,126 @@
 import sqlite3
+import threading
+import time
+import atexit
+import weakref
 import json
-from datetime import datetime
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from cachetools import TTLCache
+import orjson
+import zlib
+import pandas as pd
+from db.schema import TICKER_INFO_FIELDS
 from services import data_fetcher
-import time
 
 DATABASE_NAME = 'ticker_data.db'
 
+# Per-connection settings. The database runs in WAL mode (set once by init_db), where synchronous=NORMAL
+# is safe and avoids an fsync on every commit. The busy timeout is the `timeout` given to sqlite3.connect.
+_CONNECTION_PRAGMAS = (
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-64000',  # 64 MB page cache
+    'PRAGMA mmap_size=268435456',  # 256 MB memory-mapped reads
+)
+# Prepared statements kept per connection (default 128), keyed by SQL text: the long, fixed write statements
+# below are module constants so that every call reuses the same prepared statement
+_STATEMENT_CACHE_SIZE = 256
+
+
+def _configure_connection(conn):
+    for pragma in _CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def get_connection(timeout=5.0):
+    """
+    Opens a connection to the application database.
+    While another connection holds the write lock, statements wait up to `timeout` seconds for it.
+    """
+    return _configure_connection(sqlite3.connect(DATABASE_NAME, timeout=timeout, cached_statements=_STATEMENT_CACHE_SIZE))
+
+
+class _ThreadConnection(sqlite3.Connection):
+    """Long-lived per-thread connection (a subclass only so that the registry below can hold weak references)."""
+
+
+_thread_local = threading.local()
+# Every per-thread connection still alive, closed at interpreter exit
+_open_connections = weakref.WeakSet()
+_open_connections_lock = threading.Lock()
+
+
+def _thread_connection(kind):
+    """Returns this thread's long-lived connection of the given kind ('read' or 'write'), opening it on first use."""
+    connections = getattr(_thread_local, 'connections', None)
+    if connections is None or _thread_local.database != DATABASE_NAME:
+        connections = _thread_local.connections = {}
+        _thread_local.database = DATABASE_NAME
+    conn = connections.get(kind)
+    if conn is None:
+        conn = _configure_connection(
+            sqlite3.connect(DATABASE_NAME, timeout=5.0, check_same_thread=False, factory=_ThreadConnection,
+                            cached_statements=_STATEMENT_CACHE_SIZE)
+        )
+        connections[kind] = conn
+        with _open_connections_lock:
+            _open_connections.add(conn)
+    return conn
+
+
+def get_read_connection():
+    """
+    Returns this thread's long-lived read connection (rows are sqlite3.Row), opening it on first use.
+    Only run SELECTs on it and never close it: writes go through get_write_connection().
+    """
+    conn = _thread_connection('read')
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def get_write_connection():
+    """
+    Returns this thread's long-lived write connection, opening it on first use.
+    Never close it; wrap the statements in `with conn:` so the transaction is committed, or rolled back on error.
+    """
+    return _thread_connection('write')
+
+
+@atexit.register
+def _close_thread_connections():
+    with _open_connections_lock:
+        connections = list(_open_connections)
+    for conn in connections:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+
+# Databases already set up by init_db in this process
+_initialized_databases = set()
+_init_lock = threading.Lock()
+
 
 def init_db():
-    """Initializes the database and creates the necessary tables if they don't exist."""
-    conn = sqlite3.connect(DATABASE_NAME)
+    """
+    Initializes the database and creates the necessary tables if they don't exist.
+    Runs once per process (app.py calls it at startup); later calls return immediately.
+    """
+    with _init_lock:
+        if DATABASE_NAME in _initialized_databases:
+            return
+        _create_schema()
+        _initialized_databases.add(DATABASE_NAME)
+
+
+def _create_schema():
+    conn = get_connection()
     cursor = conn.cursor()
+    # WAL lets readers run while a writer commits; the mode is persistent for the database file
+    cursor.execute('PRAGMA journal_mode=WAL')
     # Table for cached ticker data
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS tickers (
@@ -214,6 +324,14 @@ def init_db():
             last_updated TIMESTAMP
         )
     ''')
+    # Add the columns of fields appended to TICKER_INFO_FIELDS after the table was created. user_version
+    # records the column list the file was last checked against, so the column scan only runs when it changed
+    if cursor.execute("PRAGMA user_version").fetchone()[0] != _TICKER_INFO_SCHEMA_VERSION:
+        existing_cols = {row[1] for row in cursor.execute("PRAGMA table_info(ticker_info)")}
+        for col in _TICKER_INFO_COLUMNS:
+            if col not in existing_cols:
+                cursor.execute(f"ALTER TABLE ticker_info ADD COLUMN {col} TEXT")
+        cursor.execute(f"PRAGMA user_version = {_TICKER_INFO_SCHEMA_VERSION}")
 
     # New: Table for ticker_history (one row per date, with OHLCV fields)
     cursor.execute('''
@@ -232,6 +350,9 @@ def init_db():
     ''')
     # Ensure unique index exists for upsert even if table already created
     cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_ticker_date ON ticker_history(ticker, date);')
+    # Transactions and holdings are always read per portfolio (transactions ordered by date, id)
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_portfolio_date ON transactions(portfolio, date, id);')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_portfolio_holdings_portfolio ON portfolio_holdings(portfolio);')
 
     # New: Table for portfolio reports (stores generated reports with reference date)
     cursor.execute('''
@@ -258,6 +379,11 @@ def init_db():
             UNIQUE(ticker, reference_date)
         )
     ''')
+    # Covering index for get_ticker_reports_many's first step (latest report id per ticker): the id is the
+    # rowid, so the rows holding the report blobs are never read
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_ticker_reports_ticker_date ON ticker_reports(ticker, reference_date, created_at);')
+    # Refresh the planner statistics of tables whose indexes changed (cheap when there is nothing to do)
+    cursor.execute('PRAGMA optimize')
 
     conn.commit()
     conn.close()
@@ -269,18 +395,15 @@ def get_ticker_data(ticker_symbol):
     Retrieves data for a specific ticker from the database.
     Returns (data, last_updated) tuple or (None, None) if not found.
     """
-    conn = sqlite3.connect(DATABASE_NAME)
-    # This row_factory allows accessing columns by name
-    conn.row_factory = sqlite3.Row
+    conn = get_read_connection()
     cursor = conn.cursor()
 
     cursor.execute("SELECT data, last_updated FROM tickers WHERE ticker = ?", (ticker_symbol,))
     row = cursor.fetchone()
-    conn.close()
 
     if row:
-        # The data is stored as a JSON string, so we parse it back into a Python dict
-        data = json.loads(row['data'])
+        # The data is stored as JSON, so we parse it back into a Python dict
+        data = _loads_ticker_data(row['data'])
         # The timestamp is stored as a string, so we parse it back into a datetime object
         last_updated = datetime.fromisoformat(row['last_updated'])
         return data, last_updated
@@ -288,153 +411,179 @@ def get_ticker_data(ticker_symbol):
     return None, None
 
 
-def save_ticker_data(ticker_symbol, data, max_retries=5, base_delay=0.2):
+def get_ticker_info(ticker_symbol):
+    """Returns the ticker_info row of a ticker as a dict, or None if it is not stored."""
+    row = get_read_connection().execute("SELECT * FROM ticker_info WHERE ticker = ?", (ticker_symbol,)).fetchone()
+    return dict(row) if row else None
+
+
+def get_ticker_info_many(tickers, fields=None):
     """
-    Saves or updates the data for a specific ticker in the database, including ticker_info and ticker_history tables.
-    The `OR REPLACE` clause handles both new insertions and updates.
-    Implements retry logic to handle sqlite3.OperationalError: database is locked.
+    Retrieves the given ticker_info fields (all columns if fields is None) for several tickers with a single query.
+    Returns a dict {ticker: sqlite3.Row}; tickers without a ticker_info row are missing from it.
     """
-    attempt = 0
-    while True:
-        try:
-            conn = sqlite3.connect(DATABASE_NAME)
-            cursor = conn.cursor()
+    tickers = [t for t in dict.fromkeys(tickers) if t is not None]
+    if not tickers:
+        return {}
+    conn = get_read_connection()
+    placeholders = ', '.join('?' * len(tickers))
+    rows = conn.execute(
+        f"SELECT {'*' if fields is None else ', '.join(['ticker', *fields])} FROM ticker_info WHERE ticker IN ({placeholders})",
+        tickers
+    ).fetchall()
+    return {row['ticker']: row for row in rows}
 
-            # Serialize the data dictionary into a JSON string for storage
-            data_json = json.dumps(data)
-            current_time = datetime.now().isoformat()
 
-            # Save to tickers table (raw data)
-            cursor.execute('''
-                INSERT OR REPLACE INTO tickers (ticker, data, last_updated)
-                VALUES (?, ?, ?)
-            ''', (ticker_symbol, data_json, current_time))
+def _safe_sql_col(col):
+    if col and col[0].isdigit():
+        return f'_{col}'
+    return col
+
+
+# ticker_info column of each field, and the statement saving a row (built once: init_db adds any missing column).
+# The row is upserted: every column is set, so updating in place is equivalent to OR REPLACE's delete + insert
+_TICKER_INFO_COLUMNS = [_safe_sql_col(k) for k in TICKER_INFO_FIELDS]
+# Fingerprint of the column list, stored in PRAGMA user_version (a signed 32-bit integer) by init_db
+_TICKER_INFO_SCHEMA_VERSION = zlib.crc32(','.join(_TICKER_INFO_COLUMNS).encode()) & 0x7FFFFFFF
+_TICKER_INFO_VALUE_FIELDS = tuple(TICKER_INFO_FIELDS[1:])  # every field but 'ticker', in column order
+_TICKER_INFO_INSERT_SQL = f'''
+    INSERT INTO ticker_info ({', '.join(_TICKER_INFO_COLUMNS + ['last_updated'])})
+    VALUES ({', '.join(['?'] * (len(_TICKER_INFO_COLUMNS) + 1))})
+    ON CONFLICT(ticker) DO UPDATE SET {', '.join(f'{col}=excluded.{col}' for col in _TICKER_INFO_COLUMNS[1:] + ['last_updated'])}
+'''
+
+
+def _dumps_ticker_data(data):
+    """
+    Serialize a raw ticker payload for the tickers table as zlib-compressed orjson bytes (stored as a BLOB).
+    Its info and OHLCV history are also stored flat in ticker_info/ticker_history; the payload is kept for what
+    only it has (events, the other history columns), so it is compressed with the fastest level.
+    NaN becomes null; payloads orjson cannot encode fall back to a json.dumps string.
+    """
+    try:
+        return zlib.compress(orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS), 1)
+    except TypeError:
+        return json.dumps(data)
+
+
+def _loads_ticker_data(raw):
+    """
+    Parse a stored raw ticker payload: compressed bytes (zlib streams start with 0x78), or the uncompressed
+    orjson bytes/JSON text of older rows. Rows written by json.dumps may hold NaN literals, which only json accepts.
+    """
+    if isinstance(raw, bytes) and raw[:1] == b'\x78':
+        raw = zlib.decompress(raw)
+    try:
+        return orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        return json.loads(raw)
 
-            # Save to ticker_info table (flat fields)
-            info = data.get('info', {})
-            ticker_info_fields = [
-                'ticker', 'shortName', 'longName', 'symbol', 'sector', 'sectorKey', 'sectorDisp', 'industry', 'industryKey', 'industryDisp',
-                'country', 'address1', 'address2', 'city', 'zip', 'phone', 'website', 'fullTimeEmployees', 'longBusinessSummary',
-                'maxAge', 'priceHint', 'previousClose', 'open', 'dayLow', 'dayHigh', 'regularMarketPreviousClose', 'regularMarketOpen',
-                'regularMarketDayLow', 'regularMarketDayHigh', 'dividendRate', 'dividendYield', 'exDividendDate', 'payoutRatio', 'beta',
-                'trailingPE', 'volume', 'regularMarketVolume', 'averageVolume', 'averageVolume10days', 'averageDailyVolume10Day', 'bid', 'ask',
-                'marketCap', 'fiftyTwoWeekLow', 'fiftyTwoWeekHigh', 'priceToSalesTrailing12Months', 'fiftyDayAverage', 'twoHundredDayAverage',
-                'trailingAnnualDividendRate', 'trailingAnnualDividendYield', 'currency', 'tradeable', 'enterpriseValue', 'forwardPE',
-                'profitMargins', 'floatShares', 'sharesOutstanding', 'heldPercentInsiders', 'heldPercentInstitutions', 'impliedSharesOutstanding',
-                'bookValue', 'priceToBook', 'lastFiscalYearEnd', 'nextFiscalYearEnd', 'mostRecentQuarter', 'earningsQuarterlyGrowth',
-                'netIncomeToCommon', 'trailingEps', 'enterpriseToRevenue', 'enterpriseToEbitda',
-                'lastDividendValue', 'lastDividendDate', 'quoteType', 'currentPrice', 'targetHighPrice', 'targetLowPrice', 'targetMeanPrice',
-                'targetMedianPrice', 'recommendationMean', 'recommendationKey', 'numberOfAnalystOpinions', 'totalCash', 'totalCashPerShare',
-                'ebitda', 'totalDebt', 'quickRatio', 'currentRatio', 'totalRevenue', 'debtToEquity', 'revenuePerShare', 'returnOnAssets',
-                'returnOnEquity', 'grossProfits', 'freeCashflow', 'operatingCashflow', 'earningsGrowth', 'revenueGrowth', 'grossMargins',
-                'ebitdaMargins', 'operatingMargins', 'financialCurrency', 'language', 'region', 'typeDisp', 'quoteSourceName', 'triggerable',
-                'customPriceAlertConfidence', 'regularMarketChange', 'regularMarketDayRange', 'fullExchangeName', 'averageDailyVolume3Month',
-                'fiftyTwoWeekLowChange', 'fiftyTwoWeekLowChangePercent', 'fiftyTwoWeekRange', 'fiftyTwoWeekHighChange',
-                'fiftyTwoWeekHighChangePercent', 'fiftyTwoWeekChangePercent', 'epsTrailingTwelveMonths', 'epsCurrentYear', 'priceEpsCurrentYear',
-                'fiftyDayAverageChange', 'fiftyDayAverageChangePercent', 'twoHundredDayAverageChange', 'twoHundredDayAverageChangePercent',
-                'sourceInterval', 'exchangeDataDelayedBy', 'averageAnalystRating', 'cryptoTradeable', 'corporateActions', 'regularMarketTime',
-                'exchange', 'messageBoardId', 'exchangeTimezoneName', 'exchangeTimezoneShortName', 'gmtOffSetMilliseconds', 'market',
-                'esgPopulated', 'hasPrePostMarketData', 'firstTradeDateMilliseconds', 'regularMarketChangePercent', 'regularMarketPrice',
-                'marketState', 'trailingPegRatio'
-            ]
-            def safe_sql_col(col):
-                if col and col[0].isdigit():
-                    return f'_{col}'
-                return col
-            info_key_to_col = {k: safe_sql_col(k) for k in ticker_info_fields}
-            existing_cols = set(row[1] for row in cursor.execute("PRAGMA table_info(ticker_info)").fetchall())
-            for col in info_key_to_col.values():
-                if col not in existing_cols:
-                    cursor.execute(f"ALTER TABLE ticker_info ADD COLUMN {col} TEXT")
-            def serialize_if_needed(val):
-                if isinstance(val, (list, dict)):
-                    return None
-                return val
-            values = [
-                ticker_symbol
-            ] + [serialize_if_needed(info.get(k)) for k in ticker_info_fields[1:]] + [current_time]
-            sql_cols = ', '.join([safe_sql_col(f) for f in ticker_info_fields] + ['last_updated'])
-            sql_qs = ', '.join(['?'] * (len(ticker_info_fields) + 1))
-            cursor.execute(f'''
-                INSERT OR REPLACE INTO ticker_info ({sql_cols})
-                VALUES ({sql_qs})
-            ''', values)
-            history = data.get('history', [])
-            if history:
-                for h in history:
-                    h_date = h.get('date') or h.get('Date')
-                    cursor.execute('''
-                        INSERT INTO ticker_history (ticker, date, open, close, high, low, volume)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)
-                        ON CONFLICT(ticker, date) DO UPDATE SET
-                            open=excluded.open,
-                            close=excluded.close,
-                            high=excluded.high,
-                            low=excluded.low,
-                            volume=excluded.volume
-                    ''', (
-                        ticker_symbol,
-                        h_date,
-                        h.get('open') if 'open' in h else h.get('Open'),
-                        h.get('close') if 'close' in h else h.get('Close'),
-                        h.get('high') if 'high' in h else h.get('High'),
-                        h.get('low') if 'low' in h else h.get('Low'),
-                        h.get('volume') if 'volume' in h else h.get('Volume')
-                    ))
-            conn.commit()
-            conn.close()
-            break  # Success
-        except sqlite3.OperationalError as e:
-            if 'database is locked' in str(e) and attempt < max_retries:
-                delay = base_delay * (2 ** attempt)
-                time.sleep(delay)
-                attempt += 1
-                continue
-            else:
-                raise
+
+_UPSERT_HISTORY_SQL = '''
+    INSERT INTO ticker_history (ticker, date, open, close, high, low, volume)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(ticker, date) DO UPDATE SET
+        open=excluded.open,
+        close=excluded.close,
+        high=excluded.high,
+        low=excluded.low,
+        volume=excluded.volume
+'''
+
+
+def _history_rows(ticker_symbol, history):
+    """ticker_history rows of a list of history records (yfinance 'Date'/'Open'/... or lowercase keys)."""
+    return [(
+        ticker_symbol,
+        h.get('date') or h.get('Date'),
+        h.get('open') if 'open' in h else h.get('Open'),
+        h.get('close') if 'close' in h else h.get('Close'),
+        h.get('high') if 'high' in h else h.get('High'),
+        h.get('low') if 'low' in h else h.get('Low'),
+        h.get('volume') if 'volume' in h else h.get('Volume')
+    ) for h in history]
+
+
+def _write_ticker_data(cursor, ticker_symbol, data, current_time):
+    """Write one ticker's raw data, info and history rows using an open cursor (no commit)."""
+    # Serialize the data dictionary to JSON for storage
+    data_json = _dumps_ticker_data(data)
+
+    # Save to tickers table (raw data)
+    cursor.execute('''
+        INSERT INTO tickers (ticker, data, last_updated)
+        VALUES (?, ?, ?)
+        ON CONFLICT(ticker) DO UPDATE SET data=excluded.data, last_updated=excluded.last_updated
+    ''', (ticker_symbol, data_json, current_time))
+
+    # Save to ticker_info table (flat fields)
+    info = data.get('info', {})
+    # map(info.get) looks the fields up at C level; nested values are not stored
+    values = [ticker_symbol]
+    values += [None if isinstance(v, (list, dict)) else v for v in map(info.get, _TICKER_INFO_VALUE_FIELDS)]
+    values.append(current_time)
+    cursor.execute(_TICKER_INFO_INSERT_SQL, values)
+    history = data.get('history', [])
+    if history:
+        cursor.executemany(_UPSERT_HISTORY_SQL, _history_rows(ticker_symbol, history))
+
+
+def save_ticker_data_many(items):
+    """
+    Saves or updates several tickers at once, given as a list of (ticker_symbol, data) pairs.
+    All tickers are written in a single transaction, so a cold start with many tickers commits once.
+    A concurrent writer is waited for by SQLite's busy timeout rather than retried here.
+    """
+    if not items:
+        return
+    conn = get_write_connection()
+    with conn:
+        cursor = conn.cursor()
+        current_time = datetime.now().isoformat()
+        for ticker_symbol, data in items:
+            _write_ticker_data(cursor, ticker_symbol, data, current_time)
+    # Invalidate cached payloads and histories of the saved tickers
+    from core.portfolio import clear_ticker_history_cache
+    saved = [ticker_symbol for ticker_symbol, _ in items]
+    data_fetcher.clear_ticker_data_cache(saved)
+    clear_ticker_history_cache(saved)
+
+
+def save_ticker_data(ticker_symbol, data):
+    """
+    Saves or updates the data for a specific ticker in the database, including ticker_info and ticker_history tables.
+    Rows are upserted, which handles both new insertions and updates.
+    """
+    save_ticker_data_many([(ticker_symbol, data)])
 
 
 def create_portfolio(name):
     """Create a portfolio if it doesn't already exist."""
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT OR IGNORE INTO portfolios (name) VALUES (?)",
-        (name,)
-    )
-    conn.commit()
-    conn.close()
+    conn = get_write_connection()
+    with conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT OR IGNORE INTO portfolios (name) VALUES (?)",
+            (name,)
+        )
 
 
-def save_transactions(portfolio, transactions, max_retries=5, base_delay=0.2):
+_TRANSACTION_INSERT_SQL = '''
+    INSERT INTO transactions (portfolio, ticker, quantity, price, date, label, name)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+_HOLDINGS_INSERT_SQL = '''
+    INSERT INTO portfolio_holdings (portfolio, ticker, name, quantity, price, value)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+
+def save_transactions(portfolio, transactions):
     """Save a list of transactions for a portfolio. For each unique ticker, fetch and store ticker data. Returns list of inserted transaction dicts with IDs."""
     # Ensure the portfolio exists in the portfolios table
     create_portfolio(portfolio)
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
-    inserted = []
-    unique_tickers = set()
-    for t in transactions:
-        cursor.execute(
-            """
-            INSERT INTO transactions (portfolio, ticker, quantity, price, date, label, name)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                portfolio,
-                t.get("ticker"),
-                t.get("quantity"),
-                t.get("price"),
-                t.get("date"),
-                t.get("label"),
-                t.get("name"),
-            ),
-        )
-        unique_tickers.add(t.get("ticker"))
-        # Fetch the auto-generated id
-        inserted_id = cursor.lastrowid
-        inserted.append({
-            'id': inserted_id,
+    inserted = [
+        {
             'portfolio': portfolio,
             'ticker': t.get("ticker"),
             'quantity': t.get("quantity"),
@@ -442,28 +591,42 @@ def save_transactions(portfolio, transactions, max_retries=5, base_delay=0.2):
             'date': t.get("date"),
             'label': t.get("label"),
             'name': t.get("name"),
-        })
-    conn.commit()
-    conn.close()
-    # After saving transactions, fetch and store ticker data for each unique ticker using save_ticker_data
-    for ticker in unique_tickers:
-        if not ticker:
-            continue
-        try:
-            data, _ = data_fetcher.fetch_with_cache(ticker)
-            if data:
-                save_ticker_data(ticker, data, max_retries=max_retries, base_delay=base_delay)
-        except Exception as e:
-            print(f"[save_transactions] Failed to fetch/store ticker data for {ticker}: {e}")
-    # Invalidate performance cache for this portfolio
+        }
+        for t in transactions
+    ]
+    unique_tickers = set(t['ticker'] for t in inserted)
+    conn = get_write_connection()
+    with conn:
+        cursor = conn.cursor()
+        cursor.executemany(
+            _TRANSACTION_INSERT_SQL,
+            [(t['portfolio'], t['ticker'], t['quantity'], t['price'], t['date'], t['label'], t['name']) for t in inserted],
+        )
+        # The rows of one statement get consecutive ids while this transaction holds the write lock:
+        # recover them from the last one
+        last_id = cursor.execute("SELECT last_insert_rowid()").fetchone()[0]
+    first_id = last_id - len(inserted) + 1
+    inserted = [{'id': first_id + i, **t} for i, t in enumerate(inserted)]
+    # After saving transactions, fetch ticker data for each unique ticker and store it all in one transaction
+    pending_saves = []
+    try:
+        fetched = data_fetcher.fetch_many_with_cache([ticker for ticker in unique_tickers if ticker], save=False)
+        pending_saves = [(ticker, data) for ticker, data in fetched.items() if data]
+    except Exception as e:
+        print(f"[save_transactions] Failed to fetch ticker data for {', '.join(t for t in unique_tickers if t)}: {e}")
+    try:
+        save_ticker_data_many(pending_saves)
+    except Exception as e:
+        print(f"[save_transactions] Failed to store ticker data for {', '.join(t for t, _ in pending_saves)}: {e}")
+    # Invalidate the performance caches of the tickers that got new transactions
     from core.portfolio import clear_performance_caches
-    clear_performance_caches(portfolio)
+    clear_performance_caches(portfolio, tickers={t for t in unique_tickers if t})
     return inserted
 
 
 def get_transactions(portfolio=None):
     """Get all transactions, or all for a given portfolio."""
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = get_read_connection()
     cursor = conn.cursor()
     if portfolio:
         cursor.execute(
@@ -475,7 +638,6 @@ def get_transactions(portfolio=None):
             "SELECT id, portfolio, ticker, quantity, price, date, label, name FROM transactions ORDER BY date ASC, id ASC"
         )
     rows = cursor.fetchall()
-    conn.close()
     keys = ["id", "portfolio", "ticker", "quantity", "price", "date", "label", "name"]
     return [dict(zip(keys, row)) for row in rows]
 
@@ -492,106 +654,119 @@ def aggregate_positions(transactions):
 
 def save_portfolio_status(portfolio, status):
     """Save the computed portfolio status (holdings, total_value) to the new flat tables."""
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
-    # Ensure tables exist
-    init_db()
-    # Remove old status if exists
-    cursor.execute('DELETE FROM portfolio_status WHERE portfolio = ?', (portfolio,))
-    cursor.execute('DELETE FROM portfolio_holdings WHERE portfolio = ?', (portfolio,))
-    # Insert new status
-    total_value = status.get('total_value', 0)
-    last_updated = datetime.now().isoformat()
-    cursor.execute('''
-        INSERT INTO portfolio_status (portfolio, total_value, last_updated)
-        VALUES (?, ?, ?)
-    ''', (portfolio, total_value, last_updated))
-    # Insert holdings
-    holdings = status.get('holdings', [])
-    for h in holdings:
+    conn = get_write_connection()
+    with conn:
+        cursor = conn.cursor()
+        # portfolio is the primary key of portfolio_status: update the previous row, if any
+        total_value = status.get('total_value', 0)
+        last_updated = datetime.now().isoformat()
         cursor.execute('''
-            INSERT INTO portfolio_holdings (portfolio, ticker, name, quantity, price, value)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (
+            INSERT INTO portfolio_status (portfolio, total_value, last_updated)
+            VALUES (?, ?, ?)
+            ON CONFLICT(portfolio) DO UPDATE SET total_value=excluded.total_value, last_updated=excluded.last_updated
+        ''', (portfolio, total_value, last_updated))
+        # Replace the holdings
+        holdings = status.get('holdings', [])
+        cursor.execute('DELETE FROM portfolio_holdings WHERE portfolio = ?', (portfolio,))
+        cursor.executemany(_HOLDINGS_INSERT_SQL, [(
             portfolio,
             h.get('ticker'),
             h.get('name'),
             h.get('quantity', 0),
             h.get('price', 0),
             h.get('value', 0)
-        ))
-    conn.commit()
-    conn.close()
+        ) for h in holdings])
+    _clear_status_cache(portfolio)
+
+
+# In-process copy of the saved portfolio statuses: portfolio -> (status, last_updated).
+# A saved status only changes through save_portfolio_status/delete_portfolio, which drop the entry and bump the
+# portfolio's generation: a load that started before the write sees a newer generation and doesn't store its result.
+_STATUS_CACHE_MAXSIZE = 256
+_STATUS_CACHE_TTL = 60  # seconds
+_STATUS_CACHE = TTLCache(maxsize=_STATUS_CACHE_MAXSIZE, ttl=_STATUS_CACHE_TTL)
+_STATUS_VERSIONS = defaultdict(int)
+_STATUS_CACHE_LOCK = threading.Lock()
+
+
+def _clear_status_cache(portfolio):
+    with _STATUS_CACHE_LOCK:
+        _STATUS_VERSIONS[portfolio] += 1
+        _STATUS_CACHE.pop(portfolio, None)
 
 
 def get_portfolio_status_saved(portfolio):
-    """Retrieve the saved portfolio status from the new flat tables. If missing, auto-create an empty status using yfinance (via data_fetcher)."""
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
-    # Get top-level status
-    cursor.execute('''
-        SELECT total_value, last_updated FROM portfolio_status WHERE portfolio = ?
-    ''', (portfolio,))
-    row = cursor.fetchone()
-    if not row:
-        # Auto-create empty status if missing, using yfinance for tickers
-        transactions = get_transactions(portfolio)
-        positions = aggregate_positions(transactions)
-        holdings = []
-        total_value = 0.0
-        for ticker, qty in positions.items():
-            if qty == 0:
-                continue
-            # Fetch latest info from yfinance (via data_fetcher)
-            data, _ = data_fetcher.fetch_with_cache(ticker)
-            info = (data or {}).get('info', {})
-            price = info.get('regularMarketPrice') or 0
-            name = info.get('shortName') or ticker
-            value = price * qty
-            total_value += value
-            holdings.append({
-                'ticker': ticker,
-                'name': name,
-                'quantity': qty,
-                'price': price,
-                'value': value
-            })
-        last_updated = datetime.now().isoformat()
-        cursor.execute('''
-            INSERT INTO portfolio_status (portfolio, total_value, last_updated)
-            VALUES (?, ?, ?)
-        ''', (portfolio, total_value, last_updated))
-        # Insert holdings
-        for h in holdings:
-            cursor.execute('''
-                INSERT INTO portfolio_holdings (portfolio, ticker, name, quantity, price, value)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                portfolio,
-                h['ticker'],
-                h['name'],
-                h['quantity'],
-                h['price'],
-                h['value']
-            ))
-        conn.commit()
-    else:
-        total_value, last_updated = row
-        # Get holdings
+    """
+    Retrieve the saved portfolio status from the new flat tables. If missing, auto-create an empty status using yfinance (via data_fetcher).
+    Statuses are served from an in-process cache for up to _STATUS_CACHE_TTL seconds; treat the returned dict as read-only.
+    """
+    with _STATUS_CACHE_LOCK:
+        version = _STATUS_VERSIONS[portfolio]
+        entry = _STATUS_CACHE.get(portfolio)
+        if entry is not None:
+            return entry
+    status, last_updated = _load_portfolio_status(portfolio)
+    with _STATUS_CACHE_LOCK:
+        if _STATUS_VERSIONS[portfolio] == version:
+            _STATUS_CACHE[portfolio] = (status, last_updated)
+    return status, last_updated
+
+
+def _load_portfolio_status(portfolio):
+    conn = get_write_connection()
+    with conn:
+        cursor = conn.cursor()
+        # Get top-level status
         cursor.execute('''
-            SELECT ticker, name, quantity, price, value FROM portfolio_holdings WHERE portfolio = ?
+            SELECT total_value, last_updated FROM portfolio_status WHERE portfolio = ?
         ''', (portfolio,))
-        holdings = [
-            {
-                'ticker': h[0],
-                'name': h[1],
-                'quantity': h[2],
-                'price': h[3],
-                'value': h[4]
-            }
-            for h in cursor.fetchall()
-        ]
-    conn.close()
+        row = cursor.fetchone()
+        if not row:
+            # Auto-create empty status if missing, using yfinance for tickers
+            transactions = get_transactions(portfolio)
+            positions = aggregate_positions(transactions)
+            holdings = []
+            total_value = 0.0
+            for ticker, qty in positions.items():
+                if qty == 0:
+                    continue
+                # Fetch latest info from yfinance (via data_fetcher)
+                data, _ = data_fetcher.fetch_with_cache(ticker)
+                info = (data or {}).get('info', {})
+                price = info.get('regularMarketPrice') or 0
+                name = info.get('shortName') or ticker
+                value = price * qty
+                total_value += value
+                holdings.append({
+                    'ticker': ticker,
+                    'name': name,
+                    'quantity': qty,
+                    'price': price,
+                    'value': value
+                })
+            last_updated = datetime.now().isoformat()
+            cursor.execute('''
+                INSERT INTO portfolio_status (portfolio, total_value, last_updated)
+                VALUES (?, ?, ?)
+            ''', (portfolio, total_value, last_updated))
+            # Insert holdings
+            cursor.executemany(_HOLDINGS_INSERT_SQL, [(portfolio, h['ticker'], h['name'], h['quantity'], h['price'], h['value']) for h in holdings])
+        else:
+            total_value, last_updated = row
+            # Get holdings
+            cursor.execute('''
+                SELECT ticker, name, quantity, price, value FROM portfolio_holdings WHERE portfolio = ?
+            ''', (portfolio,))
+            holdings = [
+                {
+                    'ticker': h[0],
+                    'name': h[1],
+                    'quantity': h[2],
+                    'price': h[3],
+                    'value': h[4]
+                }
+                for h in cursor.fetchall()
+            ]
     status = {
         'total_value': total_value,
         'holdings': holdings
@@ -601,14 +776,14 @@ def get_portfolio_status_saved(portfolio):
 
 def delete_portfolio(portfolio_name):
     """Delete a portfolio and all its related data (transactions, status)."""
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM transactions WHERE portfolio = ?", (portfolio_name,))
-    cursor.execute("DELETE FROM portfolio_status WHERE portfolio = ?", (portfolio_name,))
-    cursor.execute("DELETE FROM portfolio_holdings WHERE portfolio = ?", (portfolio_name,))
-    cursor.execute("DELETE FROM portfolios WHERE name = ?", (portfolio_name,))
-    conn.commit()
-    conn.close()
+    conn = get_write_connection()
+    with conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM transactions WHERE portfolio = ?", (portfolio_name,))
+        cursor.execute("DELETE FROM portfolio_status WHERE portfolio = ?", (portfolio_name,))
+        cursor.execute("DELETE FROM portfolio_holdings WHERE portfolio = ?", (portfolio_name,))
+        cursor.execute("DELETE FROM portfolios WHERE name = ?", (portfolio_name,))
+    _clear_status_cache(portfolio_name)
     # Invalidate performance cache for this portfolio
     from core.portfolio import clear_performance_caches
     clear_performance_caches(portfolio_name)
@@ -616,107 +791,80 @@ def delete_portfolio(portfolio_name):
 
 def delete_transaction(portfolio_name, transaction_id):
     """Delete a specific transaction by ID for a portfolio."""
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM transactions WHERE id = ? AND portfolio = ?", (transaction_id, portfolio_name))
-    conn.commit()
-    conn.close()
-    # Invalidate performance cache for this portfolio
+    conn = get_write_connection()
+    with conn:
+        cursor = conn.cursor()
+        row = cursor.execute(
+            "SELECT ticker FROM transactions WHERE id = ? AND portfolio = ?", (transaction_id, portfolio_name)
+        ).fetchone()
+        if row is None:
+            return
+        cursor.execute("DELETE FROM transactions WHERE id = ? AND portfolio = ?", (transaction_id, portfolio_name))
+    # Invalidate the performance caches of the deleted transaction's ticker only
     from core.portfolio import clear_performance_caches
-    clear_performance_caches(portfolio_name)
+    clear_performance_caches(portfolio_name, tickers={row[0]} if row[0] else None)
 
 
 def get_all_portfolio_names():
     """Return a list of all portfolio names in the database."""
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = get_read_connection()
     cursor = conn.cursor()
     cursor.execute("SELECT distinct name FROM portfolios ORDER BY name")
     rows = cursor.fetchall()
-    conn.close()
     return [row[0] for row in rows]
 
 
 def get_transaction_by_id(transaction_id):
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = get_read_connection()
     cursor = conn.cursor()
     cursor.execute(
         "SELECT id, portfolio, ticker, quantity, price, date, label, name FROM transactions WHERE id = ?",
         (transaction_id,)
     )
     row = cursor.fetchone()
-    conn.close()
     if row:
         keys = ["id", "portfolio", "ticker", "quantity", "price", "date", "label", "name"]
         return dict(zip(keys, row))
     return None
 
 
+_MIGRATED_INFO_FIELDS = (
+    'shortName', 'longName', 'symbol', 'sector', 'industry', 'country', 'website', 'marketCap', 'currency', 'exchange',
+    'quoteType', 'regularMarketPrice', 'previousClose', 'open', 'dayHigh', 'dayLow', 'fiftyTwoWeekHigh', 'fiftyTwoWeekLow',
+    'volume', 'averageVolume', 'trailingPE', 'forwardPE', 'dividendYield', 'longBusinessSummary'
+)
+_MIGRATED_INFO_INSERT_SQL = f'''
+    INSERT OR REPLACE INTO ticker_info (ticker, {', '.join(_MIGRATED_INFO_FIELDS)}, last_updated)
+    VALUES ({', '.join(['?'] * (len(_MIGRATED_INFO_FIELDS) + 2))})
+'''
+_MIGRATION_BATCH_SIZE = 500
+
+
 def migrate_tickers_to_new_schema():
-    """Migrate data from old tickers table to ticker_info and ticker_history tables (with OHLCV fields)."""
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
-    cursor.execute('SELECT ticker, data, last_updated FROM tickers')
-    rows = cursor.fetchall()
-    for row in rows:
-        ticker, data_json, last_updated = row
+    """
+    Migrate data from old tickers table to ticker_info and ticker_history tables (with OHLCV fields).
+    All payloads are parsed first, then written in a single transaction with batched executemany calls.
+    """
+    conn = get_write_connection()
+    info_rows = []
+    history_rows = []
+    for ticker, data_json, last_updated in conn.execute('SELECT ticker, data, last_updated FROM tickers').fetchall():
         try:
-            data = json.loads(data_json)
+            data = _loads_ticker_data(data_json)
             info = data.get('info', {})
-            history = data.get('history', [])
-            # Insert into ticker_info
-            cursor.execute('''
-                INSERT OR REPLACE INTO ticker_info (
-                    ticker, shortName, longName, symbol, sector, industry, country, website, marketCap, currency, exchange, quoteType, regularMarketPrice, previousClose, open, dayHigh, dayLow, fiftyTwoWeekHigh, fiftyTwoWeekLow, volume, averageVolume, trailingPE, forwardPE, dividendYield, longBusinessSummary, last_updated
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                ticker,
-                info.get('shortName'),
-                info.get('longName'),
-                info.get('symbol'),
-                info.get('sector'),
-                info.get('industry'),
-                info.get('country'),
-                info.get('website'),
-                info.get('marketCap'),
-                info.get('currency'),
-                info.get('exchange'),
-                info.get('quoteType'),
-                info.get('regularMarketPrice'),
-                info.get('previousClose'),
-                info.get('open'),
-                info.get('dayHigh'),
-                info.get('dayLow'),
-                info.get('fiftyTwoWeekHigh'),
-                info.get('fiftyTwoWeekLow'),
-                info.get('volume'),
-                info.get('averageVolume'),
-                info.get('trailingPE'),
-                info.get('forwardPE'),
-                info.get('dividendYield'),
-                info.get('longBusinessSummary'),
-                last_updated
-            ))
-            # Insert into ticker_history (with OHLCV fields)
-            for h in history:
-                date = h.get('date')
-                open_ = h.get('open')
-                close = h.get('close')
-                high = h.get('high')
-                low = h.get('low')
-                volume = h.get('volume')
-                if date is not None:
-                    cursor.execute('''
-                        INSERT INTO ticker_history (ticker, date, open, close, high, low, volume) VALUES (?, ?, ?, ?, ?, ?, ?)
-                    ''', (ticker, date, open_, close, high, low, volume))
+            info_rows.append((ticker, *map(info.get, _MIGRATED_INFO_FIELDS), last_updated))
+            history_rows.extend(row for row in _history_rows(ticker, data.get('history', [])) if row[1] is not None)
         except Exception as e:
             print(f"Migration failed for ticker {ticker}: {e}")
-    conn.commit()
-    conn.close()
+    with conn:
+        cursor = conn.cursor()
+        for start in range(0, len(info_rows), _MIGRATION_BATCH_SIZE):
+            cursor.executemany(_MIGRATED_INFO_INSERT_SQL, info_rows[start:start + _MIGRATION_BATCH_SIZE])
+        cursor.executemany(_UPSERT_HISTORY_SQL, history_rows)
 
 
 def fix_history_date_column(df):
     """Ensure the 'Date' column in a DataFrame is datetime type before using .dt accessor."""
-    import pandas as pd
     if 'Date' in df.columns:
         df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
     return df
@@ -727,109 +875,272 @@ def get_ticker_history(ticker):
     Return a list of dicts with historical OHLCV data for the given ticker, sorted by date ascending.
     Each dict contains: date, open, close, high, low, volume.
     """
-    conn = sqlite3.connect(DATABASE_NAME)
-    conn.row_factory = sqlite3.Row
+    conn = get_read_connection()
     cursor = conn.cursor()
+    # Plain tuples unpacked into a dict literal: cheaper than building a sqlite3.Row and converting it per row
+    cursor.row_factory = None
     cursor.execute('''
         SELECT date, open, close, high, low, volume
         FROM ticker_history
         WHERE ticker = ?
         ORDER BY date ASC
     ''', (ticker,))
-    rows = cursor.fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
+    return [
+        {'date': date, 'open': open_, 'close': close, 'high': high, 'low': low, 'volume': volume}
+        for date, open_, close, high, low, volume in cursor.fetchall()
+    ]
+
+
+def _pack_report(report):
+    """Serialize a generated report for storage: orjson bytes, zlib-compressed (report text is very repetitive)."""
+    return zlib.compress(orjson.dumps(report, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS))
+
+
+def _unpack_report(stored):
+    """Parse a stored report: compressed bytes, or the plain JSON text of reports saved before compression."""
+    if isinstance(stored, bytes):
+        return orjson.loads(zlib.decompress(stored))
+    return _loads_ticker_data(stored)
+
+
+# Format of the stored reference_date strings (local time). Their fixed width keeps string comparisons in date order
+_REFERENCE_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+# Short-lived cache of decoded reports, so that UI refreshes skip the query and the blob decompression:
+# (table, owner, reference_date or None) -> report dict or None, least recently used first out. Saving a report drops
+# its owner's entries
+_REPORT_CACHE_MAXSIZE = 512
+_REPORT_CACHE_TTL = 60  # seconds
+_REPORT_CACHE = TTLCache(maxsize=_REPORT_CACHE_MAXSIZE, ttl=_REPORT_CACHE_TTL)
+_REPORT_CACHE_LOCK = threading.Lock()
+_REPORT_CACHE_MISS = object()
+
+
+def _report_cache_get(key):
+    with _REPORT_CACHE_LOCK:
+        return _REPORT_CACHE.get(key, _REPORT_CACHE_MISS)
+
+
+def _report_cache_put(key, report):
+    with _REPORT_CACHE_LOCK:
+        _REPORT_CACHE[key] = report
+
+
+def _clear_report_cache(table, owners):
+    with _REPORT_CACHE_LOCK:
+        for key in [key for key in _REPORT_CACHE if key[0] == table and key[1] in owners]:
+            del _REPORT_CACHE[key]
+
+
+# A report saved again for the same owner and reference date overwrites the stored one in place
+# (same id, no delete + insert of the row and its index entries). created_at is refreshed like OR REPLACE did:
+# the per-day readers return the most recently written report of the day (ORDER BY created_at DESC)
+_PORTFOLIO_REPORT_UPSERT_SQL = '''
+    INSERT INTO portfolio_reports (portfolio, report_json, cost, reference_date) VALUES (?, ?, ?, ?)
+    ON CONFLICT(portfolio, reference_date) DO UPDATE SET
+        report_json = excluded.report_json, cost = excluded.cost, created_at = CURRENT_TIMESTAMP
+'''
+_TICKER_REPORT_UPSERT_SQL = '''
+    INSERT INTO ticker_reports (ticker, report_json, cost, reference_date) VALUES (?, ?, ?, ?)
+    ON CONFLICT(ticker, reference_date) DO UPDATE SET
+        report_json = excluded.report_json, cost = excluded.cost, created_at = CURRENT_TIMESTAMP
+'''
+
+
+def _report_from_row(row):
+    """Report dict of a report_json/cost/reference_date row, with its cost and reference_date added."""
+    report_data = _unpack_report(row['report_json'])
+    report_data['cost'] = row['cost']
+    report_data['reference_date'] = row['reference_date']
+    return report_data
+
+
+def _day_bounds(day):
+    """
+    [start, end) bounds of the stored 'YYYY-MM-DD HH:MM:SS' reference dates falling on `day` (YYYY-MM-DD).
+    Unlike DATE(reference_date) = ?, a range on the bare column can seek the (owner, reference_date) indexes.
+    """
+    return day, (date.fromisoformat(day) + timedelta(days=1)).isoformat()
 
 
 def save_portfolio_report(portfolio, report, reference_date=None, cost=None):
     """Save a generated portfolio report to the portfolio_reports table. reference_date is an ISO datetime string (default: now)."""
     if reference_date is None:
-        reference_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
-    report_json = json.dumps(report)
-    cursor.execute('''
-        INSERT OR REPLACE INTO portfolio_reports (portfolio, report_json, cost, reference_date)
-        VALUES (?, ?, ?, ?)
-    ''', (portfolio, report_json, cost, reference_date))
-    conn.commit()
-    conn.close()
+        reference_date = time.strftime(_REFERENCE_DATE_FORMAT)
+    conn = get_write_connection()
+    with conn:
+        cursor = conn.cursor()
+        report_json = _pack_report(report)
+        cursor.execute(_PORTFOLIO_REPORT_UPSERT_SQL, (portfolio, report_json, cost, reference_date))
+    _clear_report_cache('portfolio_reports', {portfolio})
 
 
 def get_portfolio_report(portfolio, reference_date=None):
-    """Retrieve a portfolio report for a given portfolio and reference date (ISO datetime string). If reference_date is None, return the latest report. Returns dict with report/cost and reference_date, or None."""
-    conn = sqlite3.connect(DATABASE_NAME)
+    """
+    Retrieve a portfolio report for a given portfolio on a reference date (YYYY-MM-DD). If reference_date is None, return the latest report. Returns dict with report/cost and reference_date, or None.
+    Reports are served from an in-process cache for up to _REPORT_CACHE_TTL seconds; treat the returned dict as read-only.
+    """
+    key = ('portfolio_reports', portfolio, reference_date or None)
+    report = _report_cache_get(key)
+    if report is _REPORT_CACHE_MISS:
+        report = _load_portfolio_report(portfolio, reference_date)
+        _report_cache_put(key, report)
+    return report
+
+
+def _load_portfolio_report(portfolio, reference_date):
+    conn = get_read_connection()
     cursor = conn.cursor()
     if reference_date:
         cursor.execute('''
-            SELECT report_json, cost, reference_date FROM portfolio_reports WHERE portfolio = ? AND DATE(reference_date) = ? ORDER BY created_at DESC LIMIT 1
-        ''', (portfolio, reference_date))
+            SELECT report_json, cost, reference_date FROM portfolio_reports WHERE portfolio = ? AND reference_date >= ? AND reference_date < ? ORDER BY created_at DESC LIMIT 1
+        ''', (portfolio, *_day_bounds(reference_date)))
     else:
         cursor.execute('''
             SELECT report_json, cost, reference_date FROM portfolio_reports WHERE portfolio = ? ORDER BY reference_date DESC, created_at DESC LIMIT 1
         ''', (portfolio,))
     row = cursor.fetchone()
-    conn.close()
-    if row:
-        report_data = json.loads(row[0])
-        report_data['cost'] = row[1]
-        report_data['reference_date'] = row[2]
-        return report_data
-    return None
+    return _report_from_row(row) if row else None
 
 
 def save_ticker_report(ticker, report, reference_date=None, cost=None):
     """Save a generated ticker report to the ticker_reports table. reference_date is an ISO datetime string (default: now)."""
     if reference_date is None:
-        reference_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
-    report_json = json.dumps(report)
-    cursor.execute('''
-        INSERT OR REPLACE INTO ticker_reports (ticker, report_json, cost, reference_date)
-        VALUES (?, ?, ?, ?)
-    ''', (ticker, report_json, cost, reference_date))
-    conn.commit()
-    conn.close()
+        reference_date = time.strftime(_REFERENCE_DATE_FORMAT)
+    conn = get_write_connection()
+    with conn:
+        cursor = conn.cursor()
+        report_json = _pack_report(report)
+        cursor.execute(_TICKER_REPORT_UPSERT_SQL, (ticker, report_json, cost, reference_date))
+    _clear_report_cache('ticker_reports', {ticker})
 
 
 def get_ticker_report(ticker, reference_date=None):
-    """Retrieve a ticker report for a given ticker and reference date (ISO datetime string). If reference_date is None, return the latest report. Returns dict with report/cost and reference_date, or None."""
-    conn = sqlite3.connect(DATABASE_NAME)
+    """
+    Retrieve a ticker report for a given ticker on a reference date (YYYY-MM-DD). If reference_date is None, return the latest report. Returns dict with report/cost and reference_date, or None.
+    Reports are served from an in-process cache for up to _REPORT_CACHE_TTL seconds; treat the returned dict as read-only.
+    """
+    key = ('ticker_reports', ticker, reference_date or None)
+    report = _report_cache_get(key)
+    if report is _REPORT_CACHE_MISS:
+        report = _load_ticker_report(ticker, reference_date)
+        _report_cache_put(key, report)
+    return report
+
+
+def _load_ticker_report(ticker, reference_date):
+    conn = get_read_connection()
     cursor = conn.cursor()
-    # Table: ticker_reports (id, ticker, report_json, cost, reference_date, created_at)
-    # If not exists, create it (for backward compatibility)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS ticker_reports (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ticker TEXT NOT NULL,
-            report_json TEXT NOT NULL,
-            cost REAL,
-            reference_date DATETIME NOT NULL,
-            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(ticker, reference_date)
-        )
-    ''')
+    # The ticker_reports table is created by init_db
     if reference_date:
         cursor.execute('''
-            SELECT report_json, cost, reference_date FROM ticker_reports WHERE ticker = ? AND DATE(reference_date) = ? ORDER BY created_at DESC LIMIT 1
-        ''', (ticker, reference_date))
+            SELECT report_json, cost, reference_date FROM ticker_reports WHERE ticker = ? AND reference_date >= ? AND reference_date < ? ORDER BY created_at DESC LIMIT 1
+        ''', (ticker, *_day_bounds(reference_date)))
     else:
         cursor.execute('''
             SELECT report_json, cost, reference_date FROM ticker_reports WHERE ticker = ? ORDER BY reference_date DESC, created_at DESC LIMIT 1
         ''', (ticker,))
     row = cursor.fetchone()
-    conn.close()
-    if row:
-        report_data = json.loads(row[0])
-        report_data['cost'] = row[1]
-        report_data['reference_date'] = row[2]
-        return report_data
-    return None
+    return _report_from_row(row) if row else None
+
+
+def save_ticker_reports_many(items, reference_date=None):
+    """Save several generated ticker reports, given as (ticker, report, cost) tuples, in a single transaction."""
+    if not items:
+        return
+    if reference_date is None:
+        reference_date = time.strftime(_REFERENCE_DATE_FORMAT)
+    conn = get_write_connection()
+    with conn:
+        cursor = conn.cursor()
+        cursor.executemany(
+            _TICKER_REPORT_UPSERT_SQL,
+            [(ticker, _pack_report(report), cost, reference_date) for ticker, report, cost in items],
+        )
+    _clear_report_cache('ticker_reports', {ticker for ticker, _, _ in items})
 
 
+def migrate_reports_to_blobs():
+    """
+    Rewrite the reports saved before compression (plain JSON text in report_json) as compressed blobs.
+    Newer rows already hold blobs and are left alone. Returns the number of rewritten rows.
+    """
+    conn = get_write_connection()
+    rewritten = 0
+    with conn:
+        for table in ('portfolio_reports', 'ticker_reports'):
+            rows = conn.execute(f"SELECT id, report_json FROM {table} WHERE typeof(report_json) = 'text'").fetchall()
+            updates = []
+            for report_id, report_json in rows:
+                try:
+                    updates.append((_pack_report(_loads_ticker_data(report_json)), report_id))
+                except Exception as e:
+                    print(f"Migration failed for {table} row {report_id}: {e}")
+            conn.executemany(f"UPDATE {table} SET report_json = ? WHERE id = ?", updates)
+            rewritten += len(updates)
+    return rewritten
+
+
+def get_ticker_reports_many(tickers, reference_date=None):
+    """
+    Retrieve the latest report of several tickers, optionally only reports of the given date (YYYY-MM-DD).
+    Returns {ticker: dict with report/cost and reference_date}; tickers without a report are missing from it.
+    Reports cached by get_ticker_report/earlier calls are reused; treat the report dicts as read-only.
+    """
+    tickers = [t for t in dict.fromkeys(tickers) if t is not None]
+    reference_date = reference_date or None
+    found = {}
+    missing = []
+    for ticker in tickers:
+        report = _report_cache_get(('ticker_reports', ticker, reference_date))
+        if report is _REPORT_CACHE_MISS:
+            missing.append(ticker)
+        else:
+            found[ticker] = report
+    if missing:
+        loaded = _load_ticker_reports_many(missing, reference_date)
+        for ticker in missing:
+            found[ticker] = loaded.get(ticker)
+            _report_cache_put(('ticker_reports', ticker, reference_date), found[ticker])
+    return {ticker: found[ticker] for ticker in tickers if found[ticker] is not None}
+
+
+def _load_ticker_reports_many(tickers, reference_date):
+    """
+    Query behind get_ticker_reports_many. A first query on ids/dates only picks the latest report of each ticker;
+    only those report blobs are then loaded.
+    """
+    if not tickers:
+        return {}
+    conn = get_read_connection()
+    placeholders = ', '.join('?' * len(tickers))
+    query = f"SELECT id, ticker FROM ticker_reports WHERE ticker IN ({placeholders})"
+    params = list(tickers)
+    # Same pick as get_ticker_report (whose cache entries are shared): the last written report of the day, or the
+    # report with the latest reference date
+    if reference_date:
+        query += " AND reference_date >= ? AND reference_date < ? ORDER BY created_at DESC"
+        params.extend(_day_bounds(reference_date))
+    else:
+        query += " ORDER BY reference_date DESC, created_at DESC"
+    latest_ids = {}
+    for row in conn.execute(query, params):
+        latest_ids.setdefault(row['ticker'], row['id'])
+    if not latest_ids:
+        return {}
+    rows = conn.execute(
+        f"SELECT ticker, report_json, cost, reference_date FROM ticker_reports WHERE id IN ({', '.join('?' * len(latest_ids))})",
+        list(latest_ids.values())
+    ).fetchall()
+    reports = {}
+    for row in rows:
+        reports[row['ticker']] = _report_from_row(row)
+    return {ticker: reports[ticker] for ticker in latest_ids}
+
 if __name__ == "__main__":
     # Run migration if needed
     init_db()
     migrate_tickers_to_new_schema()
+    migrate_reports_to_blobs()
     print("Migration complete.")
@@ -0,0 +1,32 @@
+"""
+Column layout shared by the database and the modules producing the data stored in it.
+Kept free of imports so that any backend module can import it without an import cycle.
+"""
+
+# Fields of a Yahoo Finance ticker info payload stored in the ticker_info table, in column order ('ticker' first).
+# New fields are appended: init_db adds their columns to existing databases
+TICKER_INFO_FIELDS = [
+    'ticker', 'shortName', 'longName', 'symbol', 'sector', 'sectorKey', 'sectorDisp', 'industry', 'industryKey', 'industryDisp',
+    'country', 'address1', 'address2', 'city', 'zip', 'phone', 'website', 'fullTimeEmployees', 'longBusinessSummary',
+    'maxAge', 'priceHint', 'previousClose', 'open', 'dayLow', 'dayHigh', 'regularMarketPreviousClose', 'regularMarketOpen',
+    'regularMarketDayLow', 'regularMarketDayHigh', 'dividendRate', 'dividendYield', 'exDividendDate', 'payoutRatio', 'beta',
+    'trailingPE', 'volume', 'regularMarketVolume', 'averageVolume', 'averageVolume10days', 'averageDailyVolume10Day', 'bid', 'ask',
+    'marketCap', 'fiftyTwoWeekLow', 'fiftyTwoWeekHigh', 'priceToSalesTrailing12Months', 'fiftyDayAverage', 'twoHundredDayAverage',
+    'trailingAnnualDividendRate', 'trailingAnnualDividendYield', 'currency', 'tradeable', 'enterpriseValue', 'forwardPE',
+    'profitMargins', 'floatShares', 'sharesOutstanding', 'heldPercentInsiders', 'heldPercentInstitutions', 'impliedSharesOutstanding',
+    'bookValue', 'priceToBook', 'lastFiscalYearEnd', 'nextFiscalYearEnd', 'mostRecentQuarter', 'earningsQuarterlyGrowth',
+    'netIncomeToCommon', 'trailingEps', 'enterpriseToRevenue', 'enterpriseToEbitda',
+    'lastDividendValue', 'lastDividendDate', 'quoteType', 'currentPrice', 'targetHighPrice', 'targetLowPrice', 'targetMeanPrice',
+    'targetMedianPrice', 'recommendationMean', 'recommendationKey', 'numberOfAnalystOpinions', 'totalCash', 'totalCashPerShare',
+    'ebitda', 'totalDebt', 'quickRatio', 'currentRatio', 'totalRevenue', 'debtToEquity', 'revenuePerShare', 'returnOnAssets',
+    'returnOnEquity', 'grossProfits', 'freeCashflow', 'operatingCashflow', 'earningsGrowth', 'revenueGrowth', 'grossMargins',
+    'ebitdaMargins', 'operatingMargins', 'financialCurrency', 'language', 'region', 'typeDisp', 'quoteSourceName', 'triggerable',
+    'customPriceAlertConfidence', 'regularMarketChange', 'regularMarketDayRange', 'fullExchangeName', 'averageDailyVolume3Month',
+    'fiftyTwoWeekLowChange', 'fiftyTwoWeekLowChangePercent', 'fiftyTwoWeekRange', 'fiftyTwoWeekHighChange',
+    'fiftyTwoWeekHighChangePercent', 'fiftyTwoWeekChangePercent', 'epsTrailingTwelveMonths', 'epsCurrentYear', 'priceEpsCurrentYear',
+    'fiftyDayAverageChange', 'fiftyDayAverageChangePercent', 'twoHundredDayAverageChange', 'twoHundredDayAverageChangePercent',
+    'sourceInterval', 'exchangeDataDelayedBy', 'averageAnalystRating', 'cryptoTradeable', 'corporateActions', 'regularMarketTime',
+    'exchange', 'messageBoardId', 'exchangeTimezoneName', 'exchangeTimezoneShortName', 'gmtOffSetMilliseconds', 'market',
+    'esgPopulated', 'hasPrePostMarketData', 'firstTradeDateMilliseconds', 'regularMarketChangePercent', 'regularMarketPrice',
+    'marketState', 'trailingPegRatio'
+]
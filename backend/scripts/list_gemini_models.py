@@ -1,12 +1,38 @@
 import google.generativeai as genai
 import os
+import sys
+import time
+import orjson
 
-API_KEY = os.getenv("GEMINI_API_KEY")
-if not API_KEY:
-    raise RuntimeError("GEMINI_API_KEY not set")
+# The model list rarely changes: keep it on disk for a day instead of calling the API on every run
+_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "portfolio-pilot", "gemini_models.json")
+_CACHE_TTL = 24 * 3600  # seconds
 
-genai.configure(api_key=API_KEY)
 
-print("Available Gemini models:")
-for m in genai.list_models():
-    print(m.name)
+def list_model_names(refresh=False):
+    """Names of the available Gemini models, read from the on-disk cache when it is less than _CACHE_TTL old."""
+    if not refresh:
+        try:
+            if time.time() - os.path.getmtime(_CACHE_PATH) < _CACHE_TTL:
+                with open(_CACHE_PATH, "rb") as f:
+                    return orjson.loads(f.read())
+        except (OSError, orjson.JSONDecodeError):
+            pass
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise RuntimeError("GEMINI_API_KEY not set")
+    genai.configure(api_key=api_key)
+    names = [m.name for m in genai.list_models()]
+    try:
+        os.makedirs(os.path.dirname(_CACHE_PATH), exist_ok=True)
+        with open(_CACHE_PATH, "wb") as f:
+            f.write(orjson.dumps(names))
+    except OSError as e:
+        print(f"Could not cache the model list in {_CACHE_PATH}: {e}")
+    return names
+
+
+if __name__ == "__main__":
+    print("Available Gemini models:")
+    for name in list_model_names(refresh="--refresh" in sys.argv[1:]):
+        print(name)
@@ -1,11 +1,102 @@
 import yfinance as yf
 from datetime import datetime, timedelta
 from db import database
+from db.schema import TICKER_INFO_FIELDS
 import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from cachetools import TTLCache
 
+# In-process cache of stored ticker payloads, in front of the SQLite tickers table:
+# ticker -> (data, last_updated), least recently used first out. Saving a ticker drops its entry.
+_MEM_CACHE_MAXSIZE = 256
+_MEM_CACHE_TTL = 3600  # seconds
+_MEM_CACHE = TTLCache(maxsize=_MEM_CACHE_MAXSIZE, ttl=_MEM_CACHE_TTL)
+_MEM_CACHE_LOCK = Lock()
+# Tickers Yahoo Finance has no info for, not asked for again for _UNKNOWN_TICKER_TTL seconds.
+# Fetches that failed with an error (network, rate limit, ...) are not remembered and are retried on the next call.
+_UNKNOWN_TICKER_TTL = 300  # seconds
+_UNKNOWN_TICKERS = TTLCache(maxsize=1024, ttl=_UNKNOWN_TICKER_TTL)  # ticker -> True
+_UNKNOWN_TICKERS_LOCK = Lock()
+# Info keys kept by _fetch_from_yfinance: the ticker_info table columns
+_INFO_WHITELIST = frozenset(TICKER_INFO_FIELDS)
+# Returned by _fetch_from_yfinance when Yahoo Finance answered without a shortName for the ticker
+_UNKNOWN_TICKER = object()
 
-def fetch_from_yfinance(ticker_symbol):
-    """Fetch details about a ticker using :mod:`yfinance`."""
+
+def _mem_cache_get(ticker_symbol):
+    """Return (data, last_updated) from the in-process cache, or (None, None) on a miss or an expired entry."""
+    with _MEM_CACHE_LOCK:
+        return _MEM_CACHE.get(ticker_symbol, (None, None))
+
+
+def _mem_cache_put(ticker_symbol, data, last_updated):
+    with _MEM_CACHE_LOCK:
+        _MEM_CACHE[ticker_symbol] = (data, last_updated)
+
+
+def clear_ticker_data_cache(tickers=None):
+    """Drop the in-process cached payloads of the given tickers (all of them if tickers is None)."""
+    with _MEM_CACHE_LOCK:
+        if tickers is None:
+            _MEM_CACHE.clear()
+        else:
+            for ticker_symbol in tickers:
+                _MEM_CACHE.pop(ticker_symbol, None)
+
+
+def _format_date_column(dates):
+    """Format a datetime column as 'YYYY-MM-DD' strings (NaN for NaT) in one pass instead of a per-row strftime."""
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    days = dates.to_numpy(dtype='datetime64[ns]').astype('datetime64[D]').astype(str)
+    return pd.Series(days, index=dates.index).where(dates.notna())
+
+
+def _df_to_records(df):
+    """
+    Convert a yfinance table (DataFrame or Series) to a list of records, with its date
+    (the index, or the first column when there is no 'Date' one) as a 'YYYY-MM-DD' 'Date' field.
+    """
+    if df is None or df.empty:
+        return []
+    df = df.reset_index()
+    if 'Date' not in df.columns:
+        df = df.rename(columns={'index' if 'index' in df.columns else df.columns[0]: 'Date'})
+    dates = df['Date']
+    # yfinance indexes are already datetime64 (possibly tz-aware): only parse other (string/object) columns
+    if not is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, errors='coerce')
+    df['Date'] = _format_date_column(dates)
+    # Build the records column-wise: one tolist() per column instead of pandas' per-row dict path
+    columns = list(df.columns)
+    return [dict(zip(columns, row)) for row in zip(*(df[column].tolist() for column in columns))]
+
+
+def _downcast_history(hist):
+    """
+    Store whole-number volumes as integers (a batched download returns them as floats, "1234567.0").
+    Prices stay float64: the history is persisted as JSON and SQLite REAL, where float32 saves
+    nothing and would print as longer, less precise decimals.
+    """
+    if 'Volume' in hist.columns and hist['Volume'].notna().all() and (hist['Volume'] % 1 == 0).all():
+        hist = hist.astype({'Volume': 'int64'})
+    return hist
+
+
+def fetch_from_yfinance(ticker_symbol, history=None):
+    """
+    Fetch details about a ticker using :mod:`yfinance`.
+    `history` takes records already fetched for the ticker (e.g. by a batched download); it is fetched here if None.
+    Returns None if the ticker is unknown or the fetch failed.
+    """
+    data = _fetch_from_yfinance(ticker_symbol, history)
+    return None if data is _UNKNOWN_TICKER else data
+
+
+def _fetch_from_yfinance(ticker_symbol, history=None):
+    """fetch_from_yfinance, returning _UNKNOWN_TICKER (rather than None, kept for errors) for a ticker Yahoo Finance doesn't know."""
     print(f"\033[91m[fetch_from_yfinance] Fetching data from yfinance for {ticker_symbol}\033[0m")
     try:
         print(f"\033[91m[yf.Ticker] Instantiating yf.Ticker for {ticker_symbol}\033[0m")
@@ -16,72 +107,15 @@ def fetch_from_yfinance(ticker_symbol):
 
         if not info.get("shortName"):
             print(f"Could not find info for ticker: {ticker_symbol}")
-            return None
-
-        hist = ticker.history(period="1y")
-        if not hist.empty:
-            hist.reset_index(inplace=True)
-            # Ensure 'Date' column is datetime before using .dt
-            if 'Date' in hist.columns:
-                hist['Date'] = pd.to_datetime(hist['Date'], errors='coerce')
-            elif 'index' in hist.columns:
-                hist.rename(columns={"index": "Date"}, inplace=True)
-                hist['Date'] = pd.to_datetime(hist['Date'], errors='coerce')
-            else:
-                hist.rename(columns={hist.columns[0]: "Date"}, inplace=True)
-                hist['Date'] = pd.to_datetime(hist['Date'], errors='coerce')
-            hist["Date"] = hist["Date"].dt.strftime("%Y-%m-%d")
-            hist_dict = hist.to_dict(orient="records")
-        else:
-            hist_dict = []
-
-        actions = ticker.actions
-        if not actions.empty:
-            actions.reset_index(inplace=True)
-            if 'Date' in actions.columns:
-                actions['Date'] = pd.to_datetime(actions['Date'], errors='coerce')
-            elif 'index' in actions.columns:
-                actions.rename(columns={"index": "Date"}, inplace=True)
-                actions['Date'] = pd.to_datetime(actions['Date'], errors='coerce')
-            else:
-                actions.rename(columns={actions.columns[0]: "Date"}, inplace=True)
-                actions['Date'] = pd.to_datetime(actions['Date'], errors='coerce')
-            actions["Date"] = actions["Date"].dt.strftime("%Y-%m-%d")
-            actions_dict = actions.to_dict(orient="records")
-        else:
-            actions_dict = []
-
-        dividends = ticker.dividends
-        if dividends is not None and not dividends.empty:
-            dividends = dividends.reset_index()
-            if 'Date' in dividends.columns:
-                dividends['Date'] = pd.to_datetime(dividends['Date'], errors='coerce')
-            elif 'index' in dividends.columns:
-                dividends.rename(columns={"index": "Date"}, inplace=True)
-                dividends['Date'] = pd.to_datetime(dividends['Date'], errors='coerce')
-            else:
-                dividends.rename(columns={dividends.columns[0]: "Date"}, inplace=True)
-                dividends['Date'] = pd.to_datetime(dividends['Date'], errors='coerce')
-            dividends["Date"] = dividends["Date"].dt.strftime("%Y-%m-%d")
-            dividends_dict = dividends.to_dict(orient="records")
-        else:
-            dividends_dict = []
-
-        recommendations = ticker.recommendations
-        if recommendations is not None and not recommendations.empty:
-            recommendations.reset_index(inplace=True)
-            if 'Date' in recommendations.columns:
-                recommendations['Date'] = pd.to_datetime(recommendations['Date'], errors='coerce')
-            elif 'index' in recommendations.columns:
-                recommendations.rename(columns={"index": "Date"}, inplace=True)
-                recommendations['Date'] = pd.to_datetime(recommendations['Date'], errors='coerce')
-            else:
-                recommendations.rename(columns={recommendations.columns[0]: "Date"}, inplace=True)
-                recommendations['Date'] = pd.to_datetime(recommendations['Date'], errors='coerce')
-            recommendations["Date"] = recommendations["Date"].dt.strftime("%Y-%m-%d")
-            recommendations_dict = recommendations.to_dict(orient="records")
-        else:
-            recommendations_dict = []
+            return _UNKNOWN_TICKER
+        # Keep only the keys read downstream, i.e. the ticker_info table columns. The rest of the ~180 keys
+        # (companyOfficers, executiveTeam, ...) and nested values, never stored in ticker_info, are dropped
+        info = {k: v for k, v in info.items() if k in _INFO_WHITELIST and not isinstance(v, (list, dict))}
+
+        hist_dict = history if history is not None else _df_to_records(_downcast_history(ticker.history(period="1y")))
+        actions_dict = _df_to_records(ticker.actions)
+        dividends_dict = _df_to_records(ticker.dividends)
+        recommendations_dict = _df_to_records(ticker.recommendations)
 
         response_data = {
             "info": info,
@@ -100,16 +134,104 @@ def fetch_from_yfinance(ticker_symbol):
         return None
 
 
-def fetch_with_cache(ticker_symbol, cache_duration=timedelta(hours=24)):
-    """Return ticker data from cache if fresh, otherwise fetch from Yahoo Finance."""
-    cached, last_updated = database.get_ticker_data(ticker_symbol)
+def _download_histories(symbols):
+    """
+    One-year daily histories of several tickers with a single (internally threaded) yf.download call.
+    Returns {ticker: records}; tickers missing from the download, or without any close price in it, are left out.
+    """
+    try:
+        df = yf.download(symbols, period="1y", group_by='ticker', actions=True, auto_adjust=True, threads=True, progress=False)
+    except Exception as e:
+        print(f"An error occurred while downloading histories for {', '.join(symbols)}: {e}")
+        return {}
+    if df is None or df.empty or not isinstance(df.columns, pd.MultiIndex):
+        return {}
+    histories = {}
+    for symbol in symbols:
+        if symbol not in df.columns.get_level_values(0):
+            continue
+        hist = df[symbol]
+        # The download aligns every ticker on the union of trading days: drop the days this one has no price for
+        hist = hist.dropna(subset=['Close']).rename_axis(columns=None)
+        if hist.empty:
+            # Nothing usable for this one: leave it to fetch_from_yfinance's own ticker.history() call
+            continue
+        histories[symbol] = _df_to_records(_downcast_history(hist))
+    return histories
+
+
+def _recently_unknown(ticker_symbol):
+    with _UNKNOWN_TICKERS_LOCK:
+        return ticker_symbol in _UNKNOWN_TICKERS
+
+
+def _record_fetch(ticker_symbol, data):
+    """Remember a ticker Yahoo Finance doesn't know and forget it once fetched; failed fetches leave it as it was."""
+    with _UNKNOWN_TICKERS_LOCK:
+        if data is _UNKNOWN_TICKER:
+            _UNKNOWN_TICKERS[ticker_symbol] = True
+        elif data:
+            _UNKNOWN_TICKERS.pop(ticker_symbol, None)
+
+
+def _stored_ticker_data(ticker_symbol):
+    """(data, last_updated) of a stored ticker payload, from the in-process cache or the database."""
+    cached, last_updated = _mem_cache_get(ticker_symbol)
+    if cached is None:
+        cached, last_updated = database.get_ticker_data(ticker_symbol)
+        if cached:
+            _mem_cache_put(ticker_symbol, cached, last_updated)
+    return cached, last_updated
+
+
+def fetch_with_cache(ticker_symbol, cache_duration=timedelta(hours=24), save=True):
+    """
+    Return ticker data from cache if fresh, otherwise fetch from Yahoo Finance.
+    With save=False fresh data is not written back, leaving it to the caller (e.g. to save several tickers at once).
+    A ticker Yahoo Finance has no info for is not requested again for _UNKNOWN_TICKER_TTL seconds.
+    """
+    cached, last_updated = _stored_ticker_data(ticker_symbol)
     if cached and datetime.now() - last_updated < cache_duration:
         print(f"\033[92m[fetch_with_cache] Returning cached data for {ticker_symbol}\033[0m")
         return cached, "CACHE"
 
-    fresh = fetch_from_yfinance(ticker_symbol)
-    if fresh:
-        database.save_ticker_data(ticker_symbol, fresh)
+    if _recently_unknown(ticker_symbol):
+        return None, None
+    fresh = _fetch_from_yfinance(ticker_symbol)
+    _record_fetch(ticker_symbol, fresh)
+    if fresh and fresh is not _UNKNOWN_TICKER:
+        if save:
+            database.save_ticker_data(ticker_symbol, fresh)
         return fresh, "YAHOO_FINANCE_API"
 
     return None, None
+
+
+def fetch_many_with_cache(symbols, cache_duration=timedelta(hours=24), save=True):
+    """
+    fetch_with_cache for several tickers at once. Returns {ticker: data}, with None for tickers yfinance doesn't know.
+    Fresh cached payloads are reused; the others get their histories from a single yf.download call,
+    their info and events concurrently, and are saved in a single transaction (unless save=False).
+    """
+    results = {}
+    missing = []
+    for ticker_symbol in dict.fromkeys(symbols):
+        cached, last_updated = _stored_ticker_data(ticker_symbol)
+        if cached and datetime.now() - last_updated < cache_duration:
+            results[ticker_symbol] = cached
+        elif _recently_unknown(ticker_symbol):
+            results[ticker_symbol] = None
+        else:
+            missing.append(ticker_symbol)
+    if not missing:
+        return results
+    histories = _download_histories(missing) if len(missing) > 1 else {}
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        fetched = list(executor.map(lambda ticker_symbol: _fetch_from_yfinance(ticker_symbol, histories.get(ticker_symbol)), missing))
+    for ticker_symbol, data in zip(missing, fetched):
+        _record_fetch(ticker_symbol, data)
+    fetched = [None if data is _UNKNOWN_TICKER else data for data in fetched]
+    results.update(zip(missing, fetched))
+    if save:
+        database.save_ticker_data_many([(ticker_symbol, data) for ticker_symbol, data in zip(missing, fetched) if data])
+    return results
@@ -0,0 +1,63 @@
+"""
+Shared fixtures of the backend tests: a throwaway SQLite database and Yahoo Finance-like ticker payloads.
+Not a test module itself (unittest discover only collects test_*.py).
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('GEMINI_API_KEY', 'test')
+
+from db import database
+from services import data_fetcher
+from core import portfolio
+
+
+def ticker_payload(name, closes):
+    """A fetch_from_yfinance-like payload with the given [(date, close)] history, priced at the last close."""
+    return {
+        'info': {'shortName': name, 'regularMarketPrice': closes[-1][1]},
+        'history': [{'Date': d, 'Open': c, 'High': c, 'Low': c, 'Close': c, 'Volume': 100} for d, c in closes],
+    }
+
+
+def clear_caches():
+    """Drop every in-process cache in front of the database, so that no entry leaks between test databases."""
+    portfolio.clear_performance_caches()
+    portfolio.clear_ticker_history_cache()
+    portfolio._NEGATIVE_HIST_CACHE.clear()
+    data_fetcher.clear_ticker_data_cache()
+    data_fetcher._UNKNOWN_TICKERS.clear()
+    database._REPORT_CACHE.clear()
+    database._STATUS_CACHE.clear()
+
+
+class TempDatabaseTestCase(unittest.TestCase):
+    """Runs its tests against a fresh database in a temporary directory, swapped in for database.DATABASE_NAME."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmpdir = tempfile.mkdtemp()
+        cls._saved_database_name = database.DATABASE_NAME
+        database.DATABASE_NAME = os.path.join(cls.tmpdir, 'test.db')
+        database.init_db()
+        clear_caches()
+
+    @classmethod
+    def tearDownClass(cls):
+        database.DATABASE_NAME = cls._saved_database_name
+        clear_caches()
+        shutil.rmtree(cls.tmpdir, ignore_errors=True)
+        super().tearDownClass()
+
+    @staticmethod
+    def seed_portfolio(name, transactions, payloads):
+        """save_transactions, with the ticker data fetched on the way answered from `payloads` ({ticker: payload})."""
+        fetch = lambda symbols, *args, **kwargs: {t: payloads.get(t) for t in symbols}
+        with mock.patch.object(data_fetcher, 'fetch_many_with_cache', side_effect=fetch):
+            return database.save_transactions(name, transactions)
@@ -1,10 +1,16 @@
 import unittest
+import json
+from unittest import mock
+import pandas as pd
+from helpers import TempDatabaseTestCase, ticker_payload
 from api.app import app
 from core.portfolio import get_portfolio_status, get_performance
 from db.database import (
     init_db, get_ticker_data, create_portfolio, save_transactions, get_all_portfolio_names
 )
 from core.report_generator import generate_portfolio_report_with_gemini
+from core import report_generator
+from services import data_fetcher
 import os
 
 class TestAppEndpoints(unittest.TestCase):
@@ -27,8 +33,9 @@ class TestAppEndpoints(unittest.TestCase):
             self.skipTest('No portfolios available for testing')
 
 class TestPortfolioLogic(unittest.TestCase):
-    def setUp(self):
-        # Ensure a test portfolio exists
+    @classmethod
+    def setUpClass(cls):
+        # Ensure a test portfolio exists (seeded once for the whole class)
         create_portfolio('test_portfolio')
         save_transactions('test_portfolio', [
             {"ticker": "AAPL", "quantity": 10, "price": 100, "date": "2024-01-01"},
@@ -62,5 +69,73 @@ class TestReportGenerator(unittest.TestCase):
         report, _ = generate_portfolio_report_with_gemini('test_portfolio', status, returns, force=True)
         self.assertIsInstance(report, dict)
 
+class TestTickerReportsEndpoint(TempDatabaseTestCase):
+    """/api/portfolio/<name>/tickers/reports with the Google token check and Gemini stubbed."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        today = pd.Timestamp.today().normalize()
+        days = [(today - pd.Timedelta(days=n)).strftime('%Y-%m-%d') for n in range(120, 0, -1)]
+        cls.seed_portfolio('endpoint', [
+            {"ticker": "EPA", "quantity": 3, "price": 10, "date": days[0], "label": "Buy", "name": "EPA Inc"},
+            {"ticker": "EPB", "quantity": 1, "price": 30, "date": days[0], "label": "Buy", "name": "EPB Inc"},
+        ], {
+            'EPA': ticker_payload('EPA Inc', [(d, 10.0 + i * 0.1) for i, d in enumerate(days[:-1])] + [(days[-1], 10.0)]),
+            'EPB': ticker_payload('EPB Inc', [(d, 30.0 - i * 0.1) for i, d in enumerate(days[:-1])] + [(days[-1], 30.0)]),
+        })
+
+    def setUp(self):
+        self.app = app.test_client()
+        self.app.testing = True
+        self.prompts = []
+        for patcher in (
+            mock.patch('api.app.GOOGLE_CLIENT_ID', 'test-client'),
+            mock.patch('api.app.id_token.verify_oauth2_token', return_value={'email': 'test@example.com'}),
+            mock.patch.object(data_fetcher, 'fetch_with_cache', side_effect=AssertionError('unexpected fetch')),
+            mock.patch.object(report_generator, '_generate_with_retry', side_effect=self.fake_gemini),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def fake_gemini(self, prompt, model_name, **kwargs):
+        # Batched prompts get a report for EPA only; EPB's single-ticker retry fails
+        self.prompts.append(prompt)
+        if 'Tickers data:' in prompt:
+            return {'text': json.dumps({'EPA': {'summary': 'EPA report'}}), 'cost': 0.01}
+        raise RuntimeError('quota exceeded')
+
+    def post(self, body=None, data=None):
+        return self.app.post('/api/portfolio/endpoint/tickers/reports', json=body, data=data,
+                             headers={'Authorization': 'Bearer test-token'})
+
+    def test_generate_ticker_reports(self):
+        response = self.post({'force': True})
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data['reports'], {'EPA': {'summary': 'EPA report'}})
+        self.assertEqual(data['missing'], ['EPB'])
+        self.assertAlmostEqual(data['cost'], 0.01)
+        # Both holdings went into one batched prompt, with the weights and returns of every period
+        self.assertIn("'ticker': 'EPA'", self.prompts[0])
+        self.assertIn("'weight': '50.00%'", self.prompts[0])
+        self.assertNotIn("'weekly': None", self.prompts[0])
+        self.assertNotIn("'ytd': None", self.prompts[0])
+
+    def test_invalid_requests(self):
+        for body in ({'tickers': 'EPA'}, {'tickers': ['EPA', 3]}, {'tickers': ['EPA', '']}, ['EPA']):
+            response = self.post(body)
+            self.assertEqual(response.status_code, 400, body)
+        response = self.post(data='{"tickers": [')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Invalid JSON', response.get_json()['error'])
+        self.assertEqual(self.prompts, [])
+
+    def test_errors_are_returned(self):
+        with mock.patch('api.app.get_period_returns_bundle', side_effect=RuntimeError('no prices')):
+            response = self.post({'tickers': ['EPA'], 'force': True})
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.get_json(), {'error': 'no prices'})
+
 if __name__ == '__main__':
     unittest.main()
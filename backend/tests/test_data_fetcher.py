@@ -0,0 +1,151 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from helpers import TempDatabaseTestCase, ticker_payload
+from db import database
+from services import data_fetcher
+
+DAYS = pd.date_range('2024-03-01', periods=3, freq='D', name='Date')
+
+
+def _history_frame(closes):
+    return pd.DataFrame({'Open': closes, 'High': closes, 'Low': closes, 'Close': closes, 'Volume': [100.0] * len(closes)},
+                        index=DAYS)
+
+
+class FakeYahoo:
+    """
+    Stands in for the yfinance module: `tickers` maps the known symbols to their closes, `download_closes` overrides
+    what yf.download returns for some of them and reading the info of a symbol in `errors` raises.
+    Records the symbols of every download, ticker.info and ticker.history() call.
+    """
+
+    def __init__(self, tickers, download_closes=None, errors=()):
+        self.tickers = tickers
+        self.download_closes = download_closes or {}
+        self.errors = set(errors)
+        self.downloads = []
+        self.history_calls = []
+        self.info_calls = []
+
+    def download(self, symbols, **kwargs):
+        self.downloads.append(list(symbols))
+        frames = {s: _history_frame(self.download_closes.get(s, self.tickers[s])) for s in symbols if s in self.tickers}
+        return pd.concat(frames, axis=1) if frames else pd.DataFrame()
+
+    def Ticker(self, symbol):
+        yahoo = self
+
+        class Ticker:
+            actions = dividends = recommendations = None
+
+            @property
+            def info(self):
+                yahoo.info_calls.append(symbol)
+                if symbol in yahoo.errors:
+                    raise ConnectionError('Too Many Requests')
+                return {'shortName': f'{symbol} Inc'} if symbol in yahoo.tickers else {'trailingPegRatio': None}
+
+            def history(self, period):
+                yahoo.history_calls.append(symbol)
+                return _history_frame(yahoo.tickers[symbol])
+
+        return Ticker()
+
+
+class YahooTestCase(TempDatabaseTestCase):
+
+    def patch_yahoo(self, yahoo):
+        for name in ('download', 'Ticker'):
+            patcher = mock.patch.object(data_fetcher.yf, name, side_effect=getattr(yahoo, name))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def fetch_many(self, yahoo, symbols):
+        self.patch_yahoo(yahoo)
+        return data_fetcher.fetch_many_with_cache(symbols)
+
+
+class TestFetchManyWithCache(YahooTestCase):
+
+    def test_fetch_many_with_cache(self):
+        database.save_ticker_data('FMC', ticker_payload('FMC Inc', [('2024-03-01', 5.0)]))
+        yahoo = FakeYahoo({'FMA': [1.0, 2.0, 3.0], 'FMB': [4.0, 5.0, 6.0]})
+        results = self.fetch_many(yahoo, ['FMA', 'FMB', 'FMC', 'FMA', 'FMX'])
+        # One download for the tickers not stored yet, none for the fresh stored one
+        self.assertEqual(yahoo.downloads, [['FMA', 'FMB', 'FMX']])
+        self.assertEqual(yahoo.history_calls, [])
+        self.assertEqual(list(results), ['FMC', 'FMA', 'FMB', 'FMX'])
+        self.assertEqual([h['Close'] for h in results['FMA']['history']], [1.0, 2.0, 3.0])
+        self.assertEqual(results['FMA']['history'][0]['Date'], '2024-03-01')
+        self.assertEqual(results['FMC']['info']['shortName'], 'FMC Inc')
+        self.assertIsNone(results['FMX'])
+        # The fetched tickers are saved
+        stored, _ = database.get_ticker_data('FMB')
+        self.assertEqual([h['Close'] for h in stored['history']], [4.0, 5.0, 6.0])
+        self.assertEqual(database.get_ticker_data('FMX'), (None, None))
+
+    def test_ticker_without_prices_in_the_download_is_fetched_alone(self):
+        yahoo = FakeYahoo({'NPA': [1.0, 2.0, 3.0], 'NPB': [4.0, 5.0, 6.0]}, download_closes={'NPB': [np.nan] * 3})
+        results = self.fetch_many(yahoo, ['NPA', 'NPB'])
+        self.assertEqual(yahoo.history_calls, ['NPB'])
+        self.assertEqual([h['Close'] for h in results['NPB']['history']], [4.0, 5.0, 6.0])
+        stored, _ = database.get_ticker_data('NPB')
+        self.assertEqual(len(stored['history']), 3)
+
+    def test_single_ticker_skips_the_download(self):
+        yahoo = FakeYahoo({'STA': [1.0, 2.0, 3.0]})
+        results = self.fetch_many(yahoo, ['STA'])
+        self.assertEqual(yahoo.downloads, [])
+        self.assertEqual(yahoo.history_calls, ['STA'])
+        self.assertEqual(len(results['STA']['history']), 3)
+
+
+class TestUnknownTickers(YahooTestCase):
+
+    def test_unknown_ticker_is_not_asked_for_again(self):
+        yahoo = FakeYahoo({})
+        self.patch_yahoo(yahoo)
+        self.assertEqual(data_fetcher.fetch_with_cache('UKA'), (None, None))
+        self.assertEqual(data_fetcher.fetch_with_cache('UKA'), (None, None))
+        self.assertEqual(data_fetcher.fetch_many_with_cache(['UKA', 'UKB']), {'UKA': None, 'UKB': None})
+        self.assertEqual(yahoo.info_calls, ['UKA', 'UKB'])
+        # Until the entry expires
+        data_fetcher._UNKNOWN_TICKERS.expire(data_fetcher._UNKNOWN_TICKERS.timer() + data_fetcher._UNKNOWN_TICKER_TTL)
+        data_fetcher.fetch_with_cache('UKA')
+        self.assertEqual(yahoo.info_calls, ['UKA', 'UKB', 'UKA'])
+
+    def test_failed_fetch_is_retried(self):
+        yahoo = FakeYahoo({'ERA': [1.0, 2.0, 3.0]}, errors={'ERA'})
+        self.patch_yahoo(yahoo)
+        self.assertEqual(data_fetcher.fetch_with_cache('ERA'), (None, None))
+        self.assertEqual(data_fetcher.fetch_many_with_cache(['ERA']), {'ERA': None})
+        yahoo.errors.clear()
+        data, source = data_fetcher.fetch_with_cache('ERA')
+        self.assertEqual(source, 'YAHOO_FINANCE_API')
+        self.assertEqual(len(data['history']), 3)
+        self.assertEqual(yahoo.info_calls, ['ERA', 'ERA', 'ERA'])
+
+
+
+class TestStoredTickerCache(TempDatabaseTestCase):
+
+    def test_stored_ticker_cache(self):
+        database.save_ticker_data('MCA', ticker_payload('Mca Inc', [('2024-03-01', 5.0)]))
+        data, source = data_fetcher.fetch_with_cache('MCA')
+        self.assertEqual((data['info']['shortName'], source), ('Mca Inc', 'CACHE'))
+        # Hits skip the database until the entry expires or the ticker is saved again
+        with mock.patch.object(database, 'get_ticker_data', side_effect=AssertionError('not cached')):
+            self.assertEqual(data_fetcher.fetch_with_cache('MCA'), (data, 'CACHE'))
+        database.save_ticker_data('MCA', ticker_payload('Mca Renamed', [('2024-03-01', 6.0)]))
+        self.assertEqual(data_fetcher.fetch_with_cache('MCA')[0]['info']['shortName'], 'Mca Renamed')
+        with mock.patch.object(database, 'get_ticker_data', return_value=(None, None)) as get_ticker_data:
+            data_fetcher._MEM_CACHE.expire(data_fetcher._MEM_CACHE.timer() + data_fetcher._MEM_CACHE_TTL)
+            self.assertEqual(data_fetcher._stored_ticker_data('MCA'), (None, None))
+        get_ticker_data.assert_called_once_with('MCA')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+import json
+import unittest
+from unittest import mock
+
+from helpers import TempDatabaseTestCase
+from db import database
+
+
+class TestPortfolioStatusCache(TempDatabaseTestCase):
+
+    def status(self, total_value):
+        return {'total_value': total_value, 'holdings': [{'ticker': 'PSA', 'name': 'PSA Inc', 'quantity': 1, 'price': total_value, 'value': total_value}]}
+
+    def test_saved_status_is_cached_until_saved_again(self):
+        database.save_portfolio_status('cached', self.status(10.0))
+        status, _ = database.get_portfolio_status_saved('cached')
+        self.assertEqual(status['total_value'], 10.0)
+        with mock.patch.object(database, '_load_portfolio_status', side_effect=AssertionError('not cached')):
+            self.assertIs(database.get_portfolio_status_saved('cached')[0], status)
+        database.save_portfolio_status('cached', self.status(20.0))
+        self.assertEqual(database.get_portfolio_status_saved('cached')[0]['total_value'], 20.0)
+
+    def test_status_saved_during_a_load_is_not_overwritten(self):
+        database.save_portfolio_status('racing', self.status(10.0))
+        load = database._load_portfolio_status
+
+        def load_then_save(portfolio):
+            # The load reads the old status, then a save lands before it is cached
+            loaded = load(portfolio)
+            database.save_portfolio_status(portfolio, self.status(20.0))
+            return loaded
+
+        with mock.patch.object(database, '_load_portfolio_status', side_effect=load_then_save):
+            self.assertEqual(database.get_portfolio_status_saved('racing')[0]['total_value'], 10.0)
+        self.assertEqual(database.get_portfolio_status_saved('racing')[0]['total_value'], 20.0)
+
+
+class ReportTestCase(TempDatabaseTestCase):
+
+    def rows(self, table, owner_column, owner):
+        conn = database.get_read_connection()
+        return [dict(row) for row in conn.execute(
+            f"SELECT id, cost, reference_date, created_at FROM {table} WHERE {owner_column} = ? ORDER BY id", (owner,))]
+
+    def set_created_at(self, table, report_id, created_at):
+        conn = database.get_write_connection()
+        with conn:
+            conn.execute(f"UPDATE {table} SET created_at = ? WHERE id = ?", (created_at, report_id))
+
+
+class TestReportUpsert(ReportTestCase):
+
+    def test_ticker_report_upsert(self):
+        database.save_ticker_report('UPS', {'summary': 'first'}, '2024-03-01 09:00:00', cost=0.1)
+        [first] = self.rows('ticker_reports', 'ticker', 'UPS')
+        self.set_created_at('ticker_reports', first['id'], '2000-01-01 00:00:00')
+        database.save_ticker_reports_many([('UPS', {'summary': 'second'}, 0.2)], '2024-03-01 09:00:00')
+        # Same row, updated in place, with a refreshed created_at
+        [second] = self.rows('ticker_reports', 'ticker', 'UPS')
+        self.assertEqual(second['id'], first['id'])
+        self.assertEqual(second['cost'], 0.2)
+        self.assertNotEqual(second['created_at'], '2000-01-01 00:00:00')
+        report = database.get_ticker_report('UPS', '2024-03-01')
+        self.assertEqual(report, {'summary': 'second', 'cost': 0.2, 'reference_date': '2024-03-01 09:00:00'})
+        self.assertEqual(database.get_ticker_reports_many(['UPS'], '2024-03-01'), {'UPS': report})
+
+    def test_portfolio_report_upsert(self):
+        database.save_portfolio_report('upsert', {'summary': 'first'}, '2024-03-01 09:00:00', cost=0.1)
+        [first] = self.rows('portfolio_reports', 'portfolio', 'upsert')
+        self.set_created_at('portfolio_reports', first['id'], '2000-01-01 00:00:00')
+        database.save_portfolio_report('upsert', {'summary': 'second'}, '2024-03-01 09:00:00', cost=0.2)
+        [second] = self.rows('portfolio_reports', 'portfolio', 'upsert')
+        self.assertEqual(second['id'], first['id'])
+        self.assertNotEqual(second['created_at'], '2000-01-01 00:00:00')
+        self.assertEqual(database.get_portfolio_report('upsert'),
+                         {'summary': 'second', 'cost': 0.2, 'reference_date': '2024-03-01 09:00:00'})
+
+
+class TestReportReaders(ReportTestCase):
+
+    def test_latest_ticker_report(self):
+        # Two reports on 2024-03-01 (the 09:00 one written last) and an older-written one on 2024-03-02
+        database.save_ticker_report('ORD', {'summary': 'morning'}, '2024-03-01 09:00:00')
+        database.save_ticker_report('ORD', {'summary': 'evening'}, '2024-03-01 18:00:00')
+        database.save_ticker_report('ORD', {'summary': 'next day'}, '2024-03-02 09:00:00')
+        morning, evening, next_day = self.rows('ticker_reports', 'ticker', 'ORD')
+        self.set_created_at('ticker_reports', next_day['id'], '2024-03-02 09:00:00')
+        self.set_created_at('ticker_reports', evening['id'], '2024-03-02 10:00:00')
+        self.set_created_at('ticker_reports', morning['id'], '2024-03-02 11:00:00')
+        # A given day: the report written last; no day: the one with the latest reference date
+        self.assertEqual(database.get_ticker_report('ORD', '2024-03-01')['summary'], 'morning')
+        self.assertEqual(database.get_ticker_report('ORD')['summary'], 'next day')
+        self.assertIsNone(database.get_ticker_report('ORD', '2024-03-03'))
+        # The batched reader picks the same reports, with or without the cache of the single reader
+        database.save_ticker_report('ORD2', {'summary': 'only'}, '2024-03-01 12:00:00')
+        for _ in range(2):
+            many = database.get_ticker_reports_many(['ORD', 'ORD2', 'NONE'], '2024-03-01')
+            self.assertEqual({t: r['summary'] for t, r in many.items()}, {'ORD': 'morning', 'ORD2': 'only'})
+            many = database.get_ticker_reports_many(['ORD', 'ORD2'])
+            self.assertEqual({t: r['summary'] for t, r in many.items()}, {'ORD': 'next day', 'ORD2': 'only'})
+            database._clear_report_cache('ticker_reports', {'ORD', 'ORD2', 'NONE'})
+
+    def test_reports_are_cached_until_saved_again(self):
+        database.save_portfolio_report('cached', {'summary': 'first'}, '2024-03-01 09:00:00')
+        database.save_ticker_report('CCH', {'summary': 'first'}, '2024-03-01 09:00:00')
+        self.assertEqual(database.get_portfolio_report('cached')['summary'], 'first')
+        self.assertEqual(database.get_ticker_report('CCH', '2024-03-01')['summary'], 'first')
+        self.assertIsNone(database.get_ticker_report('CCN'))
+        # Hits (including "no report") skip the database
+        with mock.patch.object(database, 'get_read_connection', side_effect=AssertionError('not cached')):
+            self.assertEqual(database.get_portfolio_report('cached')['summary'], 'first')
+            self.assertEqual(database.get_ticker_reports_many(['CCH'], '2024-03-01')['CCH']['summary'], 'first')
+            self.assertIsNone(database.get_ticker_report('CCN'))
+        # A save drops its owner's entries
+        database.save_portfolio_report('cached', {'summary': 'second'}, '2024-03-01 09:00:00')
+        database.save_ticker_reports_many([('CCH', {'summary': 'second'}, None), ('CCN', {'summary': 'new'}, None)],
+                                          '2024-03-01 09:00:00')
+        self.assertEqual(database.get_portfolio_report('cached')['summary'], 'second')
+        self.assertEqual(database.get_ticker_report('CCH', '2024-03-01')['summary'], 'second')
+        self.assertEqual(database.get_ticker_report('CCN')['summary'], 'new')
+        # And entries expire after _REPORT_CACHE_TTL
+        database.save_ticker_report('CCN', {'summary': 'behind the cache'}, '2024-03-02 09:00:00')
+        database.get_ticker_report('CCN')
+        conn = database.get_write_connection()
+        with conn:
+            conn.execute("DELETE FROM ticker_reports WHERE ticker = 'CCN'")
+        self.assertIsNotNone(database.get_ticker_report('CCN'))
+        database._REPORT_CACHE.expire(database._REPORT_CACHE.timer() + database._REPORT_CACHE_TTL)
+        self.assertIsNone(database.get_ticker_report('CCN'))
+
+
+class TestReportBlobMigration(ReportTestCase):
+
+    def test_migrate_reports_to_blobs(self):
+        # Rows written before compression hold plain JSON text; a compressed row is left alone
+        conn = database.get_write_connection()
+        with conn:
+            conn.execute("INSERT INTO portfolio_reports (portfolio, report_json, cost, reference_date) VALUES (?, ?, ?, ?)",
+                         ('legacy', json.dumps({'summary': 'old portfolio'}), 0.1, '2024-03-01 09:00:00'))
+            conn.execute("INSERT INTO ticker_reports (ticker, report_json, cost, reference_date) VALUES (?, ?, ?, ?)",
+                         ('LGC', json.dumps({'summary': 'old ticker'}), 0.2, '2024-03-01 09:00:00'))
+        database.save_ticker_report('LGD', {'summary': 'new ticker'}, '2024-03-01 09:00:00')
+        self.assertEqual(database.migrate_reports_to_blobs(), 2)
+        self.assertEqual(database.migrate_reports_to_blobs(), 0)
+        for table in ('portfolio_reports', 'ticker_reports'):
+            types = {row[0] for row in conn.execute(f"SELECT typeof(report_json) FROM {table}")}
+            self.assertEqual(types, {'blob'}, table)
+        database._REPORT_CACHE.clear()
+        report = database.get_portfolio_report('legacy')
+        self.assertEqual((report['summary'], report['cost']), ('old portfolio', 0.1))
+        self.assertEqual(database.get_ticker_report('LGC', '2024-03-01')['summary'], 'old ticker')
+        self.assertEqual(database.get_ticker_report('LGD')['summary'], 'new ticker')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import helpers  # noqa: F401 (backend on sys.path, GEMINI_API_KEY set)
+from core import gemini_helper, report_generator
+
+
+class FakeClient:
+    """Stands in for the google.genai client: answers every generate_content call with `text`, counting the calls."""
+
+    def __init__(self, text):
+        self.text = text
+        self.calls = 0
+        self.models = self
+
+    def generate_content(self, model, contents, config):
+        self.calls += 1
+        return SimpleNamespace(text=self.text, candidates=[],
+                               usage_metadata=SimpleNamespace(prompt_token_count=1000, candidates_token_count=100))
+
+
+class TestGroundedResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        gemini_helper._RESPONSE_CACHE.clear()
+        self.addCleanup(gemini_helper._RESPONSE_CACHE.clear)
+        self.client = FakeClient('{"summary": "ok"}')
+        patcher = mock.patch.object(gemini_helper, '_grounded_client', return_value=self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_identical_calls_are_served_from_cache(self):
+        first = gemini_helper.generate_grounded_report_response('prompt')
+        self.assertGreater(first['cost'], 0)
+        second = gemini_helper.generate_grounded_report_response('prompt')
+        self.assertEqual(second, {'text': '{"summary": "ok"}', 'cost': 0.0})
+        self.assertEqual(self.client.calls, 1)
+        # Another prompt, a forced call or an expired entry reach Gemini again
+        gemini_helper.generate_grounded_report_response('other prompt')
+        gemini_helper.generate_grounded_report_response('prompt', force=True)
+        self.assertEqual(self.client.calls, 3)
+        gemini_helper._RESPONSE_CACHE.expire(gemini_helper._RESPONSE_CACHE.timer() + gemini_helper._RESPONSE_CACHE_TTL)
+        gemini_helper.generate_grounded_report_response('prompt')
+        self.assertEqual(self.client.calls, 4)
+
+    def test_callers_cannot_change_cached_responses(self):
+        first = gemini_helper.generate_grounded_report_response('prompt')
+        first['text'] = 'changed'
+        first['gemini_cost'] = 1.0
+        self.assertEqual(gemini_helper.generate_grounded_report_response('prompt'), {'text': '{"summary": "ok"}', 'cost': 0.0})
+        # The multi-ticker summary adds its cost fields to its own copy
+        for _ in range(2):
+            report = report_generator.generate_multi_ticker_report_with_gemini(['AAA'], [{}], [1.0], 'status', {})
+            self.assertEqual(report['text'], '{"summary": "ok"}')
+        self.assertEqual(self.client.calls, 2)
+        self.assertTrue(all(set(cached) == {'text', 'cost'} for cached in gemini_helper._RESPONSE_CACHE.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
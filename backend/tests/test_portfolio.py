@@ -0,0 +1,180 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+import pandas as pd
+from helpers import TempDatabaseTestCase, ticker_payload
+from services import data_fetcher
+from core import portfolio
+
+# PRA has no price on 2024-01-04 (its 2024-01-03 close is carried over), PRB has none before 2024-01-02
+FIXED_TICKERS = {
+    'PRA': ticker_payload('Pra Inc', [('2024-01-01', 10.0), ('2024-01-02', 11.0), ('2024-01-03', 12.0), ('2024-01-05', 15.0)]),
+    'PRB': ticker_payload('Prb Corp', [('2024-01-02', 20.0), ('2024-01-03', 22.0), ('2024-01-04', 21.0), ('2024-01-05', 25.0)]),
+}
+FIXED_TRANSACTIONS = [
+    {'ticker': 'PRA', 'quantity': 2, 'price': 10, 'date': '2024-01-01', 'label': 'Buy', 'name': 'Pra Inc'},
+    {'ticker': 'PRB', 'quantity': 1, 'price': 20, 'date': '2024-01-02', 'label': 'Buy', 'name': 'Prb Corp'},
+    {'ticker': 'PRA', 'quantity': -1, 'price': 12, 'date': '2024-01-03', 'label': 'Sell', 'name': 'Pra Inc'},
+]
+
+
+
+def _days_ago(n):
+    return (pd.Timestamp.today().normalize() - pd.Timedelta(days=n)).strftime('%Y-%m-%d')
+
+
+# Daily prices up to yesterday, so that every dashboard period has a start date with a price
+RECENT_TICKERS = {
+    'PRC': ticker_payload('Prc Inc', [(_days_ago(n), 100.0 + n % 7 + (400 - n) * 0.1) for n in range(400, 0, -1)]),
+    'PRD': ticker_payload('Prd Corp', [(_days_ago(n), 50.0 - n % 5 + (400 - n) * 0.05) for n in range(200, 0, -1)]),
+}
+RECENT_TRANSACTIONS = [
+    {'ticker': 'PRC', 'quantity': 10, 'price': 100, 'date': _days_ago(380), 'label': 'Buy', 'name': 'Prc Inc'},
+    {'ticker': 'PRD', 'quantity': 20, 'price': 50, 'date': _days_ago(150), 'label': 'Buy', 'name': 'Prd Corp'},
+    {'ticker': 'PRC', 'quantity': -4, 'price': 130, 'date': _days_ago(20), 'label': 'Sell', 'name': 'Prc Inc'},
+]
+PERIODS = ['yesterday', 'three_days', 'weekly', 'monthly', 'three_month', 'ytd', 'one_year']
+
+
+class PortfolioTestCase(TempDatabaseTestCase):
+    """
+    Regression tests of the vectorised performance/returns computations on small synthetic portfolios.
+    The expected figures were worked out by hand and match the original row-by-row implementation.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.seed_portfolio('fixed', FIXED_TRANSACTIONS, FIXED_TICKERS)
+        cls.seed_portfolio('recent', RECENT_TRANSACTIONS, RECENT_TICKERS)
+
+    def setUp(self):
+        # Every history is stored: nothing may be fetched from Yahoo Finance
+        patcher = mock.patch.object(data_fetcher, 'fetch_with_cache', side_effect=AssertionError('unexpected fetch'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def assertReturnsEqual(self, actual, expected):
+        """Compare two compute_returns_since-like results; `expected` may give only some of the ticker fields."""
+        self.assertEqual(actual.keys(), expected.keys())
+        if expected['portfolio'] is None:
+            self.assertIsNone(actual['portfolio'])
+        else:
+            for key, value in expected['portfolio'].items():
+                self.assertAlmostEqual(actual['portfolio'][key], value, msg=key)
+        self.assertEqual(sorted(actual['tickers']), sorted(expected['tickers']))
+        for ticker, values in expected['tickers'].items():
+            for key, value in values.items():
+                if isinstance(value, str):
+                    self.assertEqual(actual['tickers'][ticker][key], value)
+                else:
+                    self.assertAlmostEqual(actual['tickers'][ticker][key], value, msg=f'{ticker} {key}')
+
+
+class TestPortfolioPerformance(PortfolioTestCase):
+
+    def test_compute_portfolio_performance(self):
+        perf = portfolio.compute_portfolio_performance('fixed', _skip_cache=True)
+        expected = [
+            ('2024-01-01', 0.0, 20.0, 0.0, 0.0),
+            ('2024-01-02', 2.0, 42.0, 5.0, 110.0),
+            ('2024-01-03', -6.0, 34.0, -15.0, 70.0),
+            ('2024-01-04', -7.0, 33.0, -17.5, 65.0),
+            ('2024-01-05', 0.0, 40.0, 0.0, 100.0),
+        ]
+        self.assertEqual([entry['date'] for entry in perf], [row[0] for row in expected])
+        for entry, (_, value, abs_value, pct, pct_from_first) in zip(perf, expected):
+            self.assertAlmostEqual(entry['value'], value)
+            self.assertAlmostEqual(entry['abs_value'], abs_value)
+            self.assertAlmostEqual(entry['pct'], pct)
+            self.assertAlmostEqual(entry['pct_from_first'], pct_from_first)
+        self.assertEqual(portfolio.compute_portfolio_performance('missing', _skip_cache=True), [])
+
+
+class TestReturnsSince(PortfolioTestCase):
+
+    def test_compute_returns_since(self):
+        self.assertReturnsEqual(portfolio.compute_returns_since('fixed', '2024-01-02'), {
+            'portfolio': {'start_value': 42.0, 'end_value': 40.0, 'return_pct': -2 / 42 * 100},
+            'tickers': {
+                'PRA': {'ticker_name': 'Pra Inc', 'start_value': 22.0, 'end_value': 15.0, 'return_pct': -7 / 22 * 100},
+                'PRB': {'ticker_name': 'Prb Corp', 'start_value': 20.0, 'end_value': 25.0, 'return_pct': 25.0},
+            },
+        })
+        # A start date without prices snaps to the next date with one; PRA's missing close is carried over
+        self.assertReturnsEqual(portfolio.compute_returns_since('fixed', '2024-01-04'), {
+            'portfolio': {'start_value': 33.0, 'end_value': 40.0, 'return_pct': 7 / 33 * 100},
+            'tickers': {
+                'PRA': {'start_value': 12.0, 'end_value': 15.0, 'return_pct': 25.0},
+                'PRB': {'start_value': 21.0, 'end_value': 25.0, 'return_pct': 4 / 21 * 100},
+            },
+        })
+        self.assertReturnsEqual(portfolio.compute_returns_since('fixed', '2024-02-01'), {'portfolio': None, 'tickers': {}})
+        self.assertReturnsEqual(portfolio.compute_returns_since('missing', '2024-01-01'), {'portfolio': None, 'tickers': {}})
+
+
+class TestPeriodReturnsBundle(PortfolioTestCase):
+
+    def test_period_returns_bundle(self):
+        bundle = portfolio.get_period_returns_bundle('recent')
+        self.assertEqual(sorted(bundle), sorted(PERIODS))
+        # The bundle computes every period at once: each one must match its own helper...
+        self.assertReturnsEqual(bundle['yesterday'], portfolio.get_last_day_possible_returns('recent'))
+        self.assertReturnsEqual(bundle['three_days'], portfolio.get_last_three_days_returns('recent'))
+        self.assertReturnsEqual(bundle['weekly'], portfolio.get_weekly_returns('recent'))
+        self.assertReturnsEqual(bundle['monthly'], portfolio.get_monthly_returns('recent'))
+        self.assertReturnsEqual(bundle['three_month'], portfolio.get_three_month_returns('recent'))
+        self.assertReturnsEqual(bundle['ytd'], portfolio.get_ytd_returns('recent'))
+        self.assertReturnsEqual(bundle['one_year'], portfolio.get_one_year_return('recent'))
+        # ...and the per-ticker helpers ('yesterday' is the portfolio's last price day, checked below)
+        for period in PERIODS[1:]:
+            for ticker, values in bundle[period]['tickers'].items():
+                ticker_returns = portfolio.get_ticker_returns_since('recent', ticker, portfolio._period_start_date(period))
+                self.assertAlmostEqual(values['end_value'], ticker_returns['end_value'], msg=f'{period} {ticker}')
+                self.assertAlmostEqual(values['return_pct'], ticker_returns['return_pct'], msg=f'{period} {ticker}')
+        # Yesterday's returns, by hand: 6 PRC and 20 PRD held over the last two prices
+        prc = [h['Close'] for h in RECENT_TICKERS['PRC']['history'][-2:]]
+        prd = [h['Close'] for h in RECENT_TICKERS['PRD']['history'][-2:]]
+        start_value, end_value = 6 * prc[0] + 20 * prd[0], 6 * prc[1] + 20 * prd[1]
+        self.assertAlmostEqual(bundle['yesterday']['portfolio']['start_value'], start_value)
+        self.assertAlmostEqual(bundle['yesterday']['portfolio']['end_value'], end_value)
+        self.assertAlmostEqual(bundle['yesterday']['portfolio']['return_pct'], (end_value - start_value) / start_value * 100)
+
+    def test_period_returns_bundle_empty_portfolio(self):
+        bundle = portfolio.get_period_returns_bundle('missing')
+        self.assertEqual(bundle, {period: {'portfolio': None, 'tickers': {}} for period in PERIODS})
+
+
+class TestMissingHistories(TempDatabaseTestCase):
+
+    def test_missing_history_is_not_fetched_again(self):
+        with mock.patch.object(data_fetcher, 'fetch_with_cache', return_value=(None, None)) as fetch, \
+                mock.patch.object(data_fetcher, 'fetch_many_with_cache', return_value={}) as fetch_many:
+            self.assertEqual(portfolio._get_or_fetch_ticker_history('MHA'), [])
+            self.assertEqual(portfolio._get_or_fetch_ticker_history('MHA'), [])
+            # The batched prefetch skips it too (leaving a single ticker, not worth a batch)
+            portfolio._prefetch_ticker_histories(['MHA', 'MHB'])
+        self.assertEqual(fetch.call_count, 1)
+        fetch_many.assert_not_called()
+
+    def test_concurrent_fetches_are_coalesced(self):
+        def slow_fetch(ticker, *args, **kwargs):
+            time.sleep(0.05)
+            return ticker_payload('Mhc Inc', [('2024-01-01', 1.0), ('2024-01-02', 2.0)]), 'YAHOO_FINANCE_API'
+
+        results = []
+        with mock.patch.object(data_fetcher, 'fetch_with_cache', side_effect=slow_fetch) as fetch:
+            threads = [threading.Thread(target=lambda: results.append(portfolio._get_or_fetch_ticker_history('MHC')))
+                       for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(fetch.call_count, 1)
+        self.assertEqual([[h['close'] for h in hist] for hist in results], [[1.0, 2.0]] * 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import json
+import unittest
+from datetime import date
+from unittest import mock
+
+from helpers import TempDatabaseTestCase
+from db import database
+from core import report_generator
+
+TODAY = date(2024, 3, 1)
+NOW = '2024-03-01 10:00:00'
+
+
+def _prompt_tickers(prompt):
+    """(tickers asked for by a report prompt, whether it is a batched prompt)."""
+    if 'Tickers data:' in prompt:
+        return prompt.split('data for the tickers ', 1)[1].split(':\n', 1)[0].split(', '), True
+    return [prompt.split('data for the ticker ', 1)[1].split(':\n', 1)[0]], False
+
+
+class FakeGemini:
+    """Stands in for _generate_with_retry: answers each prompt with answer(tickers, batched) as JSON (strings and None as they are), at 0.01 a call."""
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.calls = []
+
+    def __call__(self, prompt, model_name, **kwargs):
+        tickers, batched = _prompt_tickers(prompt)
+        self.calls.append((tickers, batched))
+        answer = self.answer(tickers, batched)
+        return {'text': answer if answer is None or isinstance(answer, str) else json.dumps(answer), 'cost': 0.01}
+
+
+def _report(ticker):
+    return {'summary': f'Report of {ticker}'}
+
+
+def _keyed_answer(tickers, batched):
+    return {t: _report(t) for t in tickers} if batched else _report(tickers[0])
+
+
+class TestTickerReportsBatch(TempDatabaseTestCase):
+
+    def generate(self, tickers, answer, force=True, chunk_size=2):
+        gemini = FakeGemini(answer)
+        with mock.patch.object(report_generator, '_generate_with_retry', side_effect=gemini):
+            reports, cost = report_generator.generate_ticker_reports_batch(
+                tickers, [{} for _ in tickers], [0.1 for _ in tickers], {}, {}, {},
+                force=force, chunk_size=chunk_size, today=TODAY, now_str=NOW)
+        return reports, cost, gemini.calls
+
+    def test_answer_keyed_by_ticker(self):
+        tickers = ['KA1', 'KA2', 'KA3']
+        reports, cost, calls = self.generate(tickers, _keyed_answer)
+        self.assertEqual(reports, {t: _report(t) for t in tickers})
+        # One batched call for the first chunk, a single-ticker prompt for the last one
+        self.assertEqual(calls, [(['KA1', 'KA2'], True), (['KA3'], False)])
+        self.assertAlmostEqual(cost, 0.02)
+        # The reports are saved, each with its share of the call cost
+        saved = database.get_ticker_reports_many(tickers, TODAY.isoformat())
+        self.assertEqual(sorted(saved), tickers)
+        self.assertAlmostEqual(saved['KA1']['cost'], 0.005)
+        self.assertAlmostEqual(saved['KA3']['cost'], 0.01)
+        self.assertEqual(saved['KA2']['reference_date'], NOW)
+
+    def test_answer_as_list_of_reports(self):
+        tickers = ['LB1', 'LB2']
+        answer = lambda chunk, batched: [{'ticker': t.lower(), **_report(t)} for t in reversed(chunk)]
+        reports, cost, calls = self.generate(tickers, answer)
+        self.assertEqual(reports, {t: {'ticker': t.lower(), **_report(t)} for t in tickers})
+        self.assertEqual(len(calls), 1)
+
+    def test_single_report_answer_for_a_batch(self):
+        # Gemini sometimes answers a batch with one report carrying its ticker: the others are retried
+        tickers = ['SR1', 'SR2']
+        answer = lambda chunk, batched: {'ticker': chunk[0], **_report(chunk[0])} if batched else _report(chunk[0])
+        reports, cost, calls = self.generate(tickers, answer)
+        self.assertEqual(sorted(reports), tickers)
+        self.assertEqual(calls, [(tickers, True), (['SR2'], False)])
+
+    def test_missing_tickers_are_retried_one_by_one(self):
+        tickers = ['PA1', 'PA2', 'PA3']
+        answer = lambda chunk, batched: {'PA1': _report('PA1'), 'PA2': 'not a report'} if batched else _report(chunk[0])
+        reports, cost, calls = self.generate(tickers, answer, chunk_size=3)
+        self.assertEqual(reports, {t: _report(t) for t in tickers})
+        self.assertEqual(calls, [(tickers, True), (['PA2'], False), (['PA3'], False)])
+        self.assertAlmostEqual(cost, 0.03)
+
+    def test_unreadable_answer_is_retried_one_by_one(self):
+        tickers = ['UA1', 'UA2']
+        answer = lambda chunk, batched: 'Sorry, I cannot help with that.' if batched else _report(chunk[0])
+        reports, cost, calls = self.generate(tickers, answer)
+        self.assertEqual(reports, {t: _report(t) for t in tickers})
+        self.assertEqual(len(calls), 3)
+
+    def test_failing_chunk_keeps_the_other_chunks(self):
+        tickers = ['FC1', 'FC2', 'FC3', 'FC4', 'FC5']
+
+        def answer(chunk, batched):
+            if 'FC3' in chunk:
+                raise RuntimeError('quota exceeded')
+            return _keyed_answer(chunk, batched)
+
+        reports, cost, calls = self.generate(tickers, answer)
+        self.assertEqual(sorted(reports), ['FC1', 'FC2', 'FC5'])
+        self.assertAlmostEqual(cost, 0.02)
+        self.assertEqual(database.get_ticker_reports_many(['FC3', 'FC4'], TODAY.isoformat()), {})
+
+    def test_single_ticker_failure_is_raised(self):
+        gemini = FakeGemini(lambda chunk, batched: 'not json')
+        with mock.patch.object(report_generator, '_generate_with_retry', side_effect=gemini):
+            with self.assertRaises(ValueError):
+                report_generator.generate_ticker_report_with_gemini('ER1', {}, 0.1, {}, {}, {}, force=True, today=TODAY, now_str=NOW)
+
+    def test_empty_single_ticker_answer(self):
+        # An answer without text gives no report, but no error either
+        gemini = FakeGemini(lambda chunk, batched: None)
+        with mock.patch.object(report_generator, '_generate_with_retry', side_effect=gemini):
+            report, cost = report_generator.generate_ticker_report_with_gemini('EA1', {}, 0.1, {}, {}, {}, force=True, today=TODAY, now_str=NOW)
+        self.assertIsNone(report)
+        self.assertEqual(cost, 0.01)
+        self.assertIsNone(database.get_ticker_report('EA1'))
+        # In a batch, the empty answer is retried one ticker at a time
+        reports, cost, calls = self.generate(['EA2', 'EA3'], lambda chunk, batched: None if batched else _report(chunk[0]))
+        self.assertEqual(sorted(reports), ['EA2', 'EA3'])
+        self.assertEqual(len(calls), 3)
+
+    def test_todays_reports_are_reused(self):
+        tickers = ['RU1', 'RU2', 'RU3']
+        self.generate(tickers[:2], _keyed_answer)
+        with mock.patch.object(report_generator, 'get_ticker_reports_many', wraps=database.get_ticker_reports_many) as preload:
+            reports, cost, calls = self.generate(tickers, _keyed_answer, force=False)
+        # Today's reports are loaded with one query; only the missing ticker is generated
+        preload.assert_called_once_with(tickers, TODAY.isoformat())
+        self.assertEqual(sorted(reports), tickers)
+        self.assertEqual(calls, [(['RU3'], False)])
+        self.assertAlmostEqual(cost, 0.01)
+
+if __name__ == '__main__':
+    unittest.main()